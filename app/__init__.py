@@ -1 +1,5 @@
 """Bird Tarifa API package."""
+from time import perf_counter
+
+# Start of the cold-start clock, see app.startup.
+IMPORT_STARTED = perf_counter()
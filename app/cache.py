@@ -0,0 +1,202 @@
+"""Bounded LRU caches with hit/miss/eviction counters and an optional shared tier.
+
+Every cache is an in-process LRU. Caches created with a ``codec`` also read
+and write the shared tier picked by ``CACHE_BACKEND`` (see
+``app.cache_stores``): SQLite on local disk for all workers on one machine,
+or Redis for all instances. On a local miss the shared tier is checked before
+computing the value, and ``get_or_create`` runs the factory once per key and
+process however many requests miss together (single-flight).
+
+Every cache registers itself by name so ``cache_stats`` (``GET /health/caches``)
+can report sizes and evictions; a cache that keeps evicting is too small for
+the number of regions it serves.
+"""
+from __future__ import annotations
+
+from collections import OrderedDict
+from collections.abc import Callable, Hashable
+from dataclasses import dataclass
+import logging
+from math import inf
+from threading import Lock
+from time import monotonic, time
+from typing import Any, Generic, TypeVar
+
+from pydantic import TypeAdapter
+
+from .cache_stores import SharedStore, shared_store
+
+
+logger = logging.getLogger(__name__)
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+_MISSING: Any = object()
+
+# After a shared-tier error, caches stay in-process only for this long.
+SHARED_RETRY_S = 30.0
+
+_registry: dict[str, LRUCache[Any, Any]] = {}
+_shared_retry_at = 0.0
+
+
+@dataclass(frozen=True)
+class Codec(Generic[V]):
+    """How a cache's values are stored in the shared tier."""
+
+    dumps: Callable[[V], bytes]
+    loads: Callable[[bytes], V]
+
+    @classmethod
+    def json(cls, type_: Any) -> Codec[Any]:
+        """JSON via pydantic, for models, dataclasses and lists of them."""
+        adapter = TypeAdapter(type_)
+        return cls(dumps=adapter.dump_json, loads=adapter.validate_json)
+
+
+def _shared() -> SharedStore | None:
+    if time() < _shared_retry_at:
+        return None
+    try:
+        return shared_store()
+    except Exception:
+        _shared_failed("setup")
+        return None
+
+
+def _shared_failed(action: str) -> None:
+    global _shared_retry_at
+    _shared_retry_at = time() + SHARED_RETRY_S
+    logger.warning(
+        "Shared cache %s failed; using in-process caches only for %.0f s", action, SHARED_RETRY_S, exc_info=True
+    )
+
+
+class LRUCache(Generic[K, V]):
+    """Thread-safe LRU mapping holding at most ``maxsize`` entries, optionally expiring after ``ttl_s``."""
+
+    def __init__(self, name: str, *, maxsize: int, ttl_s: float | None = None, codec: Codec[V] | None = None) -> None:
+        self.name = name
+        self.maxsize = max(1, maxsize)
+        self.ttl_s = ttl_s
+        self.codec = codec
+        self._data: OrderedDict[K, tuple[float, V]] = OrderedDict()
+        self._lock = Lock()
+        self._inflight: dict[K, Lock] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.shared_hits = 0
+        self.shared_errors = 0
+        _registry[name] = self
+
+    def _shared_key(self, key: K) -> str:
+        return f"{self.name}:{key!r}"
+
+    def _lookup(self, key: K) -> V:
+        """Value from the local tier, then the shared one; ``_MISSING`` if neither has it."""
+        with self._lock:
+            item = self._data.get(key, _MISSING)
+            if item is not _MISSING:
+                expires_at, value = item
+                if monotonic() < expires_at:
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+                self.expirations += 1
+
+        store = _shared() if self.codec is not None else None
+        if store is not None:
+            try:
+                found = store.get(self._shared_key(key))
+                if found is not None:
+                    payload, ttl_left = found
+                    value = self.codec.loads(payload)  # type: ignore[union-attr]
+                    self._store_local(key, value, ttl_left)
+                    with self._lock:
+                        self.shared_hits += 1
+                    return value
+            except Exception:
+                with self._lock:
+                    self.shared_errors += 1
+                _shared_failed("read")
+
+        with self._lock:
+            self.misses += 1
+        return _MISSING
+
+    def _store_local(self, key: K, value: V, ttl_s: float | None) -> None:
+        with self._lock:
+            self._data[key] = (inf if ttl_s is None else monotonic() + ttl_s, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def get(self, key: K, default: V | None = None) -> V | None:
+        value = self._lookup(key)
+        return default if value is _MISSING else value
+
+    def set(self, key: K, value: V) -> None:
+        self._store_local(key, value, self.ttl_s)
+        store = _shared() if self.codec is not None else None
+        if store is not None:
+            try:
+                store.set(self._shared_key(key), self.codec.dumps(value), self.ttl_s)  # type: ignore[union-attr]
+            except Exception:
+                with self._lock:
+                    self.shared_errors += 1
+                _shared_failed("write")
+
+    def get_or_create(self, key: K, factory: Callable[[], V]) -> V:
+        """Cached value for ``key``, storing ``factory()`` first when there is none.
+
+        Concurrent callers missing the same key wait for the first one's result
+        instead of all running ``factory``. Exceptions are not cached.
+        """
+        value = self._lookup(key)
+        if value is not _MISSING:
+            return value
+        with self._lock:
+            key_lock = self._inflight.setdefault(key, Lock())
+        with key_lock:
+            try:
+                # Whoever held the lock before us may have just stored it.
+                with self._lock:
+                    item = self._data.get(key, _MISSING)
+                if item is not _MISSING and monotonic() < item[0]:
+                    return item[1]
+                value = factory()
+                self.set(key, value)
+                return value
+            finally:
+                with self._lock:
+                    if self._inflight.get(key) is key_lock:
+                        del self._inflight[key]
+
+    def clear(self) -> None:
+        """Empty the in-process tier (the shared tier keeps its entries until they expire)."""
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "shared_hits": self.shared_hits,
+            "shared_errors": self.shared_errors,
+        }
+
+
+def cache_stats() -> dict[str, dict[str, int]]:
+    return {name: cache.stats() for name, cache in sorted(_registry.items())}
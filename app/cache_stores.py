@@ -0,0 +1,141 @@
+"""Shared cache tiers behind ``app.cache``, picked by ``CACHE_BACKEND``.
+
+- ``memory`` (default): no shared tier, every worker caches on its own.
+- ``sqlite``: a WAL-mode SQLite file (memory-mapped reads) at
+  ``CACHE_SQLITE_PATH``, shared by the workers on one machine and kept across
+  restarts. It is trimmed to ``CACHE_SQLITE_MAX_ENTRIES``.
+- ``redis``: any Redis-protocol server at ``REDIS_URL``, shared by every
+  instance. Needs the ``redis`` package, which is imported only then.
+
+Stores only see opaque keys and bytes; expiry is kept by the store itself.
+"""
+from __future__ import annotations
+
+from functools import lru_cache
+import sqlite3
+from threading import Lock, local
+from time import time
+from typing import Protocol
+
+from .config import get_settings
+
+
+class SharedStore(Protocol):
+    def get(self, key: str) -> tuple[bytes, float | None] | None:
+        """``(payload, seconds left or None for no expiry)``, or None when missing or expired."""
+        ...
+
+    def set(self, key: str, payload: bytes, ttl_s: float | None) -> None: ...
+
+    def delete(self, key: str) -> None: ...
+
+
+class SQLiteStore:
+    # Expired and surplus rows are purged every this many writes.
+    PURGE_EVERY = 256
+
+    def __init__(self, path: str, *, namespace: str, max_entries: int) -> None:
+        self.path = path
+        self.namespace = namespace
+        self.max_entries = max(1, max_entries)
+        self._local = local()
+        self._writes = 0
+        self._writes_lock = Lock()
+        conn = self._connection()
+        conn.execute(
+            "create table if not exists cache_entries ("
+            " key text primary key, value blob not null, expires_at real, stored_at real not null)"
+        )
+        conn.execute("create index if not exists ix_cache_entries_stored_at on cache_entries (stored_at)")
+
+    def _connection(self) -> sqlite3.Connection:
+        # sqlite3 connections are per thread; WAL lets workers read while one writes.
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=1.0, isolation_level=None)
+            conn.execute("pragma journal_mode=wal")
+            conn.execute("pragma synchronous=normal")
+            conn.execute("pragma mmap_size=268435456")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str) -> tuple[bytes, float | None] | None:
+        row = self._connection().execute(
+            "select value, expires_at from cache_entries where key = ?",
+            (f"{self.namespace}:{key}",),
+        ).fetchone()
+        if row is None:
+            return None
+        payload, expires_at = row
+        if expires_at is None:
+            return payload, None
+        ttl_left = expires_at - time()
+        return (payload, ttl_left) if ttl_left > 0 else None
+
+    def set(self, key: str, payload: bytes, ttl_s: float | None) -> None:
+        now = time()
+        conn = self._connection()
+        conn.execute(
+            "insert or replace into cache_entries (key, value, expires_at, stored_at) values (?, ?, ?, ?)",
+            (f"{self.namespace}:{key}", payload, None if ttl_s is None else now + ttl_s, now),
+        )
+        with self._writes_lock:
+            self._writes += 1
+            purge = self._writes % self.PURGE_EVERY == 0
+        if purge:
+            self.purge()
+
+    def delete(self, key: str) -> None:
+        self._connection().execute("delete from cache_entries where key = ?", (f"{self.namespace}:{key}",))
+
+    def purge(self) -> None:
+        """Drop expired entries, then the oldest ones beyond ``max_entries``."""
+        conn = self._connection()
+        conn.execute("delete from cache_entries where expires_at is not null and expires_at <= ?", (time(),))
+        (count,) = conn.execute("select count(*) from cache_entries").fetchone()
+        if count > self.max_entries:
+            conn.execute(
+                "delete from cache_entries where key in"
+                " (select key from cache_entries order by stored_at limit ?)",
+                (count - self.max_entries,),
+            )
+
+
+class RedisStore:
+    def __init__(self, url: str, *, namespace: str) -> None:
+        # Only needed with CACHE_BACKEND=redis.
+        import redis
+
+        self.namespace = namespace
+        # Short timeouts: a slow cache must not be slower than recomputing.
+        self._client = redis.Redis.from_url(url, socket_timeout=0.25, socket_connect_timeout=0.25)
+
+    def get(self, key: str) -> tuple[bytes, float | None] | None:
+        pipe = self._client.pipeline(transaction=False)
+        pipe.get(f"{self.namespace}:{key}")
+        pipe.pttl(f"{self.namespace}:{key}")
+        payload, pttl = pipe.execute()
+        if payload is None:
+            return None
+        return payload, (pttl / 1000 if pttl > 0 else None)
+
+    def set(self, key: str, payload: bytes, ttl_s: float | None) -> None:
+        px = None if ttl_s is None else max(1, int(ttl_s * 1000))
+        self._client.set(f"{self.namespace}:{key}", payload, px=px)
+
+    def delete(self, key: str) -> None:
+        self._client.delete(f"{self.namespace}:{key}")
+
+
+@lru_cache
+def shared_store() -> SharedStore | None:
+    settings = get_settings()
+    if settings.cache_backend == "sqlite":
+        return SQLiteStore(
+            settings.cache_sqlite_path,
+            namespace=settings.cache_namespace,
+            max_entries=settings.cache_sqlite_max_entries,
+        )
+    if settings.cache_backend == "redis":
+        return RedisStore(settings.redis_url, namespace=settings.cache_namespace)
+    return None
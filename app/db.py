@@ -1,12 +1,26 @@
-from collections.abc import Generator
+from collections.abc import AsyncGenerator, Generator
+from itertools import count
+import logging
+from time import monotonic, time
+from typing import Any
 
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import DBAPIError, OperationalError, ProgrammingError
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import DeclarativeBase, Session, sessionmaker
+from starlette.datastructures import MutableHeaders
+from starlette.requests import Request
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
 from .config import get_settings
+from .metrics import instrument_engine
 
 
 settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# Alembic revision this code expects (migrations/versions); bump with every new migration.
+SCHEMA_VERSION = "0005"
 
 
 def _normalize_database_url(url: str) -> str:
@@ -17,14 +31,57 @@ def _normalize_database_url(url: str) -> str:
         url = "postgresql+psycopg://" + url[len("postgresql://") :]
     return url
 
-engine = create_engine(
-    _normalize_database_url(settings.database_url),
-    pool_pre_ping=True,
-    future=True,
-)
+
+def _async_database_url(url: str) -> str:
+    """psycopg serves both engines; SQLite (local runs) needs aiosqlite for the async one."""
+    url = _normalize_database_url(url)
+    if url.startswith("sqlite://"):
+        url = "sqlite+aiosqlite://" + url[len("sqlite://") :]
+    return url
+
+
+def _engine_options(url: str) -> dict[str, Any]:
+    if not url.startswith("postgresql"):
+        return {"pool_pre_ping": True}
+    options: dict[str, Any] = {
+        "pool_pre_ping": True,
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_timeout": settings.db_pool_timeout_s,
+        "pool_recycle": settings.db_pool_recycle_s,
+    }
+    if settings.db_statement_timeout_ms:
+        options["connect_args"] = {"options": f"-c statement_timeout={settings.db_statement_timeout_ms}"}
+    return options
+
+
+_sync_url = _normalize_database_url(settings.database_url)
+engine = create_engine(_sync_url, future=True, **_engine_options(_sync_url))
 
 SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False, future=True)
 
+# Separate pool for async routes; both count against Postgres max_connections.
+_async_url = _async_database_url(settings.database_url)
+async_engine = create_async_engine(_async_url, **_engine_options(_async_url))
+
+AsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
+# Read replicas (async only: the read routes are async). Each has its own pool.
+replica_engines: list[AsyncEngine] = [
+    create_async_engine(_async_database_url(url), **_engine_options(_async_database_url(url)))
+    for url in settings.database_replica_urls_list
+]
+_replica_turn = count()
+
+instrument_engine(engine, role="primary")
+instrument_engine(async_engine.sync_engine, role="primary")
+for _replica in replica_engines:
+    instrument_engine(_replica.sync_engine, role="replica")
+_replica_down_until: dict[int, float] = {}
+
+# Sent back after a write and echoed by the client, see ReadYourWritesMiddleware.
+PRIMARY_UNTIL_HEADER = "X-Primary-Until"
+
 
 class Base(DeclarativeBase):
     pass
@@ -36,3 +93,86 @@ def get_db() -> Generator[Session, None, None]:
         yield db
     finally:
         db.close()
+
+
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+def _reads_from_primary(request: Request) -> bool:
+    try:
+        until = float(request.headers.get(PRIMARY_UNTIL_HEADER, "0"))
+    except ValueError:
+        return False
+    now = time()
+    # Ignore values a client made up to pin itself to the primary.
+    return now < until <= now + settings.db_read_your_writes_s + 60
+
+
+async def _replica_session() -> AsyncSession | None:
+    """Session on the next healthy replica (round-robin), or None to use the primary."""
+    for _ in range(len(replica_engines)):
+        index = next(_replica_turn) % len(replica_engines)
+        if _replica_down_until.get(index, 0.0) > monotonic():
+            continue
+        session = AsyncSessionLocal(bind=replica_engines[index])
+        try:
+            # Checks out a connection now (pool_pre_ping validates it) so a dead
+            # replica is skipped here rather than failing the query.
+            await session.connection()
+        except DBAPIError:
+            await session.close()
+            _replica_down_until[index] = monotonic() + settings.db_replica_retry_s
+            logger.warning("Read replica unavailable, skipping it", extra={"replica_index": index})
+            continue
+        return session
+    return None
+
+
+async def get_async_read_db(request: Request) -> AsyncGenerator[AsyncSession, None]:
+    """Session for read-only routes: a replica, unless this client just wrote."""
+    session = None
+    if replica_engines and not _reads_from_primary(request):
+        session = await _replica_session()
+    async with session or AsyncSessionLocal() as db:
+        yield db
+
+
+async def dispose_async_engines() -> None:
+    for target in (async_engine, *replica_engines):
+        await target.dispose()
+
+
+class ReadYourWritesMiddleware:
+    """Tag successful writes with ``X-Primary-Until`` so the client's next reads see them.
+
+    The client echoes the header back; until then ``get_async_read_db`` uses
+    the primary instead of a replica that may not have caught up.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] in ("GET", "HEAD", "OPTIONS"):
+            await self.app(scope, receive, send)
+            return
+
+        async def tagging_send(message: Message) -> None:
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                headers = MutableHeaders(scope=message)
+                headers[PRIMARY_UNTIL_HEADER] = f"{time() + settings.db_read_your_writes_s:.3f}"
+            await send(message)
+
+        await self.app(scope, receive, tagging_send)
+
+
+def current_schema_version() -> str | None:
+    """Alembic revision of the database in one query; None when it was never migrated."""
+    with engine.connect() as conn:
+        try:
+            return conn.execute(text("select version_num from alembic_version")).scalar()
+        except (OperationalError, ProgrammingError):
+            # No alembic_version table yet.
+            return None
@@ -2,16 +2,15 @@ from __future__ import annotations
 
 from dataclasses import dataclass
 from datetime import datetime, timezone
-from math import asin, cos, radians, sin, sqrt
-from typing import Any
+from typing import TYPE_CHECKING, Any
 
-import httpx
+if TYPE_CHECKING:
+    import httpx
 
 from .config import get_settings
+from .upstreams import ebird_breaker
 
 
-EBIRD_BASE_URL = "https://api.ebird.org/v2"
-
 
 @dataclass(frozen=True)
 class EbirdObservation:
@@ -33,6 +32,17 @@ class EbirdHotspot:
     num_checklists_all_time: int | None = None
 
 
+def _http_client(**kwargs: Any) -> httpx.Client:
+    # httpx is only needed once eBird is actually called; keep it off the cold-start path.
+    import httpx
+
+    return httpx.Client(**kwargs)
+
+
+def _api_url(path: str) -> str:
+    return f"{get_settings().ebird_base_url.rstrip('/')}{path}"
+
+
 def _parse_obs_dt(value: str) -> tuple[datetime | None, bool]:
     value = value.strip()
     for fmt, has_time in (("%Y-%m-%d %H:%M", True), ("%Y-%m-%d", False)):
@@ -42,18 +52,6 @@ def _parse_obs_dt(value: str) -> tuple[datetime | None, bool]:
             continue
     return None, False
 
-def _haversine_km(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
-    # Good enough for sorting hotspots by proximity.
-    radius_km = 6371.0
-    d_lat = radians(lat2 - lat1)
-    d_lng = radians(lng2 - lng1)
-    lat1_r = radians(lat1)
-    lat2_r = radians(lat2)
-
-    a = sin(d_lat / 2) ** 2 + cos(lat1_r) * cos(lat2_r) * sin(d_lng / 2) ** 2
-    return 2 * radius_km * asin(sqrt(a))
-
-
 def fetch_recent_geo_observations(
     *,
     lat: float,
@@ -67,7 +65,7 @@ def fetch_recent_geo_observations(
     if not settings.ebird_api_key:
         raise RuntimeError("Missing EBIRD_API_KEY.")
 
-    url = f"{EBIRD_BASE_URL}/data/obs/geo/recent"
+    url = _api_url("/data/obs/geo/recent")
     headers = {"X-eBirdApiToken": settings.ebird_api_key}
     params = {
         "lat": lat,
@@ -79,7 +77,10 @@ def fetch_recent_geo_observations(
     if settings.ebird_spp_locale.strip():
         params["sppLocale"] = settings.ebird_spp_locale.strip()
 
-    with httpx.Client(timeout=timeout_s) as client:
+    with (
+        ebird_breaker.call(timeout_s, operation="recent_geo") as timeout,
+        _http_client(timeout=timeout) as client,
+    ):
         response = client.get(url, headers=headers, params=params)
         response.raise_for_status()
         payload: list[dict[str, Any]] = response.json()
@@ -119,7 +120,7 @@ def fetch_recent_location_observations(
 
     # Note: eBird supports passing a hotspot locId to the same endpoint used for regions:
     # /data/obs/{regionCodeOrLocId}/recent
-    url = f"{EBIRD_BASE_URL}/data/obs/{loc_id}/recent"
+    url = _api_url(f"/data/obs/{loc_id}/recent")
     headers = {"X-eBirdApiToken": settings.ebird_api_key}
     params = {
         "back": back_days,
@@ -128,7 +129,10 @@ def fetch_recent_location_observations(
     if settings.ebird_spp_locale.strip():
         params["sppLocale"] = settings.ebird_spp_locale.strip()
 
-    with httpx.Client(timeout=timeout_s) as client:
+    with (
+        ebird_breaker.call(timeout_s, operation="recent_location") as timeout,
+        _http_client(timeout=timeout) as client,
+    ):
         response = client.get(url, headers=headers, params=params)
         response.raise_for_status()
         payload: list[dict[str, Any]] = response.json()
@@ -163,7 +167,7 @@ def fetch_hotspots_geo(
     if not settings.ebird_api_key:
         raise RuntimeError("Missing EBIRD_API_KEY.")
 
-    url = f"{EBIRD_BASE_URL}/ref/hotspot/geo"
+    url = _api_url("/ref/hotspot/geo")
     headers = {"X-eBirdApiToken": settings.ebird_api_key}
     params = {
         "lat": lat,
@@ -172,7 +176,10 @@ def fetch_hotspots_geo(
         "fmt": "json",
     }
 
-    with httpx.Client(timeout=timeout_s) as client:
+    with (
+        ebird_breaker.call(timeout_s, operation="hotspots_geo") as timeout,
+        _http_client(timeout=timeout) as client,
+    ):
         response = client.get(url, headers=headers, params=params)
         response.raise_for_status()
         payload: list[dict[str, Any]] = response.json()
@@ -221,7 +228,7 @@ def fetch_hotspots_geo(
             )
         )
 
-    hotspots.sort(key=lambda h: (_haversine_km(lat, lng, h.lat, h.lng), h.name.lower()))
+    # Distance ordering is left to app.geo.HotspotIndex.
     return hotspots
 
 
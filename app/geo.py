@@ -0,0 +1,148 @@
+"""Grid-bucket spatial index over eBird hotspots.
+
+Hotspots are bucketed into ``cell_deg`` x ``cell_deg`` lat/lng cells once,
+when a region's hotspot list is fetched. Nearest-neighbour queries then
+only look at the rings of cells around the query point, and the zone picker
+spreads its picks with the same buckets instead of re-sorting everything.
+"""
+from __future__ import annotations
+
+from collections.abc import Callable, Iterable
+from datetime import date
+import heapq
+from math import asin, cos, floor, radians, sin, sqrt
+
+from .ebird import EbirdHotspot
+
+
+EARTH_RADIUS_KM = 6371.0
+KM_PER_DEG_LAT = 111.32
+
+
+def haversine_km(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    d_lat = radians(lat2 - lat1)
+    d_lng = radians(lng2 - lng1)
+    a = sin(d_lat / 2) ** 2 + cos(radians(lat1)) * cos(radians(lat2)) * sin(d_lng / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * asin(sqrt(a))
+
+
+def _popularity(hotspot: EbirdHotspot) -> tuple:
+    # eBird "popularity" signals first, name as a stable tie-break.
+    return (
+        -(hotspot.num_checklists_all_time or 0),
+        -(hotspot.num_species_all_time or 0),
+        -(hotspot.latest_obs_dt.timestamp() if hotspot.latest_obs_dt else 0),
+        hotspot.name.lower(),
+    )
+
+
+def is_active(hotspot: EbirdHotspot, since: date) -> bool:
+    return hotspot.latest_obs_dt is not None and hotspot.latest_obs_dt.date() >= since
+
+
+class HotspotIndex:
+    """Index over a fetched hotspot list; built once and then only queried."""
+
+    def __init__(self, hotspots: Iterable[EbirdHotspot], *, cell_deg: float = 0.05) -> None:
+        self.cell_deg = cell_deg
+        # Ranked once here so the zone picker doesn't re-sort on every rebuild.
+        self.hotspots: list[EbirdHotspot] = sorted(hotspots, key=_popularity)
+        self._cells: dict[tuple[int, int], list[EbirdHotspot]] = {}
+        for hotspot in self.hotspots:
+            self._cells.setdefault(self._cell(hotspot.lat, hotspot.lng), []).append(hotspot)
+        if self._cells:
+            rows = [cell[0] for cell in self._cells]
+            cols = [cell[1] for cell in self._cells]
+            self._bounds = (min(rows), max(rows), min(cols), max(cols))
+
+    def __len__(self) -> int:
+        return len(self.hotspots)
+
+    def _cell(self, lat: float, lng: float) -> tuple[int, int]:
+        return floor(lat / self.cell_deg), floor(lng / self.cell_deg)
+
+    def _ring(self, center: tuple[int, int], radius: int) -> Iterable[EbirdHotspot]:
+        row, col = center
+        if radius == 0:
+            yield from self._cells.get(center, ())
+            return
+        for d_col in range(-radius, radius + 1):
+            yield from self._cells.get((row - radius, col + d_col), ())
+            yield from self._cells.get((row + radius, col + d_col), ())
+        for d_row in range(-radius + 1, radius):
+            yield from self._cells.get((row + d_row, col - radius), ())
+            yield from self._cells.get((row + d_row, col + radius), ())
+
+    def _max_ring(self, center: tuple[int, int]) -> int:
+        min_row, max_row, min_col, max_col = self._bounds
+        row, col = center
+        return max(abs(row - min_row), abs(row - max_row), abs(col - min_col), abs(col - max_col))
+
+    def _ring_min_km(self, lat: float, radius: int) -> float:
+        # Closest any point of ring ``radius + 1`` can be: ``radius`` whole cells away,
+        # measured along the shorter (longitude) side at the most poleward latitude.
+        lat_edge = min(89.9, abs(lat) + (radius + 1) * self.cell_deg)
+        return radius * self.cell_deg * KM_PER_DEG_LAT * cos(radians(lat_edge))
+
+    def nearest(
+        self,
+        lat: float,
+        lng: float,
+        *,
+        k: int,
+        max_km: float | None = None,
+        where: Callable[[EbirdHotspot], bool] | None = None,
+    ) -> list[tuple[float, EbirdHotspot]]:
+        """Up to ``k`` ``(distance_km, hotspot)`` pairs, closest first."""
+        if not self.hotspots or k <= 0:
+            return []
+        center = self._cell(lat, lng)
+        best: list[tuple[float, str, EbirdHotspot]] = []  # max-heap via negated distance
+        for radius in range(self._max_ring(center) + 1):
+            for hotspot in self._ring(center, radius):
+                if where is not None and not where(hotspot):
+                    continue
+                distance = haversine_km(lat, lng, hotspot.lat, hotspot.lng)
+                if max_km is not None and distance > max_km:
+                    continue
+                item = (-distance, hotspot.id, hotspot)
+                if len(best) < k:
+                    heapq.heappush(best, item)
+                elif distance < -best[0][0]:
+                    heapq.heapreplace(best, item)
+            bound = self._ring_min_km(lat, radius)
+            if (len(best) == k and bound > -best[0][0]) or (max_km is not None and bound > max_km):
+                break
+        return [(-neg_distance, hotspot) for neg_distance, _id, hotspot in sorted(best, reverse=True)]
+
+    def spread(
+        self,
+        *,
+        limit: int,
+        min_km: float,
+        where: Callable[[EbirdHotspot], bool] | None = None,
+    ) -> list[EbirdHotspot]:
+        """Most popular hotspots, skipping any within ``min_km`` of one already picked."""
+        picked: list[EbirdHotspot] = []
+        picked_index = HotspotIndex((), cell_deg=self.cell_deg)
+        for hotspot in self.hotspots:
+            if len(picked) >= limit:
+                break
+            if where is not None and not where(hotspot):
+                continue
+            if picked_index._cells and picked_index.nearest(hotspot.lat, hotspot.lng, k=1, max_km=min_km):
+                continue
+            picked.append(hotspot)
+            picked_index._add(hotspot)
+        return picked
+
+    def _add(self, hotspot: EbirdHotspot) -> None:
+        cell = self._cell(hotspot.lat, hotspot.lng)
+        self._cells.setdefault(cell, []).append(hotspot)
+        self.hotspots.append(hotspot)
+        row, col = cell
+        if len(self.hotspots) == 1:
+            self._bounds = (row, row, col, col)
+        else:
+            min_row, max_row, min_col, max_col = self._bounds
+            self._bounds = (min(min_row, row), max(max_row, row), min(min_col, col), max(max_col, col))
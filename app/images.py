@@ -1,46 +1,269 @@
 from __future__ import annotations
 
+from dataclasses import dataclass
 from io import BytesIO
+import shutil
+import struct
+import subprocess
 
 
-def normalize_upload_image(*, payload: bytes, content_type: str) -> bytes:
+EXIF_ORIENTATION_TAG = 0x0112
+
+# jpegtran flags that undo each EXIF orientation (2..8) in the DCT domain.
+JPEGTRAN_OPS: dict[int, tuple[str, ...]] = {
+    2: ("-flip", "horizontal"),
+    3: ("-rotate", "180"),
+    4: ("-flip", "vertical"),
+    5: ("-transpose",),
+    6: ("-rotate", "90"),
+    7: ("-transverse",),
+    8: ("-rotate", "270"),
+}
+
+
+def _find_jpeg_orientation(payload: bytes) -> tuple[int, int, str] | None:
+    """Locate the EXIF Orientation value in a JPEG without decoding it.
+
+    Returns (orientation, byte offset of the value, TIFF byte order) or None
+    when the file has no readable Orientation tag.
+    """
+    if not payload.startswith(b"\xff\xd8"):
+        return None
+
+    pos = 2
+    while pos + 4 <= len(payload):
+        if payload[pos] != 0xFF:
+            return None
+        marker = payload[pos + 1]
+        if marker in (0xD9, 0xDA):  # end of image / start of scan: no more metadata
+            return None
+        (length,) = struct.unpack(">H", payload[pos + 2 : pos + 4])
+        segment_start = pos + 4
+        if marker == 0xE1 and payload[segment_start : segment_start + 6] == b"Exif\x00\x00":
+            tiff = segment_start + 6
+            order = payload[tiff : tiff + 2]
+            if order == b"II":
+                endian = "<"
+            elif order == b"MM":
+                endian = ">"
+            else:
+                return None
+            (ifd_offset,) = struct.unpack(endian + "I", payload[tiff + 4 : tiff + 8])
+            ifd = tiff + ifd_offset
+            (count,) = struct.unpack(endian + "H", payload[ifd : ifd + 2])
+            for index in range(count):
+                entry = ifd + 2 + index * 12
+                tag, field_type = struct.unpack(endian + "HH", payload[entry : entry + 4])
+                if tag == EXIF_ORIENTATION_TAG and field_type == 3:  # SHORT
+                    (value,) = struct.unpack(endian + "H", payload[entry + 8 : entry + 10])
+                    return value, entry + 8, endian
+            return None
+        pos = segment_start + length - 2
+    return None
+
+
+def _with_orientation(payload: bytes, *, offset: int, endian: str, value: int) -> bytes:
+    patched = bytearray(payload)
+    patched[offset : offset + 2] = struct.pack(endian + "H", value)
+    return bytes(patched)
+
+
+def _jpegtran_transform(payload: bytes, orientation: int) -> bytes | None:
+    """Losslessly rotate/flip a JPEG with jpegtran, or None if that isn't possible."""
+    binary = shutil.which("jpegtran")
+    ops = JPEGTRAN_OPS.get(orientation)
+    if not binary or not ops:
+        return None
+    # -perfect refuses transforms that would have to drop partial edge blocks.
+    result = subprocess.run(
+        [binary, "-copy", "all", "-perfect", *ops],
+        input=payload,
+        capture_output=True,
+        timeout=30,
+        check=False,
+    )
+    if result.returncode != 0 or not result.stdout:
+        return None
+    return result.stdout
+
+
+def _encode_upright_jpeg(upright) -> bytes:
+    out = BytesIO()
+    upright.convert("RGB").save(
+        out,
+        format="JPEG",
+        quality=92,
+        optimize=True,
+        progressive=True,
+    )
+    return out.getvalue()
+
+
+def _reencode_upright(payload: bytes) -> bytes:
+    from PIL import Image, ImageOps  # type: ignore[import-not-found]
+
+    with Image.open(BytesIO(payload)) as img:
+        return _encode_upright_jpeg(ImageOps.exif_transpose(img))
+
+
+def normalize_upload_image(*, payload: bytes, content_type: str, orientation_mode: str = "lossless") -> bytes:
     """Normalize uploaded image bytes for consistent browser rendering.
 
     Currently this only fixes JPEG EXIF orientation. Some devices store images
     "rotated" in the pixel data and rely on the EXIF Orientation tag. Browsers
     and CSS properties don't always apply it consistently once the image is
-    uploaded and served from S3, so we transpose and re-encode when needed.
+    uploaded and served from S3.
+
+    The tag is read straight from the EXIF header, so upright photos cost
+    nothing. For rotated ones ``orientation_mode`` picks the fix:
+
+    - ``"lossless"``: rotate in the DCT domain with jpegtran and reset the tag
+      to 1; falls back to re-encoding when jpegtran is missing or the image
+      dimensions don't allow a perfect transform.
+    - ``"keep"``: leave the original untouched (the display variants are
+      rotated anyway, and modern browsers honour the tag).
+    - ``"reencode"``: always decode, transpose and re-encode.
     """
 
+    normalized = _normalize_without_decoding(
+        payload=payload, content_type=content_type, orientation_mode=orientation_mode
+    )
+    if normalized is not None:
+        return normalized
+    try:
+        return _reencode_upright(payload)
+    except Exception:
+        # Pillow is optional at runtime; fail open if it's not available or can't decode.
+        return payload
+
+
+def _normalize_without_decoding(*, payload: bytes, content_type: str, orientation_mode: str) -> bytes | None:
+    """The normalized original when no decode is needed (upright, ``keep``, jpegtran), else None."""
     if content_type != "image/jpeg":
         return payload
 
+    try:
+        found = _find_jpeg_orientation(payload)
+    except struct.error:
+        found = None
+    if not found or found[0] == 1 or orientation_mode == "keep":
+        return payload
+    orientation, offset, endian = found
+
+    if orientation_mode == "lossless":
+        try:
+            transformed = _jpegtran_transform(payload, orientation)
+        except (OSError, subprocess.SubprocessError):
+            transformed = None
+        if transformed:
+            # jpegtran copies the EXIF block as-is, so the tag still says "rotate".
+            fixed = _find_jpeg_orientation(transformed)
+            if fixed:
+                return _with_orientation(transformed, offset=fixed[1], endian=fixed[2], value=1)
+    return None
+
+
+@dataclass(frozen=True)
+class ImageVariant:
+    name: str
+    payload: bytes
+    content_type: str
+    width: int | None = None
+    height: int | None = None
+
+
+# Longest edge in pixels for the display variants, largest first. The feed card
+# is at most ~840 CSS px wide, so "md" covers it on 1.5x screens and "sm" on phones.
+DISPLAY_VARIANTS = (("md", 1280), ("sm", 480))
+
+
+def _encode_display_variant(img, *, allow_avif: bool) -> tuple[bytes, str]:
+    out = BytesIO()
+    img.save(out, format="WEBP", quality=80, method=4)
+    best = (out.getvalue(), "image/webp")
+
+    if allow_avif:
+        from PIL import features  # type: ignore[import-not-found]
+
+        if features.check("avif"):
+            out = BytesIO()
+            img.save(out, format="AVIF", quality=60, speed=8)
+            if len(out.getvalue()) < len(best[0]):
+                best = (out.getvalue(), "image/avif")
+    return best
+
+
+def build_image_variants(
+    *,
+    payload: bytes,
+    content_type: str,
+    allow_avif: bool = False,
+    orientation_mode: str = "lossless",
+) -> list[ImageVariant]:
+    """Return the normalized original followed by smaller display variants.
+
+    Display variants are decoded once, rotated upright and downscaled, then
+    re-encoded to WebP (or AVIF when enabled and smaller). JPEGs are decoded
+    at a reduced DCT scale when that still covers the largest variant, and
+    each variant is resized from the previous one. Sizes at or above the
+    original's dimensions are skipped. When the original has to be
+    re-encoded upright, the same full-size decode feeds the variants. Without
+    Pillow only the original is returned.
+    """
+
+    original = _normalize_without_decoding(
+        payload=payload,
+        content_type=content_type,
+        orientation_mode=orientation_mode,
+    )
+
     try:
         from PIL import Image, ImageOps  # type: ignore[import-not-found]
     except Exception:
-        # Pillow is optional at runtime; fail open if it's not available.
-        return payload
+        return [ImageVariant(name="original", payload=original or payload, content_type=content_type)]
 
+    variants: list[ImageVariant] = []
     try:
         with Image.open(BytesIO(payload)) as img:
-            try:
-                orientation = img.getexif().get(274)
-            except Exception:
-                orientation = None
+            width, height = img.size
+            if img.getexif().get(EXIF_ORIENTATION_TAG) in (5, 6, 7, 8):
+                width, height = height, width
 
-            if not orientation or orientation == 1:
-                return payload
+            edges = [edge for _name, edge in DISPLAY_VARIANTS if max(width, height) > edge]
+            if edges and img.format == "JPEG" and original is not None:
+                img.draft("RGB", (max(edges), max(edges)))
 
-            fixed = ImageOps.exif_transpose(img)
-            out = BytesIO()
-            fixed.convert("RGB").save(
-                out,
-                format="JPEG",
-                quality=92,
-                optimize=True,
-                progressive=True,
-            )
-            return out.getvalue()
+            source = ImageOps.exif_transpose(img)
+            if original is None:
+                original = _encode_upright_jpeg(source)
+            if source.mode not in ("RGB", "RGBA"):
+                source = source.convert("RGBA" if "A" in source.getbands() else "RGB")
+
+            for name, edge in DISPLAY_VARIANTS:
+                if max(width, height) <= edge:
+                    continue
+                source = source.copy()
+                source.thumbnail((edge, edge), Image.Resampling.LANCZOS)
+                data, variant_type = _encode_display_variant(source, allow_avif=allow_avif)
+                variants.append(
+                    ImageVariant(
+                        name=name,
+                        payload=data,
+                        content_type=variant_type,
+                        width=source.width,
+                        height=source.height,
+                    )
+                )
     except Exception:
-        return payload
+        return [ImageVariant(name="original", payload=original or payload, content_type=content_type)]
 
+    return [
+        ImageVariant(
+            name="original",
+            payload=original,
+            content_type=content_type,
+            width=width,
+            height=height,
+        ),
+        *variants,
+    ]
@@ -1,59 +1,177 @@
+import asyncio
+from contextlib import suppress
 from datetime import datetime, timedelta, timezone
-from threading import Lock
-from time import time
+import hashlib
+from hmac import compare_digest
+import logging
+import re
+from time import perf_counter
+from typing import Any, Literal
 
-from fastapi import Depends, FastAPI, File, HTTPException, Query, UploadFile, status
+from fastapi import BackgroundTasks, Depends, FastAPI, File, Header, HTTPException, Query, UploadFile, status
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy import func, select
+from fastapi.responses import FileResponse, PlainTextResponse, Response
+from sqlalchemy import func, select, update
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 
+from .cache import cache_stats
 from .config import get_settings
-from .db import Base, engine, get_db
-from .ebird import (
-    fetch_hotspots_geo,
-    fetch_recent_geo_observations,
-    fetch_recent_location_observations,
-    observations_to_predictions,
+from .db import (
+    PRIMARY_UNTIL_HEADER,
+    SCHEMA_VERSION,
+    ReadYourWritesMiddleware,
+    SessionLocal,
+    current_schema_version,
+    dispose_async_engines,
+    get_async_db,
+    get_async_read_db,
+    get_db,
+    replica_engines,
 )
-from .images import normalize_upload_image
-from .models import PredictionRule, Sighting
+from .ebird import observations_to_predictions
+from .geo import is_active
+from .images import ImageVariant, build_image_variants
+from .metrics import MetricsMiddleware, render_metrics
+from .models import PhotoObject, PredictionRule, Sighting
+from .photos import claim_photo, index_photo, register_photo, release_photo
+from .profiling import PROFILE_HEADER, PROFILE_ID_HEADER, ProfilingMiddleware, profiles_dir
+from .tracing import TracingMiddleware, configure_tracing, shutdown_tracing, tracer
+from .regions import (
+    RADIUS_STEPS_KM,
+    Region,
+    UnknownRegionError,
+    hotspot_observations,
+    predictions_cache,
+    region_hotspots,
+    region_observations,
+    resolve_region,
+)
+from .responses import CompressionMiddleware, JSONResponse
 from .schemas import (
     BirdInfoOut,
+    NearbyHotspotOut,
+    PhotoCompleteIn,
     PhotoDeleteIn,
     PhotoDeleteOut,
+    PhotoPresignIn,
+    PhotoPresignOut,
     PhotoUploadOut,
+    PhotoVariant,
     PredictionOut,
     PredictionRuleCreate,
+    PredictionsOverviewOut,
     SeedResult,
+    SpeciesOverview,
     SightingCreate,
     SightingOut,
     ZoneOut,
+    ZoneOverviewStatus,
+)
+from .storage import (
+    IMMUTABLE_CACHE_CONTROL,
+    DirectUploadUnsupportedError,
+    build_photo_key,
+    build_variant_key,
+    delete_object,
+    delete_objects,
+    download_object,
+    head_object,
+    is_photo_key,
+    key_for_public_url,
+    presign_photo_upload,
+    public_url_for_key,
+    upload_image_bytes,
+    variant_keys_for,
 )
-from .storage.s3 import build_photo_key, delete_object, upload_image_bytes
+from .storage import local as local_storage
+from .uploads import (
+    MULTIPART_OVERHEAD_BYTES,
+    UnsupportedUploadError,
+    UploadSizeLimitMiddleware,
+    UploadTooLargeError,
+    sniff_image_type,
+    spool_upload,
+)
+from .quotas import quota_stats
+from .startup import mark_imports_done, startup_report
+from .upstreams import LatencyBudgetMiddleware, UpstreamUnavailableError, breaker_stats, latency_budget
 from .wiki import lookup_bird_info
+from .workers import PoolSaturatedError, run_image_task, run_storage_task, shutdown_pools
+from .zones import get_zones
 
-settings = get_settings()
-app = FastAPI(title=settings.app_name)
+mark_imports_done()
 
-ALLOWED_UPLOAD_TYPES = {"image/jpeg", "image/png", "image/webp"}
-
-ZONES_CACHE_TTL_S = 6 * 60 * 60
-_zones_cache_lock = Lock()
-_zones_cache: list[ZoneOut] | None = None
-_zones_cache_ts: float = 0.0
+settings = get_settings()
+app = FastAPI(title=settings.app_name, default_response_class=JSONResponse)
+logger = logging.getLogger(__name__)
 
+# Inside CORS, so the browser can read its early 413 instead of a bare network error.
+app.add_middleware(
+    UploadSizeLimitMiddleware,
+    paths={"/uploads/photo"},
+    max_bytes=settings.max_upload_mb * 1024 * 1024 + MULTIPART_OVERHEAD_BYTES,
+)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=settings.cors_origins_list,
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[PRIMARY_UNTIL_HEADER, PROFILE_ID_HEADER, "Server-Timing"],
+)
+if replica_engines:
+    app.add_middleware(ReadYourWritesMiddleware)
+# The overview sets its own per-zone budget.
+app.add_middleware(
+    LatencyBudgetMiddleware,
+    paths={"/predictions", "/birds/info", "/hotspots/nearest"},
+    seconds=settings.upstream_budget_s,
 )
+if settings.compression_min_bytes:
+    app.add_middleware(
+        CompressionMiddleware,
+        min_bytes=settings.compression_min_bytes,
+        gzip_level=settings.compression_gzip_level,
+        brotli_quality=settings.compression_brotli_quality,
+    )
+if settings.profiling_token:
+    app.add_middleware(ProfilingMiddleware, token=settings.profiling_token)
+if configure_tracing():
+    app.add_middleware(TracingMiddleware)
+# Outermost, so it times everything including the other middlewares.
+app.add_middleware(MetricsMiddleware)
 
 
 @app.on_event("startup")
 def on_startup() -> None:
-    Base.metadata.create_all(bind=engine)
+    # Migrations run out of band (`alembic upgrade head`); only check we're on the right one.
+    started = perf_counter()
+    version: str | None = None
+    try:
+        version = current_schema_version()
+    except SQLAlchemyError:
+        logger.exception("Schema version check failed")
+    else:
+        if version != SCHEMA_VERSION:
+            logger.error(
+                "Database schema is at %s, expected %s; run `alembic upgrade head`.",
+                version,
+                SCHEMA_VERSION,
+            )
+    app.state.startup_report = startup_report(
+        schema_version=version,
+        schema_check_ms=(perf_counter() - started) * 1000,
+    )
+
+
+@app.on_event("shutdown")
+async def on_shutdown() -> None:
+    shutdown_pools()
+    await dispose_async_engines()
+    shutdown_tracing()
 
 
 @app.get("/")
@@ -66,88 +184,95 @@ def health() -> dict[str, str]:
     return {"status": "ok", "env": settings.app_env}
 
 
-def _build_zones() -> list[ZoneOut]:
-    zones: list[ZoneOut] = [
-        ZoneOut(
-            id="geo",
-            name=f"Tarifa (radio {settings.ebird_geo_dist_km} km)",
-            kind="geo",
-        )
-    ]
+@app.get("/metrics", include_in_schema=False)
+def metrics() -> Response:
+    return Response(render_metrics(), media_type="text/plain; version=0.0.4; charset=utf-8")
 
-    if not settings.ebird_api_key:
-        return zones
 
-    try:
-        hotspots = fetch_hotspots_geo(
-            lat=settings.ebird_geo_lat,
-            lng=settings.ebird_geo_lng,
-            dist_km=settings.ebird_geo_dist_km,
-            max_results=200,
-        )
-    except Exception:
-        return zones
-
-    # Prefer Spanish hotspots (Tarifa is on the border so geo search includes Morocco too).
-    hotspots_es = [hotspot for hotspot in hotspots if hotspot.country_code == "ES"]
-    if hotspots_es:
-        hotspots = hotspots_es
-
-    # Prefer hotspots with recent activity so predictions are meaningful.
-    cutoff_date = (datetime.now(timezone.utc) - timedelta(days=settings.ebird_geo_back_days)).date()
-    recent_hotspots = [
-        hotspot
-        for hotspot in hotspots
-        if hotspot.latest_obs_dt and hotspot.latest_obs_dt.date() >= cutoff_date
-    ]
-    if recent_hotspots:
-        hotspots = recent_hotspots
-
-    # Sort by eBird "popularity" signals first.
-    hotspots.sort(
-        key=lambda hotspot: (
-            -(hotspot.num_checklists_all_time or 0),
-            -(hotspot.num_species_all_time or 0),
-            -(hotspot.latest_obs_dt.timestamp() if hotspot.latest_obs_dt else 0),
-            hotspot.name.lower(),
-        )
-    )
+@app.get("/debug/profiles/{profile_id}", include_in_schema=False)
+def get_profile(
+    profile_id: str,
+    format: Literal["json", "folded"] = "json",
+    token: str | None = Header(default=None, alias=PROFILE_HEADER),
+) -> Response:
+    expected = settings.profiling_token.encode()
+    if not expected or token is None or not compare_digest(token.encode(), expected):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Profiling token required")
+    if not re.fullmatch(r"[0-9a-f]{12}", profile_id):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Profile not found")
+    path = profiles_dir() / f"{profile_id}.{format}"
+    if not path.exists():
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Profile not found")
+    if format == "folded":
+        return PlainTextResponse(path.read_text())
+    return Response(path.read_bytes(), media_type="application/json")
 
-    # Avoid an overwhelming dropdown: keep a few representative hotspots by coarse geo grid.
-    seen_cells: set[tuple[float, float]] = set()
-    picked = 0
-    for hotspot in hotspots:
-        cell = (round(hotspot.lat, 2), round(hotspot.lng, 2))
-        if cell in seen_cells:
-            continue
-        seen_cells.add(cell)
-        zones.append(ZoneOut(id=hotspot.id, name=hotspot.name, kind="hotspot"))
-        picked += 1
-        if picked >= 12:
-            break
 
-    return zones
+@app.get("/health/caches")
+def health_caches() -> dict[str, dict[str, int]]:
+    return cache_stats()
+
+
+@app.get("/health/upstreams")
+def health_upstreams() -> dict[str, dict[str, int | str]]:
+    return breaker_stats()
+
+
+@app.get("/health/quotas")
+def health_quotas() -> dict[str, dict[str, float | int | str]]:
+    return quota_stats()
+
+
+def region_from_query(
+    region: str | None = Query(default=None, max_length=40),
+    lat: float | None = Query(default=None, ge=-90, le=90),
+    lng: float | None = Query(default=None, ge=-180, le=180),
+    radius_km: float | None = Query(default=None, gt=0, le=50),
+) -> Region:
+    """Named region preset, or lat/lng (+ radius) snapped to the region grid."""
+    try:
+        return resolve_region(name=region, lat=lat, lng=lng, radius_km=radius_km)
+    except UnknownRegionError as exc:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(exc)) from exc
 
 
 @app.get("/zones", response_model=list[ZoneOut])
-def list_zones() -> list[ZoneOut]:
-    global _zones_cache, _zones_cache_ts
+def list_zones(region: Region = Depends(region_from_query)) -> list[ZoneOut]:
+    return get_zones(region)
 
-    now = time()
-    cached = _zones_cache
-    if cached is not None and (now - _zones_cache_ts) < ZONES_CACHE_TTL_S:
-        return cached
 
-    with _zones_cache_lock:
-        now = time()
-        cached = _zones_cache
-        if cached is not None and (now - _zones_cache_ts) < ZONES_CACHE_TTL_S:
-            return cached
+@app.get("/hotspots/nearest", response_model=list[NearbyHotspotOut])
+def nearest_hotspots(
+    lat: float = Query(ge=-90, le=90),
+    lng: float = Query(ge=-180, le=180),
+    k: int = Query(default=5, ge=1, le=50),
+    active_days: int = Query(default=30, ge=1, le=365),
+) -> list[NearbyHotspotOut]:
+    """Closest hotspots with an observation in the last ``active_days`` days."""
+    if not settings.ebird_api_key:
+        return []
+    # The widest region around the user, so the index covers everything eBird returns nearby.
+    region = resolve_region(lat=lat, lng=lng, radius_km=RADIUS_STEPS_KM[-1])
+    try:
+        index = region_hotspots(region)
+    except UpstreamUnavailableError as exc:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(exc)) from exc
+    except Exception as exc:
+        raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail="Could not load eBird hotspots.") from exc
 
-        zones = _build_zones()
-        _zones_cache = zones
-        _zones_cache_ts = now
-        return zones
+    since = (datetime.now(timezone.utc) - timedelta(days=active_days)).date()
+    nearest = index.nearest(lat, lng, k=k, where=lambda hotspot: is_active(hotspot, since))
+    return [
+        NearbyHotspotOut(
+            id=hotspot.id,
+            name=hotspot.name,
+            lat=hotspot.lat,
+            lng=hotspot.lng,
+            distance_km=round(distance_km, 3),
+            latest_obs_dt=hotspot.latest_obs_dt,
+        )
+        for distance_km, hotspot in nearest
+    ]
 
 
 @app.get("/birds/info", response_model=BirdInfoOut)
@@ -155,7 +280,10 @@ def get_bird_info(
     species: str = Query(min_length=2, max_length=120),
 ) -> BirdInfoOut:
     species = species.strip()
-    info = lookup_bird_info(species)
+    try:
+        info = lookup_bird_info(species)
+    except UpstreamUnavailableError:
+        info = None
     if not info:
         return BirdInfoOut(species=species)
     return BirdInfoOut(
@@ -168,67 +296,320 @@ def get_bird_info(
     )
 
 
+async def _store_variants(variants: list[ImageVariant], keys: list[str]) -> list[str]:
+    """Upload all sizes at once; if any of them fails, clean up the ones that made it."""
+    results = await asyncio.gather(
+        *(
+            run_storage_task(
+                upload_image_bytes,
+                key=variant_key,
+                payload=variant.payload,
+                content_type=variant.content_type,
+            )
+            for variant, variant_key in zip(variants, keys)
+        ),
+        return_exceptions=True,
+    )
+    errors = [result for result in results if isinstance(result, BaseException)]
+    if errors:
+        for variant_key, result in zip(keys, results):
+            if not isinstance(result, BaseException):
+                with suppress(Exception):
+                    await run_storage_task(delete_object, variant_key)
+        exc = errors[0]
+        if isinstance(exc, PoolSaturatedError):
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail=str(exc),
+                headers={"Retry-After": "2"},
+            ) from exc
+        if isinstance(exc, RuntimeError):
+            raise HTTPException(
+                status_code=status.HTTP_502_BAD_GATEWAY,
+                detail=str(exc),
+            ) from exc
+        raise exc
+    return [str(result) for result in results]
+
+
+def _photo_upload_out(row: PhotoObject) -> PhotoUploadOut:
+    return PhotoUploadOut(
+        photo_url=row.photo_url,
+        key=row.key,
+        content_type=row.content_type,
+        size_bytes=row.size_bytes,
+        variants=[PhotoVariant(**variant) for variant in row.variants or []],
+    )
+
+
 @app.post("/uploads/photo", response_model=PhotoUploadOut)
-async def upload_photo(file: UploadFile = File(...)) -> PhotoUploadOut:
-    if file.content_type not in ALLOWED_UPLOAD_TYPES:
+async def upload_photo(
+    file: UploadFile = File(...),
+    db: Session = Depends(get_db),
+) -> PhotoUploadOut:
+    max_bytes = settings.max_upload_mb * 1024 * 1024
+    try:
+        upload = await spool_upload(
+            file,
+            max_bytes=max_bytes,
+            memory_bytes=settings.upload_spool_kb * 1024,
+        )
+    except UnsupportedUploadError as exc:
         raise HTTPException(
             status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
-            detail="Unsupported image type. Use jpeg, png or webp.",
-        )
-
-    payload = await file.read()
-    await file.close()
+            detail=str(exc),
+        ) from exc
+    except UploadTooLargeError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=str(exc),
+        ) from exc
+    finally:
+        await file.close()
 
-    if not payload:
+    if not upload.size:
+        upload.close()
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Empty file payload.",
         )
 
-    max_bytes = settings.max_upload_mb * 1024 * 1024
-    if len(payload) > max_bytes:
+    # Same bytes already stored (retry, or the photo reused for another sighting)?
+    existing = await run_in_threadpool(claim_photo, db, upload.sha256)
+    if existing is not None:
+        upload.close()
+        return _photo_upload_out(existing)
+
+    content_type = upload.content_type
+    content_hash = upload.sha256
+    try:
+        payload = upload.read_bytes()
+    finally:
+        upload.close()
+
+    try:
+        variants = await run_image_task(
+            build_image_variants,
+            payload=payload,
+            content_type=content_type,
+            allow_avif=settings.image_avif,
+            orientation_mode=settings.image_orientation_mode,
+        )
+    except PoolSaturatedError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(exc),
+            headers={"Retry-After": "2"},
+        ) from exc
+    del payload
+
+    original = variants[0]
+    if len(original.payload) > max_bytes:
         raise HTTPException(
             status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
             detail=f"File exceeds {settings.max_upload_mb}MB limit.",
         )
 
-    payload = normalize_upload_image(payload=payload, content_type=file.content_type or "")
-    if len(payload) > max_bytes:
+    try:
+        key = build_photo_key(content_type)
+        variant_keys = [
+            key if variant.name == "original" else build_variant_key(key, variant.name, variant.content_type)
+            for variant in variants
+        ]
+    except ValueError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(exc),
+        ) from exc
+
+    results = await _store_variants(variants, variant_keys)
+    refs = [
+        PhotoVariant(
+            name=variant.name,
+            url=url,
+            content_type=variant.content_type,
+            width=variant.width,
+            height=variant.height,
+        ).model_dump()
+        for variant, url in zip(variants, results)
+    ]
+
+    row = await run_in_threadpool(
+        register_photo,
+        db,
+        content_hash=content_hash,
+        key=key,
+        photo_url=results[0],
+        content_type=content_type,
+        size_bytes=len(original.payload),
+        variants=refs,
+    )
+    if row.key != key:
+        # A concurrent upload of the same photo won the race.
+        for variant_key in variant_keys:
+            with suppress(Exception):
+                await run_storage_task(delete_object, variant_key)
+    return _photo_upload_out(row)
+
+
+@app.post("/uploads/presign", response_model=PhotoPresignOut)
+def presign_photo(payload: PhotoPresignIn) -> PhotoPresignOut:
+    """Let the browser POST the photo straight to S3; finish with /uploads/complete."""
+    max_bytes = settings.max_upload_mb * 1024 * 1024
+    if payload.size_bytes > max_bytes:
         raise HTTPException(
             status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
             detail=f"File exceeds {settings.max_upload_mb}MB limit.",
         )
 
+    key = build_photo_key(payload.content_type)
     try:
-        key = build_photo_key(file.content_type or "")
-        photo_url = upload_image_bytes(
-            key=key,
+        presigned = presign_photo_upload(key, payload.content_type, max_bytes)
+    except DirectUploadUnsupportedError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_501_NOT_IMPLEMENTED,
+            detail=str(exc),
+        ) from exc
+    except RuntimeError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_502_BAD_GATEWAY,
+            detail=str(exc),
+        ) from exc
+
+    return PhotoPresignOut(
+        key=key,
+        url=presigned["url"],
+        fields={name: str(value) for name, value in presigned["fields"].items()},
+        expires_in=settings.s3_presign_expires_s,
+        max_bytes=max_bytes,
+    )
+
+
+async def _process_direct_upload(key: str, photo_url: str) -> None:
+    """Generate display variants for a photo uploaded straight to S3.
+
+    The original is left as uploaded (the variants are rotated upright). The
+    photo is then indexed like a regular upload, with its variants, so
+    sightings created later pick them up (see ``create_sighting``); sightings
+    already pointing at it get them here. The variants always live under this
+    key, even when the same bytes are indexed under another one, so deleting
+    that other photo never takes them along.
+    """
+    try:
+        payload = await run_storage_task(download_object, key)
+        content_type = sniff_image_type(payload[:16])
+        if content_type is None:
+            logger.warning("Direct upload is not an image, deleting", extra={"s3_key": key})
+            await run_storage_task(delete_object, key)
+            return
+        content_hash = hashlib.sha256(payload).hexdigest()
+        size_bytes = len(payload)
+
+        variants = await run_image_task(
+            build_image_variants,
             payload=payload,
-            content_type=file.content_type or "application/octet-stream",
+            content_type=content_type,
+            allow_avif=settings.image_avif,
+            orientation_mode="keep",
         )
-    except ValueError as exc:
+        del payload
+        original, display = variants[0], variants[1:]
+        urls = await _store_variants(
+            display,
+            [build_variant_key(key, variant.name, variant.content_type) for variant in display],
+        )
+        refs = [
+            PhotoVariant(
+                name="original",
+                url=photo_url,
+                content_type=original.content_type,
+                width=original.width,
+                height=original.height,
+            ).model_dump(),
+            *(
+                PhotoVariant(
+                    name=variant.name,
+                    url=url,
+                    content_type=variant.content_type,
+                    width=variant.width,
+                    height=variant.height,
+                ).model_dump()
+                for variant, url in zip(display, urls)
+            ),
+        ]
+    except Exception:
+        logger.exception("Post-processing of direct upload failed", extra={"s3_key": key})
+        return
+
+    def attach() -> None:
+        with SessionLocal() as db:
+            index_photo(
+                db,
+                content_hash=content_hash,
+                key=key,
+                photo_url=photo_url,
+                content_type=content_type,
+                size_bytes=size_bytes,
+                variants=refs,
+            )
+            # Sightings created while the variants were being built.
+            db.execute(
+                update(Sighting)
+                .where(Sighting.photo_url == photo_url, Sighting.photo_variants.is_(None))
+                .values(photo_variants=refs)
+            )
+            db.commit()
+
+    await run_in_threadpool(attach)
+
+
+@app.post("/uploads/complete", response_model=PhotoUploadOut)
+def complete_photo_upload(payload: PhotoCompleteIn, background_tasks: BackgroundTasks) -> PhotoUploadOut:
+    if not is_photo_key(payload.key):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail=str(exc),
-        ) from exc
+            detail="Unknown photo key.",
+        )
+
+    try:
+        meta = head_object(payload.key)
     except RuntimeError as exc:
         raise HTTPException(
             status_code=status.HTTP_502_BAD_GATEWAY,
             detail=str(exc),
         ) from exc
+    if meta is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Photo was not uploaded.",
+        )
+    if meta["size_bytes"] > settings.max_upload_mb * 1024 * 1024:
+        with suppress(RuntimeError):
+            delete_object(payload.key)
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"File exceeds {settings.max_upload_mb}MB limit.",
+        )
 
+    photo_url = public_url_for_key(payload.key)
+    background_tasks.add_task(_process_direct_upload, payload.key, photo_url)
     return PhotoUploadOut(
         photo_url=photo_url,
-        key=key,
-        content_type=file.content_type or "",
-        size_bytes=len(payload),
+        key=payload.key,
+        content_type=meta["content_type"],
+        size_bytes=meta["size_bytes"],
+        processing=True,
     )
 
 
 @app.delete("/uploads/photo", response_model=PhotoDeleteOut)
-def delete_photo(payload: PhotoDeleteIn) -> PhotoDeleteOut:
+def delete_photo(payload: PhotoDeleteIn, db: Session = Depends(get_db)) -> PhotoDeleteOut:
+    if release_photo(db, payload.key) is False:
+        # Still used by another upload of the same photo.
+        return PhotoDeleteOut(deleted=False)
+
     try:
-        delete_object(payload.key)
+        delete_objects([payload.key, *variant_keys_for(payload.key)])
     except RuntimeError as exc:
         raise HTTPException(
             status_code=status.HTTP_502_BAD_GATEWAY,
@@ -237,28 +618,87 @@ def delete_photo(payload: PhotoDeleteIn) -> PhotoDeleteOut:
     return PhotoDeleteOut(deleted=True)
 
 
+@app.get(local_storage.MEDIA_ROUTE_PREFIX + "/{key:path}", include_in_schema=False)
+def serve_media(key: str) -> FileResponse:
+    """Serve photos stored by the local backend (sendfile, Range, immutable caching)."""
+    if settings.storage_backend != "local":
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    try:
+        path = local_storage.path_for_key(key)
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found") from exc
+    if not path.is_file():
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    return FileResponse(path, headers={"Cache-Control": IMMUTABLE_CACHE_CONTROL})
+
+
 @app.post("/sightings", response_model=SightingOut, status_code=status.HTTP_201_CREATED)
-def create_sighting(payload: SightingCreate, db: Session = Depends(get_db)) -> Sighting:
+async def create_sighting(payload: SightingCreate, db: AsyncSession = Depends(get_async_db)) -> Sighting:
+    photo_url = payload.photo_url.strip() if payload.photo_url else None
+    photo_variants = (
+        [variant.model_dump() for variant in payload.photo_variants] if payload.photo_variants else None
+    )
+    photo_key = key_for_public_url(photo_url) if photo_url else None
+    if photo_variants is None and photo_key:
+        # Direct uploads get their variants after /uploads/complete answered; they're indexed by key.
+        photo_variants = await db.scalar(select(PhotoObject.variants).where(PhotoObject.key == photo_key))
     record = Sighting(
         zone=payload.zone.strip(),
         species_guess=(payload.species_guess.strip() if payload.species_guess else None),
         notes=(payload.notes.strip() if payload.notes else None),
-        photo_url=(payload.photo_url.strip() if payload.photo_url else None),
+        photo_url=photo_url,
+        photo_variants=photo_variants,
         observed_at=payload.observed_at or datetime.now(timezone.utc),
     )
     db.add(record)
-    db.commit()
-    db.refresh(record)
+    await db.commit()
+    await db.refresh(record)
     return record
 
 
 @app.get("/sightings", response_model=list[SightingOut])
-def list_sightings(
+async def list_sightings(
     limit: int = Query(default=50, ge=1, le=200),
-    db: Session = Depends(get_db),
-) -> list[Sighting]:
-    stmt = select(Sighting).order_by(Sighting.observed_at.desc()).limit(limit)
-    return list(db.scalars(stmt).all())
+    db: AsyncSession = Depends(get_async_read_db),
+) -> JSONResponse:
+    # Columns straight to JSON: no ORM objects and no SightingOut validation per row.
+    stmt = (
+        select(
+            Sighting.id,
+            Sighting.created_at,
+            Sighting.observed_at,
+            Sighting.zone,
+            Sighting.species_guess,
+            Sighting.notes,
+            Sighting.photo_url,
+            Sighting.photo_variants,
+        )
+        .order_by(Sighting.observed_at.desc())
+        .limit(limit)
+    )
+    rows = (await db.execute(stmt)).all()
+    return JSONResponse(
+        [
+            {
+                **row._asdict(),
+                "photo_variants": (
+                    [
+                        {
+                            "name": variant["name"],
+                            "url": variant["url"],
+                            "content_type": variant["content_type"],
+                            "width": variant.get("width"),
+                            "height": variant.get("height"),
+                        }
+                        for variant in row.photo_variants
+                    ]
+                    if row.photo_variants is not None
+                    else None
+                ),
+            }
+            for row in rows
+        ]
+    )
 
 
 @app.post(
@@ -296,14 +736,63 @@ def create_prediction_rule(
     return payload
 
 
+def _ebird_predictions(
+    *,
+    region: Region,
+    zone_id: str,
+    scope: str,
+    month: int,
+    limit: int,
+) -> list[PredictionOut]:
+    """eBird-based predictions for the region's geo zone or one hotspot, cached per region."""
+
+    def build() -> list[PredictionOut]:
+        back_days = settings.ebird_geo_back_days
+        if zone_id == "geo":
+            observations = region_observations(region, back_days=back_days)
+        else:
+            observations = hotspot_observations(zone_id, back_days=back_days)
+        rows, confidence, fallback_used, _reason = observations_to_predictions(
+            observations=observations,
+            requested_month=month,
+            back_days=back_days,
+            limit=limit,
+            scope=scope,
+        )
+        predictions = [
+            PredictionOut(
+                species=row["species"],
+                score=int(row["score"]),
+                reason=str(row["reason"]),
+                confidence=confidence,  # type: ignore[arg-type]
+                fallback_used=fallback_used,
+                observations_count=(
+                    int(row["observations_count"])
+                    if row.get("observations_count") is not None
+                    else None
+                ),
+                last_seen_days_ago=(
+                    int(row["last_seen_days_ago"])
+                    if row.get("last_seen_days_ago") is not None
+                    else None
+                ),
+            )
+            for row in rows
+        ]
+        return predictions
+
+    return predictions_cache.get_or_create((region.key, zone_id, scope, month, limit), build)
+
+
 @app.get("/predictions", response_model=list[PredictionOut])
-def get_predictions(
+async def get_predictions(
     zone: str = Query(min_length=2, max_length=120),
     zone_id: str | None = Query(default=None, max_length=80),
     month: int = Query(ge=1, le=12),
     limit: int = Query(default=10, ge=1, le=50),
-    db: Session = Depends(get_db),
-) -> list[PredictionOut]:
+    region: Region = Depends(region_from_query),
+    db: AsyncSession = Depends(get_async_read_db),
+) -> JSONResponse | list[PredictionOut]:
     month_name = (
         "enero",
         "febrero",
@@ -319,7 +808,7 @@ def get_predictions(
         "diciembre",
     )[month - 1]
 
-    def query_rules(
+    async def query_rules(
         *,
         months: list[int] | None,
     ):
@@ -337,81 +826,55 @@ def get_predictions(
             .order_by(func.sum(PredictionRule.weight).desc(), PredictionRule.species.asc())
             .limit(limit)
         )
-        return db.execute(stmt).all()
+        with tracer.start_as_current_span("query_rules", attributes={"zone": zone, "months": months or []}) as span:
+            rows = (await db.execute(stmt)).all()
+            span.set_attribute("rows", len(rows))
+        return rows
 
-    def build(rows, *, confidence: str, fallback_used: bool, reason: str) -> list[PredictionOut]:
-        return [
-            PredictionOut(
-                species=row.species,
-                score=int(row.score),
-                reason=reason,
-                confidence=confidence,  # type: ignore[arg-type]
-                fallback_used=fallback_used,
-                observations_count=None,
-                last_seen_days_ago=None,
-            )
-            for row in rows
-        ]
+    def build(rows, *, confidence: str, fallback_used: bool, reason: str) -> JSONResponse:
+        # PredictionOut's fields, written out directly instead of validated per row.
+        return JSONResponse(
+            [
+                {
+                    "species": row.species,
+                    "score": int(row.score),
+                    "reason": reason,
+                    "confidence": confidence,
+                    "fallback_used": fallback_used,
+                    "observations_count": None,
+                    "last_seen_days_ago": None,
+                }
+                for row in rows
+            ]
+        )
 
     zone_id_value = (zone_id or "").strip()
 
     # eBird zone-aware predictions (when the UI passes a zone_id).
     if settings.ebird_api_key and zone_id_value:
+        back_days = settings.ebird_geo_back_days
+        if zone_id_value == "geo":
+            scope = f"{zone} (radio {region.dist_km} km, {back_days} días)"
+        else:
+            scope = f"{zone} (hotspot, {back_days} días)"
         try:
-            if zone_id_value == "geo":
-                observations = fetch_recent_geo_observations(
-                    lat=settings.ebird_geo_lat,
-                    lng=settings.ebird_geo_lng,
-                    dist_km=settings.ebird_geo_dist_km,
-                    back_days=settings.ebird_geo_back_days,
-                    max_results=200,
-                )
-                scope = (
-                    f"{zone} (radio {settings.ebird_geo_dist_km} km, "
-                    f"{settings.ebird_geo_back_days} días)"
-                )
-            else:
-                observations = fetch_recent_location_observations(
-                    loc_id=zone_id_value,
-                    back_days=settings.ebird_geo_back_days,
-                    max_results=200,
-                )
-                scope = f"{zone} (hotspot, {settings.ebird_geo_back_days} días)"
-
-            rows, confidence, fallback_used, _reason = observations_to_predictions(
-                observations=observations,
-                requested_month=month,
-                back_days=settings.ebird_geo_back_days,
-                limit=limit,
+            # eBird calls are blocking httpx requests; keep them off the event loop.
+            predictions = await run_in_threadpool(
+                _ebird_predictions,
+                region=region,
+                zone_id=zone_id_value,
                 scope=scope,
+                month=month,
+                limit=limit,
             )
-            if rows:
-                return [
-                    PredictionOut(
-                        species=row["species"],
-                        score=int(row["score"]),
-                        reason=str(row["reason"]),
-                        confidence=confidence,  # type: ignore[arg-type]
-                        fallback_used=fallback_used,
-                        observations_count=(
-                            int(row["observations_count"])
-                            if row.get("observations_count") is not None
-                            else None
-                        ),
-                        last_seen_days_ago=(
-                            int(row["last_seen_days_ago"])
-                            if row.get("last_seen_days_ago") is not None
-                            else None
-                        ),
-                    )
-                    for row in rows
-                ]
+            if predictions:
+                return JSONResponse(predictions)
         except Exception:
             # If eBird fails we still allow rules-based fallback.
             pass
 
     # 1) Exact rules
-    exact_rows = query_rules(months=[month])
+    exact_rows = await query_rules(months=[month])
     if exact_rows:
         return build(
             exact_rows,
@@ -423,7 +886,7 @@ def get_predictions(
     # 2) Neighbor months (fallback)
     prev_month = 12 if month == 1 else month - 1
     next_month = 1 if month == 12 else month + 1
-    neighbor_rows = query_rules(months=[prev_month, next_month])
+    neighbor_rows = await query_rules(months=[prev_month, next_month])
     if neighbor_rows:
         return build(
             neighbor_rows,
@@ -433,7 +896,7 @@ def get_predictions(
         )
 
     # 3) Zone-only fallback
-    zone_rows = query_rules(months=None)
+    zone_rows = await query_rules(months=None)
     if zone_rows:
         return build(
             zone_rows,
@@ -442,46 +905,19 @@ def get_predictions(
             reason=f"reglas (fallback): {zone}, mostrando base general",
         )
 
-    # 5) External fallback: eBird recent observations near the configured point.
+    # 5) External fallback: eBird recent observations around the region's point.
     if settings.ebird_api_key:
         try:
-            observations = fetch_recent_geo_observations(
-                lat=settings.ebird_geo_lat,
-                lng=settings.ebird_geo_lng,
-                dist_km=settings.ebird_geo_dist_km,
-                back_days=settings.ebird_geo_back_days,
-                max_results=200,
-            )
-            rows, confidence, fallback_used, _reason = observations_to_predictions(
-                observations=observations,
-                requested_month=month,
-                back_days=settings.ebird_geo_back_days,
-                limit=limit,
-                scope=(
-                    f"Tarifa (radio {settings.ebird_geo_dist_km} km, "
-                    f"{settings.ebird_geo_back_days} días)"
-                ),
-            )
-            return [
-                PredictionOut(
-                    species=row["species"],
-                    score=int(row["score"]),
-                    reason=str(row["reason"]),
-                    confidence=confidence,  # type: ignore[arg-type]
-                    fallback_used=fallback_used,
-                    observations_count=(
-                        int(row["observations_count"])
-                        if row.get("observations_count") is not None
-                        else None
-                    ),
-                    last_seen_days_ago=(
-                        int(row["last_seen_days_ago"])
-                        if row.get("last_seen_days_ago") is not None
-                        else None
-                    ),
+            return JSONResponse(
+                await run_in_threadpool(
+                    _ebird_predictions,
+                    region=region,
+                    zone_id="geo",
+                    scope=f"{region.name} (radio {region.dist_km} km, {settings.ebird_geo_back_days} días)",
+                    month=month,
+                    limit=limit,
                 )
-                for row in rows
-            ]
+            )
         except Exception:
             # Keep the endpoint stable; external sources should never hard-fail the API.
             return []
@@ -489,6 +925,109 @@ def get_predictions(
     return []
 
 
+OVERVIEW_SPECIES_PER_ZONE = 50
+
+
+def _zone_species(region: Region, zone: ZoneOut, month: int) -> list[dict[str, Any]]:
+    back_days = settings.ebird_geo_back_days
+    if zone.kind == "geo":
+        observations = region_observations(region, back_days=back_days)
+    else:
+        observations = hotspot_observations(zone.id, back_days=back_days)
+    rows, _confidence, _fallback_used, _reason = observations_to_predictions(
+        observations=observations,
+        requested_month=month,
+        back_days=back_days,
+        limit=OVERVIEW_SPECIES_PER_ZONE,
+        scope=zone.name,
+    )
+    return rows
+
+
+@app.get("/predictions/overview", response_model=PredictionsOverviewOut)
+async def get_predictions_overview(
+    month: int = Query(ge=1, le=12),
+    limit: int = Query(default=30, ge=1, le=200),
+    region: Region = Depends(region_from_query),
+) -> PredictionsOverviewOut:
+    """eBird species across every zone of the region, with the zone where each is most likely.
+
+    Zones are queried concurrently (``OVERVIEW_CONCURRENCY`` at a time), each with an
+    ``OVERVIEW_CALL_TIMEOUT_S`` deadline; slow or failing zones are reported in ``zones`` and left out of
+    the aggregate instead of failing the request.
+    """
+    # The first call for a region reads its snapshot from the database; keep that off the event loop.
+    zones = await run_in_threadpool(get_zones, region)
+    if not settings.ebird_api_key:
+        return PredictionsOverviewOut(region=region.key, month=month, partial=False, zones=[], species=[])
+
+    semaphore = asyncio.Semaphore(max(1, settings.overview_concurrency))
+
+    async def fetch(zone: ZoneOut) -> tuple[ZoneOverviewStatus, list[dict[str, Any]]]:
+        async with semaphore:
+            started = perf_counter()
+            rows: list[dict[str, Any]] = []
+            try:
+                # The thread's eBird calls get the same deadline, so a timed-out one doesn't linger.
+                with latency_budget(settings.overview_call_timeout_s):
+                    rows = await asyncio.wait_for(
+                        run_in_threadpool(_zone_species, region, zone, month),
+                        timeout=settings.overview_call_timeout_s,
+                    )
+                outcome = "ok"
+            except asyncio.TimeoutError:
+                outcome = "timeout"
+            except UpstreamUnavailableError:
+                outcome = "unavailable"
+            except Exception:
+                logger.warning("Overview lookup failed", extra={"zone_id": zone.id}, exc_info=True)
+                outcome = "error"
+            zone_status = ZoneOverviewStatus(
+                zone_id=zone.id,
+                zone_name=zone.name,
+                status=outcome,  # type: ignore[arg-type]
+                species_count=len(rows),
+                elapsed_ms=round((perf_counter() - started) * 1000, 1),
+            )
+            return zone_status, rows
+
+    results = await asyncio.gather(*(fetch(zone) for zone in zones))
+
+    best: dict[str, SpeciesOverview] = {}
+    for zone_status, rows in results:
+        for row in rows:
+            species = row["species"]
+            score = int(row["score"])
+            observations = int(row.get("observations_count") or 0)
+            current = best.get(species)
+            if current is None:
+                best[species] = SpeciesOverview(
+                    species=species,
+                    best_zone_id=zone_status.zone_id,
+                    best_zone_name=zone_status.zone_name,
+                    best_score=score,
+                    zones_count=1,
+                    observations_count=observations,
+                )
+                continue
+            current.zones_count += 1
+            current.observations_count += observations
+            if score > current.best_score:
+                current.best_zone_id = zone_status.zone_id
+                current.best_zone_name = zone_status.zone_name
+                current.best_score = score
+
+    ranked = sorted(best.values(), key=lambda item: (-item.best_score, -item.zones_count, item.species.lower()))
+    statuses = [zone_status for zone_status, _rows in results]
+    return PredictionsOverviewOut(
+        region=region.key,
+        month=month,
+        partial=any(zone_status.status != "ok" for zone_status in statuses),
+        zones=statuses,
+        species=ranked[:limit],
+    )
+
+
 @app.post("/prediction-rules/seed", response_model=SeedResult)
 def seed_prediction_rules(db: Session = Depends(get_db)) -> SeedResult:
     sample_rules = [
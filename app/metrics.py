@@ -0,0 +1,215 @@
+"""Prometheus metrics served at ``GET /metrics``.
+
+Hot paths only touch prometheus_client histograms and counters, which are
+a lock and a few additions each. Cache, circuit breaker and quota numbers
+are read from their own counters when scraped (``_StatsCollector``), so
+they cost nothing per request.
+
+With several uvicorn workers, set ``PROMETHEUS_MULTIPROC_DIR`` to an empty
+directory shared by them. Histograms and counters are then summed across
+workers; the scrape-time numbers come from whichever worker answered.
+"""
+from __future__ import annotations
+
+from collections.abc import Iterator
+from contextlib import contextmanager
+import os
+from time import perf_counter
+from typing import Any
+
+from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram, generate_latest
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+from prometheus_client.registry import REGISTRY, Collector
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from opentelemetry.trace import SpanKind, Status, StatusCode
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from . import profiling
+from .tracing import tracer
+
+
+# Upstream and storage calls take 50 ms to several seconds; DB queries and CPU work are faster.
+SLOW_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0)
+FAST_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+HTTP_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route template and status code.",
+    ("method", "route", "status"),
+    buckets=SLOW_BUCKETS,
+)
+HTTP_IN_PROGRESS = Gauge(
+    "http_requests_in_progress",
+    "HTTP requests being served.",
+    ("method",),
+    multiprocess_mode="livesum",
+)
+UPSTREAM_DURATION = Histogram(
+    "upstream_request_duration_seconds",
+    "eBird/Wikipedia HTTP call latency; outcome is ok or error.",
+    ("upstream", "operation", "outcome"),
+    buckets=SLOW_BUCKETS,
+)
+UPSTREAM_REJECTED = Counter(
+    "upstream_requests_rejected_total",
+    "Upstream calls not made: circuit open, quota exhausted or latency budget spent.",
+    ("upstream", "operation", "reason"),
+)
+STORAGE_DURATION = Histogram(
+    "storage_request_duration_seconds",
+    "Object storage call latency.",
+    ("backend", "operation", "outcome"),
+    buckets=SLOW_BUCKETS,
+)
+DB_QUERY_DURATION = Histogram(
+    "db_query_duration_seconds",
+    "Database statement latency.",
+    ("role", "statement"),
+    buckets=FAST_BUCKETS,
+)
+DB_QUERY_ERRORS = Counter("db_query_errors_total", "Failed database statements.", ("role",))
+IMAGE_CPU = Histogram(
+    "image_task_cpu_seconds",
+    "CPU time of image processing tasks in the worker process.",
+    ("task",),
+    buckets=FAST_BUCKETS + (5.0, 10.0),
+)
+
+
+class MetricsMiddleware:
+    """Time every HTTP request, labelled with its route template (not the raw path)."""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status_code = 500
+        started = perf_counter()
+
+        async def recording_send(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        in_progress = HTTP_IN_PROGRESS.labels(method)
+        in_progress.inc()
+        try:
+            await self.app(scope, receive, recording_send)
+        finally:
+            in_progress.dec()
+            # The router stores the matched route in the scope; unmatched paths share one label.
+            route = getattr(scope.get("route"), "path", "unmatched")
+            HTTP_DURATION.labels(method, route, str(status_code)).observe(perf_counter() - started)
+
+
+@contextmanager
+def observe_storage(backend: str, operation: str) -> Iterator[None]:
+    """Time and trace one object storage call."""
+    started = perf_counter()
+    outcome = "error"
+    with tracer.start_as_current_span(
+        f"storage.{operation}", kind=SpanKind.CLIENT, attributes={"storage.backend": backend}
+    ):
+        try:
+            yield
+            outcome = "ok"
+        finally:
+            STORAGE_DURATION.labels(backend, operation, outcome).observe(perf_counter() - started)
+
+
+def _statement_kind(statement: str) -> str:
+    verb = statement.lstrip().split(None, 1)[0].lower() if statement.strip() else ""
+    return verb if verb in ("select", "insert", "update", "delete") else "other"
+
+
+def instrument_engine(engine: Engine, *, role: str) -> None:
+    """Time and trace every statement run on ``engine`` (pass ``async_engine.sync_engine`` for async ones)."""
+    system = engine.dialect.name
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _started(conn: Any, cursor: Any, statement: str, parameters: Any, context: Any, executemany: bool) -> None:
+        span = tracer.start_span(
+            f"db.{_statement_kind(statement)}",
+            kind=SpanKind.CLIENT,
+            attributes={"db.system": system, "db.role": role, "db.statement": statement},
+        )
+        conn.info.setdefault("query_started", []).append((perf_counter(), span))
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _finished(conn: Any, cursor: Any, statement: str, parameters: Any, context: Any, executemany: bool) -> None:
+        started, span = conn.info["query_started"].pop()
+        elapsed = perf_counter() - started
+        span.end()
+        kind = _statement_kind(statement)
+        DB_QUERY_DURATION.labels(role, kind).observe(elapsed)
+        profiling.record("db", kind, started, elapsed, role=role, statement=statement)
+
+    @event.listens_for(engine, "handle_error")
+    def _failed(context: Any) -> None:
+        DB_QUERY_ERRORS.labels(role).inc()
+        stack = context.connection.info.get("query_started") if context.connection is not None else None
+        if stack:
+            _, span = stack.pop()
+            span.set_status(Status(StatusCode.ERROR, type(context.original_exception).__name__))
+            span.end()
+
+
+class _StatsCollector(Collector):
+    """Cache, circuit breaker and quota state, read from their own counters at scrape time."""
+
+    def describe(self) -> list[Any]:
+        # Keeps the registry from calling collect() at import time.
+        return []
+
+    def collect(self) -> Iterator[Any]:
+        # Imported here: these modules import the DB layer, which imports this module.
+        from .cache import cache_stats
+        from .quotas import quota_stats
+        from .upstreams import breaker_stats
+
+        requests = CounterMetricFamily("cache_requests", "Cache lookups by result.", labels=("cache", "result"))
+        evictions = CounterMetricFamily("cache_evictions", "Entries evicted to stay under maxsize.", labels=("cache",))
+        entries = GaugeMetricFamily("cache_entries", "Entries in the in-process tier.", labels=("cache",))
+        for name, stats in cache_stats().items():
+            requests.add_metric((name, "hit"), stats["hits"])
+            requests.add_metric((name, "shared_hit"), stats["shared_hits"])
+            requests.add_metric((name, "miss"), stats["misses"])
+            evictions.add_metric((name,), stats["evictions"])
+            entries.add_metric((name,), stats["size"])
+        yield from (requests, evictions, entries)
+
+        states = {"closed": 0, "half_open": 1, "open": 2}
+        circuit = GaugeMetricFamily(
+            "upstream_circuit_state", "Circuit breaker state: 0 closed, 1 half-open, 2 open.", labels=("upstream",)
+        )
+        for name, stats in breaker_stats().items():
+            circuit.add_metric((name,), states[str(stats["state"])])
+        yield circuit
+
+        tokens = GaugeMetricFamily("upstream_quota_tokens", "Tokens left in the upstream quota.", labels=("upstream",))
+        for name, stats in quota_stats().items():
+            tokens.add_metric((name,), float(stats["remaining"]))
+        yield tokens
+
+
+_stats_collector = _StatsCollector()
+REGISTRY.register(_stats_collector)
+
+
+def render_metrics() -> bytes:
+    """Text exposition for ``GET /metrics``."""
+    if "PROMETHEUS_MULTIPROC_DIR" not in os.environ:
+        return generate_latest(REGISTRY)
+    from prometheus_client import multiprocess
+
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    registry.register(_stats_collector)
+    return generate_latest(registry)
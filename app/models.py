@@ -1,6 +1,6 @@
 from datetime import datetime
 
-from sqlalchemy import Index, Integer, String, Text, UniqueConstraint, func
+from sqlalchemy import JSON, Float, Index, Integer, String, Text, UniqueConstraint, func
 from sqlalchemy.orm import Mapped, mapped_column
 from sqlalchemy.sql.sqltypes import DateTime
 
@@ -21,6 +21,7 @@ class Sighting(Base):
     species_guess: Mapped[str | None] = mapped_column(String(120), nullable=True)
     notes: Mapped[str | None] = mapped_column(Text, nullable=True)
     photo_url: Mapped[str | None] = mapped_column(String(1024), nullable=True)
+    photo_variants: Mapped[list[dict] | None] = mapped_column(JSON(none_as_null=True), nullable=True)
 
 
 class PredictionRule(Base):
@@ -45,3 +46,45 @@ class PredictionRule(Base):
     hour_bucket: Mapped[str] = mapped_column(String(24), nullable=False)
     species: Mapped[str] = mapped_column(String(120), nullable=False)
     weight: Mapped[int] = mapped_column(Integer, default=1, nullable=False)
+
+
+class PhotoObject(Base):
+    """Content-addressed index of stored photos (sha256 of the uploaded bytes)."""
+
+    __tablename__ = "photo_objects"
+
+    content_hash: Mapped[str] = mapped_column(String(64), primary_key=True)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), nullable=False
+    )
+    key: Mapped[str] = mapped_column(String(1024), unique=True, nullable=False)
+    photo_url: Mapped[str] = mapped_column(String(1024), nullable=False)
+    content_type: Mapped[str] = mapped_column(String(64), nullable=False)
+    size_bytes: Mapped[int] = mapped_column(Integer, nullable=False)
+    # Bumped on every claim, so the orphan GC leaves just-reused photos alone.
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False
+    )
+    variants: Mapped[list[dict] | None] = mapped_column(JSON(none_as_null=True), nullable=True)
+    ref_count: Mapped[int] = mapped_column(Integer, default=1, nullable=False)
+
+
+class CacheSnapshot(Base):
+    """Last good value of a slow-to-build response, shared by all workers (see app.zones)."""
+
+    __tablename__ = "cache_snapshots"
+
+    name: Mapped[str] = mapped_column(String(120), primary_key=True)
+    payload: Mapped[list | dict] = mapped_column(JSON, nullable=False)
+    refreshed_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+
+
+class RateLimitBucket(Base):
+    """Token bucket shared by all workers for one upstream's API quota (see app.quotas)."""
+
+    __tablename__ = "rate_limit_buckets"
+
+    name: Mapped[str] = mapped_column(String(60), primary_key=True)
+    tokens: Mapped[float] = mapped_column(Float, nullable=False)
+    # Unix time of the last refill; compared across processes, so not monotonic.
+    updated_at: Mapped[float] = mapped_column(Float, nullable=False)
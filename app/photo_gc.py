@@ -0,0 +1,172 @@
+"""Garbage-collect photos that were uploaded but never attached to a sighting.
+
+Abandoned ``SightingComposer`` sessions leave objects under ``sightings/``
+that nothing references. This pages through the bucket, compares each page
+against the set of keys referenced by sightings (loaded once, then topped
+up with sightings created during the run) and deletes orphans older than
+the grace period in batches of 1000. Each batch first drops the photo index
+rows not claimed within the grace period; objects whose row survives (a
+dedup claim during the run) are kept. Run it from a cron job or by hand:
+
+    python -m app.photo_gc --dry-run
+    python -m app.photo_gc --grace-hours 48
+"""
+from __future__ import annotations
+
+import argparse
+from dataclasses import asdict, dataclass
+from datetime import datetime, timedelta, timezone
+import json
+import logging
+from time import perf_counter
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.orm import Session
+
+from .db import SessionLocal
+from .models import PhotoObject, Sighting
+from .storage import (
+    DELETE_BATCH_SIZE,
+    delete_objects,
+    key_for_public_url,
+    list_objects,
+    variant_keys_for,
+)
+from .storage.keys import CONTENT_TYPE_TO_EXTENSION
+
+
+logger = logging.getLogger(__name__)
+
+PHOTO_PREFIX = "sightings/"
+
+
+@dataclass
+class GcReport:
+    dry_run: bool
+    scanned: int = 0
+    orphaned: int = 0
+    deleted: int = 0
+    bytes_freed: int = 0
+    elapsed_s: float = 0.0
+
+    @property
+    def objects_per_s(self) -> float:
+        return self.scanned / self.elapsed_s if self.elapsed_s else 0.0
+
+
+def _stem(key: str) -> str:
+    # "<uuid>.jpg" and its "<uuid>_sm.webp" variants share the "<uuid>" stem.
+    stem = key.rsplit(".", 1)[0]
+    for suffix in ("_md", "_sm"):
+        if stem.endswith(suffix):
+            return stem[: -len(suffix)]
+    return stem
+
+
+def _referenced_keys(db: Session, *, after_id: int = 0) -> set[str]:
+    """Every key a sighting (with id above ``after_id``) points at, including all possible variant keys."""
+    referenced: set[str] = set()
+    stmt = (
+        select(Sighting.photo_url, Sighting.photo_variants)
+        .where(Sighting.photo_url.is_not(None), Sighting.id > after_id)
+        .execution_options(yield_per=1000)
+    )
+    for photo_url, photo_variants in db.execute(stmt):
+        key = key_for_public_url(photo_url)
+        if key:
+            referenced.add(key)
+            referenced.update(variant_keys_for(key))
+        for variant in photo_variants or []:
+            variant_key = key_for_public_url(str(variant.get("url") or ""))
+            if variant_key:
+                referenced.add(variant_key)
+    return referenced
+
+
+def _original_keys(key: str) -> list[str]:
+    # The index is keyed by originals; a variant belongs to whichever original shares its stem.
+    stem = _stem(key)
+    return [f"{stem}.{extension}" for extension in CONTENT_TYPE_TO_EXTENSION.values()]
+
+
+def _release_index_rows(db: Session, keys: list[str], cutoff: datetime, *, dry_run: bool) -> set[str]:
+    """Drop index rows of these photos not claimed since ``cutoff``; return the originals still indexed."""
+    originals = {original for key in keys for original in _original_keys(key)}
+    indexed = set(db.scalars(select(PhotoObject.key).where(PhotoObject.key.in_(originals))))
+    if dry_run:
+        recent = select(PhotoObject.key).where(PhotoObject.key.in_(indexed), PhotoObject.updated_at >= cutoff)
+        return set(db.scalars(recent))
+    # Deleted before the objects, so from here on dedup can't hand them out.
+    removed = set(
+        db.scalars(
+            delete(PhotoObject)
+            .where(PhotoObject.key.in_(indexed), PhotoObject.updated_at < cutoff)
+            .returning(PhotoObject.key)
+        )
+    )
+    db.commit()
+    return indexed - removed
+
+
+def collect_orphaned_photos(*, grace: timedelta, dry_run: bool = False) -> GcReport:
+    report = GcReport(dry_run=dry_run)
+    started = perf_counter()
+    cutoff = datetime.now(timezone.utc) - grace
+
+    with SessionLocal() as db:
+        last_sighting_id = db.scalar(select(func.max(Sighting.id))) or 0
+        referenced = _referenced_keys(db)
+
+        pending: list[dict] = []
+
+        def flush() -> None:
+            nonlocal last_sighting_id
+            # Sightings created during the listing may point at a photo claimed since it started.
+            newest = db.scalar(select(func.max(Sighting.id))) or 0
+            if newest > last_sighting_id:
+                referenced.update(_referenced_keys(db, after_id=last_sighting_id))
+                last_sighting_id = newest
+            candidates = [item for item in pending if item["key"] not in referenced]
+            pending.clear()
+            if not candidates:
+                return
+            still_indexed = _release_index_rows(
+                db, [item["key"] for item in candidates], cutoff, dry_run=dry_run
+            )
+            orphans = [
+                item for item in candidates if not still_indexed.intersection(_original_keys(item["key"]))
+            ]
+            report.orphaned += len(orphans)
+            report.bytes_freed += sum(item["size_bytes"] for item in orphans)
+            if orphans and not dry_run:
+                report.deleted += delete_objects([item["key"] for item in orphans])
+
+        for page in list_objects(PHOTO_PREFIX):
+            report.scanned += len(page)
+            for item in page:
+                if item["key"] in referenced or item["last_modified"] >= cutoff:
+                    continue
+                pending.append(item)
+                if len(pending) >= DELETE_BATCH_SIZE:
+                    flush()
+        if pending:
+            flush()
+
+    report.elapsed_s = perf_counter() - started
+    logger.info("Photo GC finished", extra=asdict(report))
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Delete photos no sighting references.")
+    parser.add_argument("--grace-hours", type=float, default=24.0)
+    parser.add_argument("--dry-run", action="store_true", help="Only report what would be deleted.")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    report = collect_orphaned_photos(grace=timedelta(hours=args.grace_hours), dry_run=args.dry_run)
+    print(json.dumps({**asdict(report), "objects_per_s": round(report.objects_per_s, 1)}))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""Reference-counted index of stored photos, keyed by content hash.
+
+Retried uploads and the same photo attached to several sightings map to one
+stored object: an upload first tries to claim an existing entry for its
+sha256 and only stores the photo when there is none. Deletes release a
+claim and only remove the objects once nobody holds one.
+"""
+from __future__ import annotations
+
+from sqlalchemy import delete, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from .models import PhotoObject
+
+
+def claim_photo(db: Session, content_hash: str) -> PhotoObject | None:
+    """Take a reference on an already stored photo, if there is one."""
+    result = db.execute(
+        update(PhotoObject)
+        .where(PhotoObject.content_hash == content_hash)
+        .values(ref_count=PhotoObject.ref_count + 1)
+    )
+    db.commit()
+    if not result.rowcount:
+        return None
+    return db.get(PhotoObject, content_hash)
+
+
+def register_photo(
+    db: Session,
+    *,
+    content_hash: str,
+    key: str,
+    photo_url: str,
+    content_type: str,
+    size_bytes: int,
+    variants: list[dict] | None,
+) -> PhotoObject:
+    """Index a freshly stored photo with one reference.
+
+    If a concurrent upload of the same bytes registered first, that entry is
+    claimed instead and returned (its key may differ from ``key``).
+    """
+    row = PhotoObject(
+        content_hash=content_hash,
+        key=key,
+        photo_url=photo_url,
+        content_type=content_type,
+        size_bytes=size_bytes,
+        variants=variants,
+        ref_count=1,
+    )
+    db.add(row)
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        existing = claim_photo(db, content_hash)
+        if existing is None:
+            raise
+        return existing
+    return row
+
+
+def index_photo(
+    db: Session,
+    *,
+    content_hash: str,
+    key: str,
+    photo_url: str,
+    content_type: str,
+    size_bytes: int,
+    variants: list[dict] | None,
+) -> PhotoObject | None:
+    """Index a photo already stored under ``key`` (direct uploads) with one reference.
+
+    Returns None, claiming nothing, when the same bytes are already indexed
+    under another key.
+    """
+    row = PhotoObject(
+        content_hash=content_hash,
+        key=key,
+        photo_url=photo_url,
+        content_type=content_type,
+        size_bytes=size_bytes,
+        variants=variants,
+        ref_count=1,
+    )
+    db.add(row)
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        return None
+    return row
+
+
+def release_photo(db: Session, key: str) -> bool | None:
+    """Drop one reference to the photo stored under ``key``.
+
+    Returns True when that was the last reference (the caller should delete
+    the objects), False while others still use it, and None for photos that
+    were never indexed.
+    """
+    row = db.scalar(select(PhotoObject).where(PhotoObject.key == key))
+    if row is None:
+        return None
+
+    db.execute(
+        update(PhotoObject)
+        .where(PhotoObject.key == key, PhotoObject.ref_count > 0)
+        .values(ref_count=PhotoObject.ref_count - 1)
+    )
+    # Only the caller that takes the count to zero gets to remove the row.
+    result = db.execute(
+        delete(PhotoObject).where(PhotoObject.key == key, PhotoObject.ref_count <= 0)
+    )
+    db.commit()
+    return bool(result.rowcount)
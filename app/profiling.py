@@ -0,0 +1,230 @@
+"""Opt-in profiling of single requests.
+
+Only active when ``PROFILING_TOKEN`` is set. A request carrying that token
+in the ``X-Profile`` header then runs under a wall-clock sampling profiler.
+Every ``SAMPLE_INTERVAL_S`` the profiler records the stack of each thread
+that is running app code, including threadpool workers waiting on eBird.
+It also records the request's upstream calls and DB statements, which
+``app.upstreams`` and ``app.metrics`` report through ``record``.
+
+The response gets a ``Server-Timing`` header and an ``X-Profile-Id``. The
+full report (top frames, upstream waterfall, queries) and a folded-stacks
+file for speedscope or flamegraph.pl are written to ``PROFILING_DIR`` and
+served by ``GET /debug/profiles/{id}``. Without the header, requests only
+pay for a context variable lookup in those hooks.
+"""
+from __future__ import annotations
+
+from collections import Counter
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from hmac import compare_digest
+import json
+import logging
+from pathlib import Path
+import sys
+import tempfile
+from threading import Event, Lock, Thread, get_ident
+from time import perf_counter
+from types import FrameType
+from typing import Any
+from uuid import uuid4
+
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .config import get_settings
+
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = "X-Profile"
+PROFILE_ID_HEADER = "X-Profile-Id"
+SAMPLE_INTERVAL_S = 0.002
+TOP_FRAMES = 25
+# Longer detail strings (SQL statements) are cut to this.
+MAX_DETAIL_CHARS = 300
+# Reports kept on disk; older ones are deleted.
+MAX_REPORTS = 50
+
+_APP_DIR = str(Path(__file__).resolve().parent)
+
+_active: ContextVar[Profile | None] = ContextVar("profile", default=None)
+# The sampler sees every thread, so only one request is profiled at a time.
+_profiling = Lock()
+
+
+@dataclass
+class Profile:
+    id: str
+    started: float = field(default_factory=perf_counter)
+    stacks: Counter[tuple[str, ...]] = field(default_factory=Counter)
+    events: list[dict[str, Any]] = field(default_factory=list)
+    samples: int = 0
+
+    def ms_since_start(self, at: float) -> float:
+        return round((at - self.started) * 1000, 2)
+
+
+def record(kind: str, name: str, started: float, duration_s: float, **details: Any) -> None:
+    """Add an upstream call or DB statement to the current request's profile, if it has one."""
+    profile = _active.get()
+    if profile is None:
+        return
+    for key, value in details.items():
+        if isinstance(value, str) and len(value) > MAX_DETAIL_CHARS:
+            details[key] = value[:MAX_DETAIL_CHARS] + "..."
+    profile.events.append(
+        {
+            "kind": kind,
+            "name": name,
+            "start_ms": profile.ms_since_start(started),
+            "duration_ms": round(duration_s * 1000, 2),
+            **details,
+        }
+    )
+
+
+def _frame_label(frame: FrameType) -> str:
+    code = frame.f_code
+    return f"{frame.f_globals.get('__name__', '?')}:{code.co_qualname}"
+
+
+def _sample(profile: Profile, stop: Event) -> None:
+    me = get_ident()
+    while not stop.wait(SAMPLE_INTERVAL_S):
+        profile.samples += 1
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == me:
+                continue
+            stack: list[str] = []
+            in_app = False
+            current: FrameType | None = frame
+            while current is not None:
+                in_app = in_app or current.f_code.co_filename.startswith(_APP_DIR)
+                stack.append(_frame_label(current))
+                current = current.f_back
+            # Idle threads (the event loop in select(), parked workers) never run app code.
+            if in_app:
+                profile.stacks[tuple(reversed(stack))] += 1
+
+
+def _top_frames(profile: Profile) -> list[dict[str, Any]]:
+    total = sum(profile.stacks.values()) or 1
+    self_counts: Counter[str] = Counter()
+    inclusive: Counter[str] = Counter()
+    for stack, count in profile.stacks.items():
+        self_counts[stack[-1]] += count
+        for label in set(stack):
+            inclusive[label] += count
+    return [
+        {
+            "frame": label,
+            "total_pct": round(100 * count / total, 1),
+            "self_pct": round(100 * self_counts[label] / total, 1),
+        }
+        for label, count in inclusive.most_common(TOP_FRAMES)
+    ]
+
+
+def _server_timing(profile: Profile, total_ms: float) -> str:
+    parts = [f"total;dur={total_ms:.1f}"]
+    for kind in ("upstream", "db"):
+        events = [event for event in profile.events if event["kind"] == kind]
+        if events:
+            duration = sum(event["duration_ms"] for event in events)
+            parts.append(f'{kind};dur={duration:.1f};desc="{len(events)} calls"')
+    return ", ".join(parts)
+
+
+def profiles_dir() -> Path:
+    configured = get_settings().profiling_dir.strip()
+    path = Path(configured) if configured else Path(tempfile.gettempdir()) / "birdtarifa-profiles"
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def _save(profile: Profile, report: dict[str, Any]) -> None:
+    directory = profiles_dir()
+    (directory / f"{profile.id}.json").write_text(json.dumps(report, indent=2))
+    (directory / f"{profile.id}.folded").write_text(
+        "".join(f"{';'.join(stack)} {count}\n" for stack, count in profile.stacks.most_common())
+    )
+    reports = sorted(directory.glob("*.json"), key=lambda path: path.stat().st_mtime)
+    for old in reports[:-MAX_REPORTS]:
+        old.unlink(missing_ok=True)
+        old.with_suffix(".folded").unlink(missing_ok=True)
+
+
+class ProfilingMiddleware:
+    """Profile requests whose ``X-Profile`` header matches ``token``."""
+
+    def __init__(self, app: ASGIApp, *, token: str) -> None:
+        self.app = app
+        self.token = token.encode()
+
+    def _requested(self, scope: Scope) -> bool:
+        for name, value in scope["headers"]:
+            if name == b"x-profile":
+                return compare_digest(value, self.token)
+        return False
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not self._requested(scope):
+            await self.app(scope, receive, send)
+            return
+        if not _profiling.acquire(blocking=False):
+
+            async def busy_send(message: Message) -> None:
+                if message["type"] == "http.response.start":
+                    MutableHeaders(scope=message)[PROFILE_ID_HEADER] = "busy"
+                await send(message)
+
+            await self.app(scope, receive, busy_send)
+            return
+
+        profile = Profile(id=uuid4().hex[:12])
+        stop = Event()
+        sampler = Thread(target=_sample, args=(profile, stop), name="profiler", daemon=True)
+        status_code = 500
+        total_ms = 0.0
+
+        async def profiled_send(message: Message) -> None:
+            nonlocal status_code, total_ms
+            if message["type"] == "http.response.start":
+                # The work is done once the response starts; stop sampling here.
+                stop.set()
+                status_code = message["status"]
+                total_ms = profile.ms_since_start(perf_counter())
+                headers = MutableHeaders(scope=message)
+                headers[PROFILE_ID_HEADER] = profile.id
+                headers.append("Server-Timing", _server_timing(profile, total_ms))
+            await send(message)
+
+        token = _active.set(profile)
+        sampler.start()
+        try:
+            await self.app(scope, receive, profiled_send)
+        finally:
+            stop.set()
+            _active.reset(token)
+            sampler.join()
+            _profiling.release()
+            report = {
+                "id": profile.id,
+                "method": scope["method"],
+                "path": scope["path"],
+                "query": scope["query_string"].decode("latin-1"),
+                "status": status_code,
+                "total_ms": total_ms or profile.ms_since_start(perf_counter()),
+                "samples": profile.samples,
+                "sample_interval_ms": SAMPLE_INTERVAL_S * 1000,
+                "top_frames": _top_frames(profile),
+                "upstream": [event for event in profile.events if event["kind"] == "upstream"],
+                "db": [event for event in profile.events if event["kind"] == "db"],
+            }
+            try:
+                _save(profile, report)
+            except OSError:
+                logger.exception("Could not save profile %s", profile.id)
+            logger.info("Request profiled", extra={"profile_id": profile.id, "path": scope["path"]})
@@ -0,0 +1,206 @@
+"""Token-bucket quotas for eBird and Wikipedia, shared by every worker.
+
+Each upstream gets a bucket that refills at ``*_QUOTA_PER_MIN`` up to
+``*_QUOTA_BURST`` tokens, and every HTTP call takes one. With
+``QUOTA_BACKEND=database`` the bucket is a row in ``rate_limit_buckets``,
+updated with compare-and-set, so all processes draw from the same budget.
+If the database is unreachable a worker falls back to its own in-process
+bucket for a while. ``QUOTA_BACKEND=memory`` always uses in-process buckets
+(one per worker).
+
+Background work (the zone refresh) runs under ``background_calls``. It can't
+take the last ``QUOTA_BACKGROUND_RESERVE`` of a bucket and never waits, so
+interactive requests keep their share during spikes.
+"""
+from __future__ import annotations
+
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+import logging
+from threading import Lock
+from time import sleep, time
+from typing import Literal, Protocol
+
+from sqlalchemy import update
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+
+from .config import get_settings
+from .db import SessionLocal
+from .models import RateLimitBucket
+
+
+logger = logging.getLogger(__name__)
+
+Priority = Literal["interactive", "background"]
+
+# After a database error the in-process bucket is used for this long.
+DB_RETRY_S = 30.0
+
+CAS_ATTEMPTS = 5
+CAS_RETRY_S = 0.05
+
+_priority: ContextVar[Priority] = ContextVar("quota_priority", default="interactive")
+
+_registry: dict[str, TokenBucket] = {}
+
+
+@contextmanager
+def background_calls() -> Iterator[None]:
+    """Upstream calls made inside yield to interactive ones."""
+    token = _priority.set("background")
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def _refill(tokens: float, updated_at: float, *, now: float, rate: float, capacity: float) -> float:
+    return min(capacity, tokens + max(0.0, now - updated_at) * rate)
+
+
+class _Store(Protocol):
+    def take(self, name: str, *, rate: float, capacity: float, floor: float) -> float: ...
+
+    def peek(self, name: str, *, rate: float, capacity: float) -> float: ...
+
+
+class _MemoryStore:
+    def __init__(self) -> None:
+        self._lock = Lock()
+        self._buckets: dict[str, tuple[float, float]] = {}
+
+    def take(self, name: str, *, rate: float, capacity: float, floor: float) -> float:
+        """Take one token if that leaves at least ``floor``; else seconds until it would."""
+        with self._lock:
+            now = time()
+            tokens, updated_at = self._buckets.get(name, (capacity, now))
+            tokens = _refill(tokens, updated_at, now=now, rate=rate, capacity=capacity)
+            if tokens - 1 >= floor:
+                self._buckets[name] = (tokens - 1, now)
+                return 0.0
+            self._buckets[name] = (tokens, now)
+            return (floor + 1 - tokens) / rate
+
+    def peek(self, name: str, *, rate: float, capacity: float) -> float:
+        with self._lock:
+            now = time()
+            tokens, updated_at = self._buckets.get(name, (capacity, now))
+            return _refill(tokens, updated_at, now=now, rate=rate, capacity=capacity)
+
+
+class _DatabaseStore:
+    def take(self, name: str, *, rate: float, capacity: float, floor: float) -> float:
+        # Optimistic: the update only applies if nobody took a token since we read the row.
+        for _attempt in range(CAS_ATTEMPTS):
+            with SessionLocal() as db:
+                row = db.get(RateLimitBucket, name)
+                if row is None:
+                    db.add(RateLimitBucket(name=name, tokens=capacity, updated_at=time()))
+                    try:
+                        db.commit()
+                    except IntegrityError:
+                        db.rollback()  # another worker created it first
+                    continue
+                now = time()
+                tokens = _refill(row.tokens, row.updated_at, now=now, rate=rate, capacity=capacity)
+                if tokens - 1 < floor:
+                    return (floor + 1 - tokens) / rate
+                result = db.execute(
+                    update(RateLimitBucket)
+                    .where(RateLimitBucket.name == name, RateLimitBucket.updated_at == row.updated_at)
+                    .values(tokens=tokens - 1, updated_at=now)
+                )
+                db.commit()
+                if result.rowcount == 1:
+                    return 0.0
+        # Heavy contention; let the caller retry shortly.
+        return CAS_RETRY_S
+
+    def peek(self, name: str, *, rate: float, capacity: float) -> float:
+        with SessionLocal() as db:
+            row = db.get(RateLimitBucket, name)
+        if row is None:
+            return capacity
+        return _refill(row.tokens, row.updated_at, now=time(), rate=rate, capacity=capacity)
+
+
+_memory_store = _MemoryStore()
+_database_store = _DatabaseStore()
+
+
+class TokenBucket:
+    """One upstream's quota: ``per_min`` calls a minute with bursts of up to ``burst``."""
+
+    def __init__(self, name: str, *, per_min: float, burst: int, background_reserve: float) -> None:
+        self.name = name
+        self.rate = max(per_min, 0.001) / 60
+        self.capacity = float(max(1, burst))
+        self.reserve = self.capacity * min(max(background_reserve, 0.0), 1.0)
+        self._lock = Lock()
+        self._db_retry_at = 0.0
+        self.granted = 0
+        self.throttled_interactive = 0
+        self.throttled_background = 0
+        self.waited_ms = 0.0
+        _registry[name] = self
+
+    def _store(self) -> _Store:
+        if get_settings().quota_backend == "database" and time() >= self._db_retry_at:
+            return _database_store
+        return _memory_store
+
+    def _take(self, floor: float) -> float:
+        store = self._store()
+        try:
+            return store.take(self.name, rate=self.rate, capacity=self.capacity, floor=floor)
+        except SQLAlchemyError:
+            logger.warning("Shared %s quota unavailable, using the in-process bucket", self.name, exc_info=True)
+            self._db_retry_at = time() + DB_RETRY_S
+            return _memory_store.take(self.name, rate=self.rate, capacity=self.capacity, floor=floor)
+
+    def acquire(self, *, max_wait_s: float) -> bool:
+        """Take a token, waiting up to ``max_wait_s`` for one (background calls never wait)."""
+        background = _priority.get() == "background"
+        floor = self.reserve if background else 0.0
+        waited = 0.0
+        while True:
+            wait = self._take(floor)
+            if wait <= 0:
+                with self._lock:
+                    self.granted += 1
+                    self.waited_ms += waited * 1000
+                return True
+            if background or waited + wait > max_wait_s:
+                with self._lock:
+                    if background:
+                        self.throttled_background += 1
+                    else:
+                        self.throttled_interactive += 1
+                return False
+            sleep(wait)
+            waited += wait
+
+    def stats(self) -> dict[str, float | int | str]:
+        store = self._store()
+        try:
+            remaining = store.peek(self.name, rate=self.rate, capacity=self.capacity)
+            backend = "database" if store is _database_store else "memory"
+        except SQLAlchemyError:
+            remaining = _memory_store.peek(self.name, rate=self.rate, capacity=self.capacity)
+            backend = "memory"
+        return {
+            "backend": backend,
+            "remaining": round(remaining, 2),
+            "capacity": self.capacity,
+            "per_min": round(self.rate * 60, 2),
+            "background_reserve": round(self.reserve, 2),
+            "granted": self.granted,
+            "throttled_interactive": self.throttled_interactive,
+            "throttled_background": self.throttled_background,
+            "waited_ms": round(self.waited_ms, 1),
+        }
+
+
+def quota_stats() -> dict[str, dict[str, float | int | str]]:
+    return {name: bucket.stats() for name, bucket in sorted(_registry.items())}
@@ -0,0 +1,159 @@
+"""Birding regions: named presets or ad-hoc lat/lng/radius snapped to a grid.
+
+Everything that depends on where the user is birding (hotspots for the zone
+list, eBird observations, eBird-based predictions) is cached per region in
+bounded LRU caches, so one instance can serve many regions. The caches also
+use the shared tier when ``CACHE_BACKEND`` configures one.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Any
+
+from .cache import Codec, LRUCache
+from .config import get_settings
+from .ebird import (
+    EbirdHotspot,
+    EbirdObservation,
+    fetch_hotspots_geo,
+    fetch_recent_geo_observations,
+    fetch_recent_location_observations,
+)
+from .geo import HotspotIndex
+from .schemas import PredictionOut
+
+
+# eBird's geo endpoints accept at most 50 km.
+RADIUS_STEPS_KM = (5, 10, 25, 50)
+
+# Hotspots barely change; refetch a region's list a few times a day.
+HOTSPOTS_TTL_S = 6 * 60 * 60
+
+
+class UnknownRegionError(ValueError):
+    pass
+
+
+@dataclass(frozen=True)
+class Region:
+    key: str
+    name: str
+    lat: float
+    lng: float
+    dist_km: int
+    country_code: str | None = None
+
+
+def region_presets() -> dict[str, Region]:
+    settings = get_settings()
+    presets = {
+        "tarifa": Region(
+            key="tarifa",
+            name="Tarifa",
+            lat=settings.ebird_geo_lat,
+            lng=settings.ebird_geo_lng,
+            dist_km=settings.ebird_geo_dist_km,
+            country_code="ES",
+        )
+    }
+    for key, preset in settings.region_presets.items():
+        # Same normalization as the requested name in resolve_region.
+        key = key.strip().lower()
+        presets[key] = Region(key=key, **preset.model_dump())
+    return presets
+
+
+def _snap_radius(radius_km: float) -> int:
+    return next((step for step in RADIUS_STEPS_KM if radius_km <= step), RADIUS_STEPS_KM[-1])
+
+
+def resolve_region(
+    *,
+    name: str | None = None,
+    lat: float | None = None,
+    lng: float | None = None,
+    radius_km: float | None = None,
+) -> Region:
+    """Preset ``name``, or a grid-snapped region around ``lat``/``lng``, or the default preset."""
+    settings = get_settings()
+    if lat is not None and lng is not None:
+        grid = settings.region_grid_deg
+        snapped_lat = round(round(lat / grid) * grid, 4)
+        snapped_lng = round(round(lng / grid) * grid, 4)
+        dist_km = _snap_radius(radius_km or settings.ebird_geo_dist_km)
+        return Region(
+            key=f"{snapped_lat:.4g},{snapped_lng:.4g},{dist_km}km",
+            name=f"{snapped_lat:.4g}, {snapped_lng:.4g}",
+            lat=snapped_lat,
+            lng=snapped_lng,
+            dist_km=dist_km,
+        )
+    if lat is not None or lng is not None:
+        raise UnknownRegionError("Pass both lat and lng.")
+
+    presets = region_presets()
+    key = (name or settings.region_default).strip().lower()
+    if key not in presets:
+        raise UnknownRegionError(f"Unknown region {key!r}. Known: {', '.join(sorted(presets))}.")
+    return presets[key]
+
+
+_hotspots_codec = Codec.json(list[EbirdHotspot])
+
+_hotspot_indexes: LRUCache[str, HotspotIndex] = LRUCache(
+    "hotspot_index",
+    maxsize=get_settings().region_cache_size,
+    ttl_s=HOTSPOTS_TTL_S,
+    # The shared tier holds the hotspot list; each worker builds its own index from it.
+    codec=Codec(
+        dumps=lambda index: _hotspots_codec.dumps(index.hotspots),
+        loads=lambda payload: HotspotIndex(_hotspots_codec.loads(payload)),
+    ),
+)
+
+_observations_cache: LRUCache[tuple[Any, ...], list[EbirdObservation]] = LRUCache(
+    "ebird_observations",
+    maxsize=get_settings().region_cache_size * 4,
+    ttl_s=get_settings().ebird_observations_ttl_s,
+    codec=Codec.json(list[EbirdObservation]),
+)
+
+# eBird-based predictions per (region, zone, month, limit); rules-based ones come from the DB.
+predictions_cache: LRUCache[tuple[Any, ...], list[PredictionOut]] = LRUCache(
+    "predictions",
+    maxsize=get_settings().region_cache_size * 8,
+    ttl_s=get_settings().ebird_observations_ttl_s,
+    codec=Codec.json(list[PredictionOut]),
+)
+
+
+def region_hotspots(region: Region) -> HotspotIndex:
+    """Spatial index over every hotspot in the region's radius (cached)."""
+    return _hotspot_indexes.get_or_create(
+        region.key,
+        lambda: HotspotIndex(
+            fetch_hotspots_geo(lat=region.lat, lng=region.lng, dist_km=region.dist_km, max_results=5000)
+        ),
+    )
+
+
+def region_observations(region: Region, *, back_days: int) -> list[EbirdObservation]:
+    """Recent observations within the region's radius (cached)."""
+    return _observations_cache.get_or_create(
+        ("geo", region.key, back_days),
+        lambda: fetch_recent_geo_observations(
+            lat=region.lat,
+            lng=region.lng,
+            dist_km=region.dist_km,
+            back_days=back_days,
+            max_results=200,
+        ),
+    )
+
+
+def hotspot_observations(loc_id: str, *, back_days: int) -> list[EbirdObservation]:
+    """Recent observations at one eBird hotspot (cached; hotspots are shared between regions)."""
+    return _observations_cache.get_or_create(
+        ("hotspot", loc_id, back_days),
+        lambda: fetch_recent_location_observations(loc_id=loc_id, back_days=back_days, max_results=200),
+    )
@@ -0,0 +1,129 @@
+"""JSON rendering with orjson, and gzip/brotli compression of larger bodies.
+
+``JSONResponse`` is the app's default response class. Endpoints on hot paths
+return it directly with plain dicts, which skips FastAPI's per-row
+response-model validation; the ``response_model`` they declare still
+documents the shape. Datetimes come out as pydantic writes them (UTC as
+``Z``), so both paths produce the same JSON.
+"""
+from __future__ import annotations
+
+from functools import lru_cache
+import gzip
+from typing import Any
+
+from fastapi.responses import ORJSONResponse
+import orjson
+from pydantic import BaseModel
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+
+COMPRESSIBLE_TYPES = ("application/json", "text/", "application/openmetrics-text")
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json")
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+class JSONResponse(ORJSONResponse):
+    """orjson rendering that also takes pydantic models (cached predictions, for one)."""
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_UTC_Z)
+
+
+@lru_cache
+def _brotli() -> Any | None:
+    try:
+        import brotli
+    except ImportError:
+        return None
+    return brotli
+
+
+def _accepted(header: str) -> dict[str, float]:
+    accepted: dict[str, float] = {}
+    for item in header.split(","):
+        coding, _, params = item.partition(";")
+        quality = 1.0
+        name, _, value = params.strip().partition("=")
+        if name.strip() == "q":
+            try:
+                quality = float(value)
+            except ValueError:
+                quality = 0.0
+        accepted[coding.strip().lower()] = quality
+    return accepted
+
+
+def negotiate_encoding(accept_encoding: str) -> str | None:
+    """``br`` or ``gzip``, whichever the client ranks higher (br on a tie), or None."""
+    accepted = _accepted(accept_encoding)
+    wildcard = accepted.get("*", 0.0)
+    candidates = [("gzip", accepted.get("gzip", wildcard))]
+    if _brotli() is not None:
+        candidates.insert(0, ("br", accepted.get("br", wildcard)))
+    coding, quality = max(candidates, key=lambda candidate: candidate[1])
+    return coding if quality > 0 else None
+
+
+class CompressionMiddleware:
+    """Compress JSON and text bodies of at least ``min_bytes`` with brotli or gzip.
+
+    Only responses sent in one body message are compressed: JSON renders that
+    way, and the streamed ones here are files (images) that don't shrink.
+    """
+
+    def __init__(self, app: ASGIApp, *, min_bytes: int, gzip_level: int, brotli_quality: int) -> None:
+        self.app = app
+        self.min_bytes = min_bytes
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    def _compress(self, body: bytes, coding: str) -> bytes:
+        if coding == "br":
+            return _brotli().compress(body, quality=self.brotli_quality)
+        return gzip.compress(body, compresslevel=self.gzip_level, mtime=0)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        coding = negotiate_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if coding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start: Message | None = None
+
+        async def compressing_send(message: Message) -> None:
+            nonlocal start
+            if message["type"] == "http.response.start":
+                start = message
+                return
+            if message["type"] != "http.response.body" or start is None:
+                await send(message)
+                return
+            initial, start = start, None
+            body = message.get("body", b"")
+            headers = MutableHeaders(scope=initial)
+            if (
+                message.get("more_body", False)
+                or len(body) < self.min_bytes
+                or "content-encoding" in headers
+                or not headers.get("content-type", "").startswith(COMPRESSIBLE_TYPES)
+            ):
+                await send(initial)
+                await send(message)
+                return
+            compressed = self._compress(body, coding)
+            headers["Content-Encoding"] = coding
+            headers["Content-Length"] = str(len(compressed))
+            headers.add_vary_header("Accept-Encoding")
+            await send(initial)
+            await send({**message, "body": compressed})
+
+        await self.app(scope, receive, compressing_send)
@@ -7,6 +7,15 @@ from pydantic import BaseModel, Field
 HourBucket = Literal["dawn", "morning", "afternoon", "evening"]
 PredictionConfidence = Literal["high", "medium", "low"]
 ZoneKind = Literal["geo", "hotspot"]
+UploadContentType = Literal["image/jpeg", "image/png", "image/webp"]
+
+
+class PhotoVariant(BaseModel):
+    name: str = Field(min_length=1, max_length=32)
+    url: str = Field(min_length=1, max_length=1024)
+    content_type: str = Field(max_length=64)
+    width: int | None = None
+    height: int | None = None
 
 
 class SightingCreate(BaseModel):
@@ -14,6 +23,7 @@ class SightingCreate(BaseModel):
     species_guess: str | None = Field(default=None, max_length=120)
     notes: str | None = Field(default=None, max_length=2000)
     photo_url: str | None = Field(default=None, max_length=1024)
+    photo_variants: list[PhotoVariant] | None = Field(default=None, max_length=8)
     observed_at: datetime | None = None
 
 
@@ -25,6 +35,7 @@ class SightingOut(BaseModel):
     species_guess: str | None
     notes: str | None
     photo_url: str | None
+    photo_variants: list[PhotoVariant] | None = None
 
     class Config:
         from_attributes = True
@@ -48,6 +59,32 @@ class PredictionOut(BaseModel):
     last_seen_days_ago: int | None = None
 
 
+class ZoneOverviewStatus(BaseModel):
+    zone_id: str
+    zone_name: str
+    status: Literal["ok", "timeout", "error", "unavailable"]
+    species_count: int = 0
+    elapsed_ms: float
+
+
+class SpeciesOverview(BaseModel):
+    species: str
+    best_zone_id: str
+    best_zone_name: str
+    best_score: int
+    zones_count: int
+    observations_count: int
+
+
+class PredictionsOverviewOut(BaseModel):
+    region: str
+    month: int
+    # True when at least one zone timed out or failed and is missing from ``species``.
+    partial: bool
+    zones: list[ZoneOverviewStatus]
+    species: list[SpeciesOverview]
+
+
 class SeedResult(BaseModel):
     inserted: int
 
@@ -58,6 +95,15 @@ class ZoneOut(BaseModel):
     kind: ZoneKind
 
 
+class NearbyHotspotOut(BaseModel):
+    id: str
+    name: str
+    lat: float
+    lng: float
+    distance_km: float
+    latest_obs_dt: datetime | None = None
+
+
 class BirdInfoOut(BaseModel):
     species: str
     title: str | None = None
@@ -72,6 +118,26 @@ class PhotoUploadOut(BaseModel):
     key: str
     content_type: str
     size_bytes: int
+    variants: list[PhotoVariant] = []
+    # True while display variants are still being generated in the background.
+    processing: bool = False
+
+
+class PhotoPresignIn(BaseModel):
+    content_type: UploadContentType
+    size_bytes: int = Field(ge=1)
+
+
+class PhotoPresignOut(BaseModel):
+    key: str
+    url: str
+    fields: dict[str, str]
+    expires_in: int
+    max_bytes: int
+
+
+class PhotoCompleteIn(BaseModel):
+    key: str = Field(min_length=1, max_length=2048)
 
 
 class PhotoDeleteIn(BaseModel):
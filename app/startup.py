@@ -0,0 +1,41 @@
+"""Cold-start report: time spent importing the app and until it can serve.
+
+Logged once at startup. Per-module import times come from
+``python -X importtime`` (see ``bench.cold_start``); here we only check that
+the heavy optional dependencies really were left for first use.
+"""
+from __future__ import annotations
+
+import logging
+import sys
+from time import perf_counter
+
+from . import IMPORT_STARTED
+
+
+logger = logging.getLogger(__name__)
+
+# Loaded on first use (storage backend, image processing, eBird/Wikipedia calls).
+LAZY_MODULES = ("boto3", "botocore", "PIL", "httpx")
+
+_imports_done: float | None = None
+
+
+def mark_imports_done() -> None:
+    global _imports_done
+    _imports_done = perf_counter()
+
+
+def startup_report(*, schema_version: str | None, schema_check_ms: float) -> dict[str, object]:
+    ready = perf_counter()
+    imports_done = _imports_done or ready
+    report: dict[str, object] = {
+        "imports_ms": round((imports_done - IMPORT_STARTED) * 1000, 1),
+        "startup_ms": round((ready - imports_done) * 1000, 1),
+        "ready_ms": round((ready - IMPORT_STARTED) * 1000, 1),
+        "schema_check_ms": round(schema_check_ms, 1),
+        "schema_version": schema_version,
+        "eager_lazy_modules": [name for name in LAZY_MODULES if name in sys.modules],
+    }
+    logger.info("Startup ready", extra=report)
+    return report
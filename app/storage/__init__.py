@@ -1 +1,121 @@
-"""Storage integrations for Bird Tarifa."""
+"""Storage integrations for Bird Tarifa.
+
+``STORAGE_BACKEND`` picks the implementation: ``s3`` (default) or ``local``.
+Backends are modules exposing the functions of ``StorageBackend``; the rest
+of the app only calls the module-level wrappers below.
+"""
+from __future__ import annotations
+
+from functools import lru_cache
+from importlib import import_module
+from typing import Any, Iterator, Protocol
+
+from ..config import get_settings
+from ..metrics import observe_storage
+from .keys import (
+    DELETE_BATCH_SIZE,
+    IMMUTABLE_CACHE_CONTROL,
+    build_photo_key,
+    build_variant_key,
+    is_photo_key,
+    variant_keys_for,
+)
+
+
+class DirectUploadUnsupportedError(RuntimeError):
+    """The configured backend can't take uploads straight from the browser."""
+
+
+class StorageBackend(Protocol):
+    def upload_image_bytes(self, key: str, payload: bytes, content_type: str) -> str: ...
+
+    def delete_object(self, key: str) -> None: ...
+
+    def delete_objects(self, keys: list[str]) -> int: ...
+
+    def head_object(self, key: str) -> dict[str, Any] | None: ...
+
+    def download_object(self, key: str) -> bytes: ...
+
+    def list_objects(self, prefix: str) -> Iterator[list[dict[str, Any]]]: ...
+
+    def public_url_for_key(self, key: str) -> str: ...
+
+    def presign_photo_upload(self, key: str, content_type: str, max_bytes: int) -> dict[str, Any]: ...
+
+
+BACKENDS = {"s3": ".s3", "local": ".local"}
+
+
+@lru_cache
+def get_backend() -> StorageBackend:
+    name = get_settings().storage_backend
+    if name not in BACKENDS:
+        raise RuntimeError(f"Unknown STORAGE_BACKEND {name!r}.")
+    # Imported lazily so the local backend never loads boto3.
+    return import_module(BACKENDS[name], __name__)  # type: ignore[return-value]
+
+
+def upload_image_bytes(key: str, payload: bytes, content_type: str) -> str:
+    with observe_storage(get_settings().storage_backend, "put"):
+        return get_backend().upload_image_bytes(key=key, payload=payload, content_type=content_type)
+
+
+def delete_object(key: str) -> None:
+    with observe_storage(get_settings().storage_backend, "delete"):
+        get_backend().delete_object(key)
+
+
+def delete_objects(keys: list[str]) -> int:
+    with observe_storage(get_settings().storage_backend, "delete_batch"):
+        return get_backend().delete_objects(keys)
+
+
+def head_object(key: str) -> dict[str, Any] | None:
+    return get_backend().head_object(key)
+
+
+def download_object(key: str) -> bytes:
+    return get_backend().download_object(key)
+
+
+def list_objects(prefix: str) -> Iterator[list[dict[str, Any]]]:
+    return get_backend().list_objects(prefix)
+
+
+def public_url_for_key(key: str) -> str:
+    return get_backend().public_url_for_key(key)
+
+
+def presign_photo_upload(key: str, content_type: str, max_bytes: int) -> dict[str, Any]:
+    return get_backend().presign_photo_upload(key, content_type, max_bytes)
+
+
+def key_for_public_url(url: str) -> str | None:
+    """Inverse of ``public_url_for_key`` for URLs we handed out."""
+    prefix = public_url_for_key("")
+    if url.startswith(prefix):
+        return url[len(prefix) :]
+    return None
+
+
+__all__ = [
+    "DELETE_BATCH_SIZE",
+    "DirectUploadUnsupportedError",
+    "IMMUTABLE_CACHE_CONTROL",
+    "StorageBackend",
+    "build_photo_key",
+    "build_variant_key",
+    "delete_object",
+    "delete_objects",
+    "download_object",
+    "get_backend",
+    "head_object",
+    "is_photo_key",
+    "key_for_public_url",
+    "list_objects",
+    "presign_photo_upload",
+    "public_url_for_key",
+    "upload_image_bytes",
+    "variant_keys_for",
+]
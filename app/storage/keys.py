@@ -0,0 +1,58 @@
+"""Object key layout shared by all storage backends."""
+from datetime import datetime, timezone
+import re
+from uuid import uuid4
+
+
+CONTENT_TYPE_TO_EXTENSION = {
+    "image/jpeg": "jpg",
+    "image/png": "png",
+    "image/webp": "webp",
+    "image/avif": "avif",
+}
+
+EXTENSION_TO_CONTENT_TYPE = {ext: content_type for content_type, ext in CONTENT_TYPE_TO_EXTENSION.items()}
+
+# Display variants share the original's key stem: <uuid>.jpg -> <uuid>_sm.webp
+VARIANT_NAMES = ("md", "sm")
+VARIANT_EXTENSIONS = ("webp", "avif")
+
+# Hard limit of the S3 DeleteObjects API; other backends batch the same way.
+DELETE_BATCH_SIZE = 1000
+
+# Photo keys are unique per upload, so objects never change once written.
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+PHOTO_KEY_RE = re.compile(r"^sightings/\d{4}/\d{2}/[0-9a-f]{32}\.(jpg|png|webp)$")
+
+
+def build_photo_key(content_type: str) -> str:
+    """Key for a new photo, unique per upload even for the same bytes.
+
+    Dedup goes through the photo index, so a delete can never remove the
+    objects of a later upload of the same photo.
+    """
+    extension = CONTENT_TYPE_TO_EXTENSION.get(content_type)
+    if not extension:
+        raise ValueError("Unsupported image content type.")
+    now = datetime.now(timezone.utc)
+    return f"sightings/{now.year:04d}/{now.month:02d}/{uuid4().hex}.{extension}"
+
+
+def is_photo_key(key: str) -> bool:
+    """True for original photo keys as produced by ``build_photo_key``."""
+    return bool(PHOTO_KEY_RE.match(key))
+
+
+def build_variant_key(key: str, name: str, content_type: str) -> str:
+    extension = CONTENT_TYPE_TO_EXTENSION.get(content_type)
+    if not extension:
+        raise ValueError("Unsupported image content type.")
+    stem = key.rsplit(".", 1)[0]
+    return f"{stem}_{name}.{extension}"
+
+
+def variant_keys_for(key: str) -> list[str]:
+    """All keys a display variant of ``key`` could have been stored under."""
+    stem = key.rsplit(".", 1)[0]
+    return [f"{stem}_{name}.{ext}" for name in VARIANT_NAMES for ext in VARIANT_EXTENSIONS]
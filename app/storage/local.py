@@ -0,0 +1,121 @@
+"""Local-disk storage backend for single-node deployments and benchmarks.
+
+Objects live under ``LOCAL_STORAGE_DIR`` using the same keys as in S3 and
+are served by the API's ``/media/{key}`` route. Writes go to a temp file in
+the target directory and are renamed into place, so readers never see a
+partially written photo.
+"""
+from datetime import datetime, timezone
+import logging
+import os
+from pathlib import Path
+import tempfile
+from typing import Any, Iterator
+
+from ..config import get_settings
+from . import DirectUploadUnsupportedError
+from .keys import DELETE_BATCH_SIZE, EXTENSION_TO_CONTENT_TYPE
+
+
+MEDIA_ROUTE_PREFIX = "/media"
+
+logger = logging.getLogger(__name__)
+
+
+def _root() -> Path:
+    return Path(get_settings().local_storage_dir).resolve()
+
+
+def path_for_key(key: str) -> Path:
+    """Filesystem path for ``key``; refuses keys that would escape the storage root."""
+    root = _root()
+    path = (root / key).resolve()
+    if not key or not path.is_relative_to(root) or path == root:
+        raise ValueError("Invalid storage key.")
+    return path
+
+
+def public_url_for_key(key: str) -> str:
+    base_url = get_settings().local_storage_base_url.rstrip("/")
+    return f"{base_url}{MEDIA_ROUTE_PREFIX}/{key}"
+
+
+def upload_image_bytes(key: str, payload: bytes, content_type: str) -> str:
+    path = path_for_key(key)
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=".upload-")
+        try:
+            with os.fdopen(fd, "wb") as tmp:
+                tmp.write(payload)
+            os.chmod(tmp_name, 0o644)  # mkstemp creates 0600
+            os.replace(tmp_name, path)
+        except BaseException:
+            Path(tmp_name).unlink(missing_ok=True)
+            raise
+    except OSError as exc:
+        logger.exception("Local storage write failed", extra={"storage_key": key})
+        raise RuntimeError("Failed to store image on disk.") from exc
+    return public_url_for_key(key)
+
+
+def delete_object(key: str) -> None:
+    try:
+        path_for_key(key).unlink(missing_ok=True)
+    except OSError as exc:
+        logger.exception("Local storage delete failed", extra={"storage_key": key})
+        raise RuntimeError("Failed to delete image from disk.") from exc
+
+
+def delete_objects(keys: list[str]) -> int:
+    for key in keys:
+        delete_object(key)
+    return len(keys)
+
+
+def head_object(key: str) -> dict[str, Any] | None:
+    try:
+        stat = path_for_key(key).stat()
+    except FileNotFoundError:
+        return None
+    return {
+        "size_bytes": stat.st_size,
+        "content_type": EXTENSION_TO_CONTENT_TYPE.get(key.rsplit(".", 1)[-1], "application/octet-stream"),
+    }
+
+
+def download_object(key: str) -> bytes:
+    try:
+        return path_for_key(key).read_bytes()
+    except OSError as exc:
+        raise RuntimeError("Failed to read image from disk.") from exc
+
+
+def list_objects(prefix: str) -> Iterator[list[dict[str, Any]]]:
+    root = _root()
+    base = root / prefix
+    page: list[dict[str, Any]] = []
+    if not base.is_dir():
+        return
+    for dirpath, _dirnames, filenames in os.walk(base):
+        for filename in sorted(filenames):
+            if filename.startswith(".upload-"):
+                continue
+            path = Path(dirpath) / filename
+            stat = path.stat()
+            page.append(
+                {
+                    "key": path.relative_to(root).as_posix(),
+                    "size_bytes": stat.st_size,
+                    "last_modified": datetime.fromtimestamp(stat.st_mtime, tz=timezone.utc),
+                }
+            )
+            if len(page) >= DELETE_BATCH_SIZE:
+                yield page
+                page = []
+    if page:
+        yield page
+
+
+def presign_photo_upload(key: str, content_type: str, max_bytes: int) -> dict[str, Any]:
+    raise DirectUploadUnsupportedError("Direct uploads need the S3 storage backend.")
@@ -1,20 +1,19 @@
-from datetime import datetime, timezone
+"""S3 storage backend (also works with S3-compatible servers via S3_ENDPOINT_URL)."""
+from concurrent.futures import ThreadPoolExecutor
 from functools import lru_cache
 import logging
-from uuid import uuid4
+from time import sleep
+from typing import Any, Iterator
 
 import boto3
+from botocore.config import Config
 from botocore.exceptions import BotoCoreError, ClientError
 
 from ..config import get_settings
+from ..tracing import in_current_trace, tracer
+from .keys import DELETE_BATCH_SIZE, IMMUTABLE_CACHE_CONTROL
 
 
-CONTENT_TYPE_TO_EXTENSION = {
-    "image/jpeg": "jpg",
-    "image/png": "png",
-    "image/webp": "webp",
-}
-
 logger = logging.getLogger(__name__)
 
 
@@ -38,34 +37,123 @@ def _s3_client():
         region_name=settings.aws_region,
         aws_access_key_id=settings.aws_access_key_id,
         aws_secret_access_key=settings.aws_secret_access_key,
+        # Point at MinIO/moto etc. for local runs.
+        endpoint_url=settings.s3_endpoint_url or None,
+        config=Config(
+            # Enough sockets for every storage worker plus concurrent multipart parts.
+            max_pool_connections=settings.s3_max_pool_connections,
+            retries={"mode": "adaptive", "max_attempts": settings.s3_max_attempts},
+            connect_timeout=5,
+            read_timeout=30,
+        ),
     )
 
 
-def build_photo_key(content_type: str) -> str:
-    extension = CONTENT_TYPE_TO_EXTENSION.get(content_type)
-    if not extension:
-        raise ValueError("Unsupported image content type.")
-    now = datetime.now(timezone.utc)
-    return f"sightings/{now.year:04d}/{now.month:02d}/{uuid4().hex}.{extension}"
+@lru_cache
+def _part_executor() -> ThreadPoolExecutor:
+    # Shared by all multipart uploads so parts in flight stay bounded overall.
+    return ThreadPoolExecutor(
+        max_workers=max(1, get_settings().s3_multipart_concurrency),
+        thread_name_prefix="s3-part",
+    )
 
 
-def _public_url_for_key(key: str) -> str:
+def public_url_for_key(key: str) -> str:
     settings = get_settings()
     if settings.s3_public_base_url:
         base_url = settings.s3_public_base_url.rstrip("/")
         return f"{base_url}/{key}"
+    if settings.s3_endpoint_url:
+        return f"{settings.s3_endpoint_url.rstrip('/')}/{settings.s3_bucket_name}/{key}"
     return f"https://{settings.s3_bucket_name}.s3.{settings.aws_region}.amazonaws.com/{key}"
 
 
+def _upload_part(*, key: str, upload_id: str, part_number: int, body: bytes) -> dict[str, Any]:
+    settings = get_settings()
+    attempts = max(1, settings.s3_multipart_part_retries + 1)
+    for attempt in range(1, attempts + 1):
+        try:
+            with tracer.start_as_current_span(
+                "s3.upload_part", attributes={"s3.part_number": part_number, "s3.attempt": attempt}
+            ):
+                response = _s3_client().upload_part(
+                    Bucket=settings.s3_bucket_name,
+                    Key=key,
+                    UploadId=upload_id,
+                    PartNumber=part_number,
+                    Body=body,
+                )
+            return {"PartNumber": part_number, "ETag": response["ETag"]}
+        except (ClientError, BotoCoreError):
+            # botocore already retried throttling/5xx; this covers a part that still failed.
+            if attempt == attempts:
+                raise
+            logger.warning(
+                "S3 upload_part failed, retrying",
+                extra={"s3_key": key, "part_number": part_number, "attempt": attempt},
+            )
+            sleep(0.2 * 2 ** (attempt - 1))
+    raise AssertionError("unreachable")
+
+
+def _multipart_upload(key: str, payload: bytes, content_type: str) -> None:
+    """Upload ``payload`` in parts sent concurrently; aborts the upload on failure."""
+    settings = get_settings()
+    client = _s3_client()
+    part_size = max(5, settings.s3_multipart_part_mb) * 1024 * 1024  # S3 minimum is 5 MB
+    upload_id = client.create_multipart_upload(
+        Bucket=settings.s3_bucket_name,
+        Key=key,
+        ContentType=content_type,
+        CacheControl=IMMUTABLE_CACHE_CONTROL,
+    )["UploadId"]
+
+    futures = []
+    try:
+        view = memoryview(payload)
+        futures = [
+            _part_executor().submit(
+                in_current_trace(_upload_part),
+                key=key,
+                upload_id=upload_id,
+                part_number=index + 1,
+                body=bytes(view[offset : offset + part_size]),
+            )
+            for index, offset in enumerate(range(0, len(payload), part_size))
+        ]
+        parts = [future.result() for future in futures]
+        client.complete_multipart_upload(
+            Bucket=settings.s3_bucket_name,
+            Key=key,
+            UploadId=upload_id,
+            MultipartUpload={"Parts": parts},
+        )
+    except BaseException:
+        for future in futures:
+            future.cancel()
+        try:
+            client.abort_multipart_upload(Bucket=settings.s3_bucket_name, Key=key, UploadId=upload_id)
+        except (ClientError, BotoCoreError):
+            logger.exception(
+                "S3 abort_multipart_upload failed",
+                extra={"s3_bucket": settings.s3_bucket_name, "s3_key": key, "s3_upload_id": upload_id},
+            )
+        raise
+
+
 def upload_image_bytes(key: str, payload: bytes, content_type: str) -> str:
     _assert_s3_config()
     settings = get_settings()
     try:
+        if len(payload) >= settings.s3_multipart_threshold_mb * 1024 * 1024:
+            _multipart_upload(key, payload, content_type)
+            return public_url_for_key(key)
         _s3_client().put_object(
             Bucket=settings.s3_bucket_name,
             Key=key,
             Body=payload,
             ContentType=content_type,
+            CacheControl=IMMUTABLE_CACHE_CONTROL,
         )
     except ClientError as exc:
         code = (
@@ -95,7 +183,7 @@ def upload_image_bytes(key: str, payload: bytes, content_type: str) -> str:
             },
         )
         raise RuntimeError("Failed to upload image to S3 (BotoCoreError).") from exc
-    return _public_url_for_key(key)
+    return public_url_for_key(key)
 
 
 def delete_object(key: str) -> None:
@@ -134,3 +222,132 @@ def delete_object(key: str) -> None:
             },
         )
         raise RuntimeError("Failed to delete image from S3 (BotoCoreError).") from exc
+
+
+def presign_photo_upload(key: str, content_type: str, max_bytes: int) -> dict[str, Any]:
+    """Presigned POST letting a browser upload ``key`` straight to the bucket.
+
+    A POST policy (unlike a presigned PUT) lets S3 itself enforce the content
+    type and a size range.
+    """
+    _assert_s3_config()
+    settings = get_settings()
+    try:
+        return _s3_client().generate_presigned_post(
+            Bucket=settings.s3_bucket_name,
+            Key=key,
+            Fields={"Content-Type": content_type, "Cache-Control": IMMUTABLE_CACHE_CONTROL},
+            Conditions=[
+                {"Content-Type": content_type},
+                {"Cache-Control": IMMUTABLE_CACHE_CONTROL},
+                ["content-length-range", 1, max_bytes],
+            ],
+            ExpiresIn=settings.s3_presign_expires_s,
+        )
+    except (ClientError, BotoCoreError) as exc:
+        logger.exception(
+            "S3 presign failed",
+            extra={"s3_bucket": settings.s3_bucket_name, "s3_key": key},
+        )
+        raise RuntimeError("Failed to presign S3 upload.") from exc
+
+
+def head_object(key: str) -> dict[str, Any] | None:
+    """Return {"size_bytes", "content_type"} for ``key``, or None if it doesn't exist."""
+    _assert_s3_config()
+    settings = get_settings()
+    try:
+        response = _s3_client().head_object(Bucket=settings.s3_bucket_name, Key=key)
+    except ClientError as exc:
+        code = exc.response.get("Error", {}).get("Code") if hasattr(exc, "response") else None
+        if code in ("404", "NoSuchKey", "NotFound"):
+            return None
+        logger.exception(
+            "S3 head_object failed",
+            extra={"s3_bucket": settings.s3_bucket_name, "s3_key": key, "aws_error_code": code},
+        )
+        raise RuntimeError(f"Failed to read image metadata from S3 ({code or 'ClientError'}).") from exc
+    except BotoCoreError as exc:
+        logger.exception(
+            "S3 head_object failed (BotoCoreError)",
+            extra={"s3_bucket": settings.s3_bucket_name, "s3_key": key},
+        )
+        raise RuntimeError("Failed to read image metadata from S3 (BotoCoreError).") from exc
+    return {
+        "size_bytes": int(response.get("ContentLength") or 0),
+        "content_type": str(response.get("ContentType") or ""),
+    }
+
+
+def download_object(key: str) -> bytes:
+    _assert_s3_config()
+    settings = get_settings()
+    try:
+        response = _s3_client().get_object(Bucket=settings.s3_bucket_name, Key=key)
+        return response["Body"].read()
+    except ClientError as exc:
+        code = exc.response.get("Error", {}).get("Code") if hasattr(exc, "response") else None
+        logger.exception(
+            "S3 get_object failed",
+            extra={"s3_bucket": settings.s3_bucket_name, "s3_key": key, "aws_error_code": code},
+        )
+        raise RuntimeError(f"Failed to download image from S3 ({code or 'ClientError'}).") from exc
+    except BotoCoreError as exc:
+        logger.exception(
+            "S3 get_object failed (BotoCoreError)",
+            extra={"s3_bucket": settings.s3_bucket_name, "s3_key": key},
+        )
+        raise RuntimeError("Failed to download image from S3 (BotoCoreError).") from exc
+
+
+def list_objects(prefix: str) -> Iterator[list[dict[str, Any]]]:
+    """Yield pages of {"key", "size_bytes", "last_modified"} under ``prefix``."""
+    _assert_s3_config()
+    settings = get_settings()
+    paginator = _s3_client().get_paginator("list_objects_v2")
+    try:
+        for page in paginator.paginate(Bucket=settings.s3_bucket_name, Prefix=prefix):
+            yield [
+                {
+                    "key": item["Key"],
+                    "size_bytes": int(item.get("Size") or 0),
+                    "last_modified": item["LastModified"],
+                }
+                for item in page.get("Contents", [])
+            ]
+    except (ClientError, BotoCoreError) as exc:
+        logger.exception(
+            "S3 list_objects_v2 failed",
+            extra={"s3_bucket": settings.s3_bucket_name, "s3_prefix": prefix},
+        )
+        raise RuntimeError("Failed to list images in S3.") from exc
+
+
+def delete_objects(keys: list[str]) -> int:
+    """Delete ``keys`` with as few DeleteObjects calls as possible; returns the count."""
+    _assert_s3_config()
+    settings = get_settings()
+    deleted = 0
+    for start in range(0, len(keys), DELETE_BATCH_SIZE):
+        batch = keys[start : start + DELETE_BATCH_SIZE]
+        try:
+            response = _s3_client().delete_objects(
+                Bucket=settings.s3_bucket_name,
+                Delete={"Objects": [{"Key": key} for key in batch], "Quiet": True},
+            )
+        except (ClientError, BotoCoreError) as exc:
+            logger.exception(
+                "S3 delete_objects failed",
+                extra={"s3_bucket": settings.s3_bucket_name, "batch_size": len(batch)},
+            )
+            raise RuntimeError("Failed to delete images from S3.") from exc
+
+        errors = response.get("Errors") or []
+        if errors:
+            logger.error(
+                "S3 delete_objects reported errors",
+                extra={"s3_bucket": settings.s3_bucket_name, "aws_errors": errors[:10]},
+            )
+            raise RuntimeError(f"Failed to delete {len(errors)} image(s) from S3.")
+        deleted += len(batch)
+    return deleted
@@ -0,0 +1,137 @@
+"""OpenTelemetry tracing, picked by ``TRACING_EXPORTER``.
+
+- ``none`` (default): spans go to the API's no-op tracer and cost a function call.
+- ``file``: finished spans are appended as JSON lines to ``TRACING_FILE``.
+- ``otlp``: spans are sent over OTLP/HTTP to ``TRACING_OTLP_ENDPOINT`` (an
+  OpenTelemetry collector, Jaeger, Tempo, or ``python -m bench.otlp_standin``).
+
+Each HTTP request gets a server span (continuing an incoming ``traceparent``),
+and eBird/Wikipedia calls, SQL statements, object storage calls and image
+tasks get child spans. The trace context lives in a context variable, so it
+follows ``run_in_threadpool`` and asyncio tasks; ``in_current_trace`` carries
+it into threads started by hand, such as the zones refresh.
+"""
+from __future__ import annotations
+
+from collections.abc import Callable
+from functools import lru_cache, wraps
+import logging
+from typing import Any, TypeVar
+
+from opentelemetry import context as otel_context, propagate, trace
+from opentelemetry.trace import SpanKind, Status, StatusCode
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .config import get_settings
+
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# A proxy until configure_tracing() installs the SDK provider; a no-op if it never does.
+tracer = trace.get_tracer("birdtarifa")
+
+
+@lru_cache
+def configure_tracing() -> bool:
+    """Install the span exporter picked by ``TRACING_EXPORTER``; False when tracing is off."""
+    settings = get_settings()
+    if settings.tracing_exporter == "none":
+        return False
+
+    # Only needed with tracing on.
+    from opentelemetry.sdk.resources import Resource
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter, SpanExporter
+    from opentelemetry.sdk.trace.sampling import ParentBased, TraceIdRatioBased
+
+    exporter: SpanExporter
+    if settings.tracing_exporter == "file":
+        exporter = ConsoleSpanExporter(
+            # Left open for the life of the process.
+            out=open(settings.tracing_file, "a", encoding="utf-8"),
+            formatter=lambda span: span.to_json(indent=None) + "\n",
+        )
+    else:
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+
+        exporter = OTLPSpanExporter(endpoint=settings.tracing_otlp_endpoint)
+
+    provider = TracerProvider(
+        resource=Resource.create(
+            {"service.name": settings.tracing_service_name, "deployment.environment": settings.app_env}
+        ),
+        sampler=ParentBased(TraceIdRatioBased(settings.tracing_sample_ratio)),
+    )
+    # Batched in a background thread: requests never wait on the exporter.
+    provider.add_span_processor(BatchSpanProcessor(exporter))
+    trace.set_tracer_provider(provider)
+    logger.info("Tracing to %s", settings.tracing_exporter)
+    return True
+
+
+def shutdown_tracing() -> None:
+    """Flush spans still waiting in the batch processor."""
+    provider = trace.get_tracer_provider()
+    if hasattr(provider, "shutdown"):
+        provider.shutdown()
+
+
+def in_current_trace(fn: Callable[..., T]) -> Callable[..., T]:
+    """``fn`` wrapped to run under the caller's trace context, e.g. in a thread it starts.
+
+    Only the trace context is carried over, not other context variables such as
+    the caller's latency budget.
+    """
+    captured = otel_context.get_current()
+
+    @wraps(fn)
+    def wrapper(*args: Any, **kwargs: Any) -> T:
+        token = otel_context.attach(captured)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            otel_context.detach(token)
+
+    return wrapper
+
+
+class TracingMiddleware:
+    """Open a server span per HTTP request, named after its route template."""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        carrier = {name.decode("latin-1"): value.decode("latin-1") for name, value in scope["headers"]}
+        status_code = 500
+
+        async def recording_send(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        method = scope["method"]
+        with tracer.start_as_current_span(
+            method,
+            context=propagate.extract(carrier),
+            kind=SpanKind.SERVER,
+            attributes={"http.request.method": method, "url.path": scope["path"]},
+        ) as span:
+            try:
+                await self.app(scope, receive, recording_send)
+            finally:
+                # The router stores the matched route in the scope once it has run.
+                route = getattr(scope.get("route"), "path", None)
+                if route is not None:
+                    span.update_name(f"{method} {route}")
+                    span.set_attribute("http.route", route)
+                span.set_attribute("http.response.status_code", status_code)
+                if status_code >= 500:
+                    span.set_status(Status(StatusCode.ERROR))
@@ -0,0 +1,160 @@
+"""Incremental reading and validation of photo uploads.
+
+Two layers keep an upload from being buffered before we know it's acceptable:
+
+- ``UploadSizeLimitMiddleware`` counts request body bytes as they arrive and
+  answers 413 as soon as the limit is crossed (or straight away when the
+  ``Content-Length`` header already says so).
+- ``spool_upload`` copies the parsed file in chunks into a spooled temp file,
+  sniffing the real image type from the first chunk instead of trusting the
+  client's ``content_type`` and hashing the bytes on the way through.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+import hashlib
+from tempfile import SpooledTemporaryFile
+from typing import IO
+
+from fastapi import HTTPException, UploadFile, status
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+
+CHUNK_SIZE = 64 * 1024
+
+# Multipart boundaries and part headers on top of the file itself.
+MULTIPART_OVERHEAD_BYTES = 16 * 1024
+
+
+class UploadTooLargeError(ValueError):
+    pass
+
+
+class UnsupportedUploadError(ValueError):
+    pass
+
+
+def sniff_image_type(head: bytes) -> str | None:
+    """Return the image content type from the file's magic bytes."""
+    if head.startswith(b"\xff\xd8\xff"):
+        return "image/jpeg"
+    if head.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "image/png"
+    if len(head) >= 12 and head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    return None
+
+
+@dataclass
+class SpooledUpload:
+    file: IO[bytes]
+    size: int
+    content_type: str
+    sha256: str
+
+    def read_bytes(self) -> bytes:
+        self.file.seek(0)
+        return self.file.read()
+
+    def close(self) -> None:
+        self.file.close()
+
+
+async def spool_upload(
+    upload: UploadFile,
+    *,
+    max_bytes: int,
+    memory_bytes: int,
+    chunk_size: int = CHUNK_SIZE,
+) -> SpooledUpload:
+    """Copy ``upload`` into a temp file that stays in memory up to ``memory_bytes``."""
+    spool: IO[bytes] = SpooledTemporaryFile(max_size=memory_bytes)
+    digest = hashlib.sha256()
+    size = 0
+    content_type: str | None = None
+    try:
+        while chunk := await upload.read(chunk_size):
+            if content_type is None:
+                content_type = sniff_image_type(chunk)
+                if content_type is None:
+                    raise UnsupportedUploadError("Unsupported image type. Use jpeg, png or webp.")
+            size += len(chunk)
+            if size > max_bytes:
+                raise UploadTooLargeError(f"File exceeds {max_bytes // (1024 * 1024)}MB limit.")
+            digest.update(chunk)
+            spool.write(chunk)
+    except BaseException:
+        spool.close()
+        raise
+
+    spool.seek(0)
+    return SpooledUpload(
+        file=spool,
+        size=size,
+        content_type=content_type or "",
+        sha256=digest.hexdigest(),
+    )
+
+
+class _BodyTooLarge(HTTPException):
+    # An HTTPException so FastAPI's body parsing re-raises it untouched and the
+    # exception middleware turns it into a regular 413 response.
+    def __init__(self) -> None:
+        super().__init__(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail="Request body too large.",
+        )
+
+
+class UploadSizeLimitMiddleware:
+    """Reject request bodies over ``max_bytes`` for the given paths while streaming."""
+
+    def __init__(self, app: ASGIApp, *, paths: set[str], max_bytes: int) -> None:
+        self.app = app
+        self.paths = paths
+        self.max_bytes = max_bytes
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["path"] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+
+        too_large = JSONResponse(
+            {"detail": "Request body too large."},
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        )
+        for name, value in scope.get("headers", []):
+            if name == b"content-length":
+                try:
+                    declared = int(value)
+                except ValueError:
+                    declared = 0
+                if declared > self.max_bytes:
+                    await too_large(scope, receive, send)
+                    return
+
+        received = 0
+        response_started = False
+
+        async def limited_receive() -> Message:
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes:
+                    raise _BodyTooLarge
+            return message
+
+        async def tracking_send(message: Message) -> None:
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, tracking_send)
+        except _BodyTooLarge:
+            if response_started:
+                raise
+            await too_large(scope, receive, send)
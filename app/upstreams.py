@@ -0,0 +1,251 @@
+"""Circuit breakers and a per-request latency budget for eBird and Wikipedia.
+
+Each upstream has a breaker that opens after ``UPSTREAM_FAILURE_THRESHOLD``
+consecutive failures or timeouts. While it is open, calls fail immediately
+with ``UpstreamUnavailableError`` instead of waiting out the HTTP timeout.
+After ``UPSTREAM_RESET_AFTER_S`` one probe call is let through (half-open);
+its outcome closes the breaker or opens it again. Calls the breaker lets
+through also take a token from the upstream's shared quota (``app.quotas``).
+
+``LatencyBudgetMiddleware`` (or ``latency_budget`` directly) gives a request a
+deadline. It lives in a context variable, so it follows the request into
+``run_in_threadpool``. Fetchers take their HTTP timeout from what is left of
+it and stop calling upstream once it is spent. Either way callers fall back
+to cached or rules-based data.
+"""
+from __future__ import annotations
+
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from threading import Lock
+from time import monotonic, perf_counter
+from typing import Literal
+
+from opentelemetry.trace import SpanKind
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from . import profiling
+from .config import get_settings
+from .metrics import UPSTREAM_DURATION, UPSTREAM_REJECTED
+from .quotas import TokenBucket
+from .tracing import tracer
+
+
+BreakerState = Literal["closed", "open", "half_open"]
+
+# Not worth starting an HTTP call with less time than this left.
+MIN_CALL_TIMEOUT_S = 0.05
+
+# Longest an interactive call waits for a quota token when it has no latency budget.
+QUOTA_MAX_WAIT_S = 2.0
+
+_deadline: ContextVar[float | None] = ContextVar("upstream_deadline", default=None)
+
+_registry: dict[str, CircuitBreaker] = {}
+
+
+class UpstreamUnavailableError(RuntimeError):
+    """The breaker is open or the request's latency budget is spent; use a fallback."""
+
+
+def _is_upstream_failure(exc: BaseException) -> bool:
+    # Only reached from inside an HTTP call, so httpx is already imported.
+    import httpx
+
+    if isinstance(exc, httpx.TransportError):  # timeouts, connection errors
+        return True
+    if isinstance(exc, httpx.HTTPStatusError):
+        return exc.response.status_code == 429 or exc.response.status_code >= 500
+    return False
+
+
+class CircuitBreaker:
+    """Consecutive-failure breaker for one upstream; thread-safe."""
+
+    def __init__(
+        self,
+        name: str,
+        *,
+        failure_threshold: int,
+        reset_after_s: float,
+        quota: TokenBucket | None = None,
+    ) -> None:
+        self.name = name
+        self.quota = quota
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_after_s = reset_after_s
+        self.state: BreakerState = "closed"
+        self._lock = Lock()
+        self._consecutive_failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self.calls = 0
+        self.failures = 0
+        self.rejected = 0
+        self.budget_exhausted = 0
+        self.opened = 0
+        _registry[name] = self
+
+    def _before_call(self) -> None:
+        with self._lock:
+            if self.state == "open" and monotonic() - self._opened_at >= self.reset_after_s:
+                self.state = "half_open"
+            if self.state == "open" or (self.state == "half_open" and self._probing):
+                self.rejected += 1
+                raise UpstreamUnavailableError(f"{self.name} circuit is open.")
+            if self.state == "half_open":
+                self._probing = True
+            self.calls += 1
+
+    def _record(self, *, ok: bool) -> None:
+        with self._lock:
+            self._probing = False
+            if ok:
+                self._consecutive_failures = 0
+                self.state = "closed"
+                return
+            self.failures += 1
+            self._consecutive_failures += 1
+            if self.state == "half_open" or self._consecutive_failures >= self.failure_threshold:
+                if self.state != "open":
+                    self.opened += 1
+                self.state = "open"
+                self._opened_at = monotonic()
+
+    def _release_probe(self) -> None:
+        with self._lock:
+            self._probing = False
+
+    @contextmanager
+    def call(self, timeout_s: float, *, operation: str) -> Iterator[float]:
+        """Guard one upstream HTTP call; yields the timeout to use (capped by the latency budget)."""
+        with tracer.start_as_current_span(
+            f"{self.name}.{operation}",
+            kind=SpanKind.CLIENT,
+            attributes={"upstream": self.name, "upstream.operation": operation},
+        ) as span:
+            timeout = timeout_s
+            deadline = _deadline.get()
+            if deadline is not None:
+                timeout = min(timeout_s, deadline - monotonic())
+                if timeout < MIN_CALL_TIMEOUT_S:
+                    with self._lock:
+                        self.budget_exhausted += 1
+                    UPSTREAM_REJECTED.labels(self.name, operation, "budget").inc()
+                    span.set_attribute("upstream.rejected", "budget")
+                    profiling.record("upstream", f"{self.name}.{operation}", perf_counter(), 0.0, outcome="budget")
+                    raise UpstreamUnavailableError(f"Latency budget spent before calling {self.name}.")
+
+            try:
+                self._before_call()
+            except UpstreamUnavailableError:
+                UPSTREAM_REJECTED.labels(self.name, operation, "circuit_open").inc()
+                span.set_attribute("upstream.rejected", "circuit_open")
+                profiling.record("upstream", f"{self.name}.{operation}", perf_counter(), 0.0, outcome="circuit_open")
+                raise
+            if self.quota is not None:
+                max_wait = QUOTA_MAX_WAIT_S
+                if deadline is not None:
+                    max_wait = min(max_wait, deadline - monotonic() - MIN_CALL_TIMEOUT_S)
+                if not self.quota.acquire(max_wait_s=max(0.0, max_wait)):
+                    self._release_probe()
+                    UPSTREAM_REJECTED.labels(self.name, operation, "quota").inc()
+                    span.set_attribute("upstream.rejected", "quota")
+                    profiling.record("upstream", f"{self.name}.{operation}", perf_counter(), 0.0, outcome="quota")
+                    raise UpstreamUnavailableError(f"{self.name} quota exhausted.")
+                if deadline is not None:
+                    timeout = max(MIN_CALL_TIMEOUT_S, min(timeout, deadline - monotonic()))
+
+            span.set_attribute("upstream.timeout_s", round(timeout, 3))
+            started = perf_counter()
+            try:
+                yield timeout
+            except Exception as exc:
+                elapsed = perf_counter() - started
+                UPSTREAM_DURATION.labels(self.name, operation, "error").observe(elapsed)
+                profiling.record("upstream", f"{self.name}.{operation}", started, elapsed, outcome=type(exc).__name__)
+                # A timeout counts even when the budget shortened it: the upstream is too slow for us.
+                self._record(ok=not _is_upstream_failure(exc))
+                raise
+            except BaseException:
+                self._release_probe()
+                raise
+            else:
+                elapsed = perf_counter() - started
+                UPSTREAM_DURATION.labels(self.name, operation, "ok").observe(elapsed)
+                profiling.record("upstream", f"{self.name}.{operation}", started, elapsed, outcome="ok")
+                self._record(ok=True)
+
+    def stats(self) -> dict[str, int | str]:
+        with self._lock:
+            state = self.state
+            if state == "open" and monotonic() - self._opened_at >= self.reset_after_s:
+                state = "half_open"
+            return {
+                "state": state,
+                "consecutive_failures": self._consecutive_failures,
+                "calls": self.calls,
+                "failures": self.failures,
+                "rejected": self.rejected,
+                "budget_exhausted": self.budget_exhausted,
+                "opened": self.opened,
+            }
+
+
+@contextmanager
+def latency_budget(seconds: float) -> Iterator[None]:
+    """Upstream calls made inside (including from threadpool workers) share ``seconds`` in total."""
+    deadline = monotonic() + seconds
+    outer = _deadline.get()
+    if outer is not None:
+        deadline = min(deadline, outer)
+    token = _deadline.set(deadline)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+class LatencyBudgetMiddleware:
+    """Run requests to ``paths`` under a ``latency_budget`` of ``seconds``."""
+
+    def __init__(self, app: ASGIApp, *, paths: set[str], seconds: float) -> None:
+        self.app = app
+        self.paths = paths
+        self.seconds = seconds
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["path"] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+        with latency_budget(self.seconds):
+            await self.app(scope, receive, send)
+
+
+def breaker_stats() -> dict[str, dict[str, int | str]]:
+    return {name: breaker.stats() for name, breaker in sorted(_registry.items())}
+
+
+ebird_breaker = CircuitBreaker(
+    "ebird",
+    failure_threshold=get_settings().upstream_failure_threshold,
+    reset_after_s=get_settings().upstream_reset_after_s,
+    quota=TokenBucket(
+        "ebird",
+        per_min=get_settings().ebird_quota_per_min,
+        burst=get_settings().ebird_quota_burst,
+        background_reserve=get_settings().quota_background_reserve,
+    ),
+)
+wikipedia_breaker = CircuitBreaker(
+    "wikipedia",
+    failure_threshold=get_settings().upstream_failure_threshold,
+    reset_after_s=get_settings().upstream_reset_after_s,
+    quota=TokenBucket(
+        "wikipedia",
+        per_min=get_settings().wikipedia_quota_per_min,
+        burst=get_settings().wikipedia_quota_burst,
+        background_reserve=get_settings().quota_background_reserve,
+    ),
+)
@@ -1,11 +1,15 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from functools import lru_cache
-from typing import Any
+from typing import TYPE_CHECKING, Any
 from urllib.parse import quote
 
-import httpx
+from .cache import Codec, LRUCache
+from .config import get_settings
+from .upstreams import UpstreamUnavailableError, wikipedia_breaker
+
+if TYPE_CHECKING:
+    import httpx
 
 
 @dataclass(frozen=True)
@@ -19,8 +23,15 @@ class WikiBirdInfo:
     page_type: str | None = None
 
 
+def _http_client(**kwargs: Any) -> httpx.Client:
+    # httpx is only needed once Wikipedia is actually called; keep it off the cold-start path.
+    import httpx
+
+    return httpx.Client(**kwargs)
+
+
 def _wiki_api_base(lang: str) -> str:
-    return f"https://{lang}.wikipedia.org"
+    return get_settings().wikipedia_base_url.format(lang=lang).rstrip("/")
 
 
 def _wiki_user_agent() -> str:
@@ -50,7 +61,10 @@ def _search_wikipedia_titles(
     }
 
     headers = {"User-Agent": _wiki_user_agent()}
-    with httpx.Client(timeout=timeout_s, headers=headers) as client:
+    with (
+        wikipedia_breaker.call(timeout_s, operation="search") as timeout,
+        _http_client(timeout=timeout, headers=headers) as client,
+    ):
         response = client.get(url, params=params)
         response.raise_for_status()
         payload: dict[str, Any] = response.json()
@@ -74,7 +88,10 @@ def _fetch_wikipedia_summary(*, lang: str, title: str, timeout_s: float = 10.0)
 
     url = f"{_wiki_api_base(lang)}/api/rest_v1/page/summary/{quote(title)}"
     headers = {"User-Agent": _wiki_user_agent()}
-    with httpx.Client(timeout=timeout_s, headers=headers) as client:
+    with (
+        wikipedia_breaker.call(timeout_s, operation="summary") as timeout,
+        _http_client(timeout=timeout, headers=headers) as client,
+    ):
         response = client.get(url)
         if response.status_code == 404:
             return None
@@ -137,16 +154,31 @@ def _looks_like_bird(*, lang: str, info: WikiBirdInfo) -> bool:
     return any(hint in text for hint in hints)
 
 
-@lru_cache(maxsize=1024)
+# Articles rarely change; "no article found" is cached too.
+WIKI_TTL_S = 7 * 24 * 60 * 60
+
+_info_cache: LRUCache[str, WikiBirdInfo | None] = LRUCache(
+    "wikipedia",
+    maxsize=1024,
+    ttl_s=WIKI_TTL_S,
+    codec=Codec.json(WikiBirdInfo | None),
+)
+
+
 def lookup_bird_info(species: str) -> WikiBirdInfo | None:
     """Best-effort bird info lookup via Wikipedia (es -> en fallback).
 
-    Cached in-memory to keep the UI snappy and avoid repeated lookups.
+    Cached to keep the UI snappy and avoid repeated lookups. Raises
+    ``UpstreamUnavailableError`` (and caches nothing) when Wikipedia failed or was skipped.
     """
     species = species.strip()
     if not species:
         return None
+    return _info_cache.get_or_create(species.lower(), lambda: _lookup_bird_info(species))
+
 
+def _lookup_bird_info(species: str) -> WikiBirdInfo | None:
+    failed = False
     for lang in ("es", "en"):
         try:
             # Try a couple of query variants to avoid unrelated results (albums, bands, etc).
@@ -180,7 +212,13 @@ def lookup_bird_info(species: str) -> WikiBirdInfo | None:
 
             if best_without_photo:
                 return best_without_photo
+        except UpstreamUnavailableError:
+            raise
         except Exception:
+            failed = True
             continue
 
+    if failed:
+        # Raise so the "wikipedia" cache never stores a miss that was caused by an error.
+        raise UpstreamUnavailableError("Wikipedia lookup failed.")
     return None
@@ -0,0 +1,106 @@
+"""Bounded executors for the blocking parts of the upload pipeline.
+
+Image decoding/re-encoding is CPU-bound, so it runs in a small process pool
+(the GIL would otherwise serialize it with the event loop). Storage calls are
+blocking network I/O, so they run in a thread pool. Both pools have a cap on
+queued work: once it is reached we refuse new jobs instead of letting the
+queue (and memory) grow without bound.
+"""
+from __future__ import annotations
+
+import asyncio
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+import contextvars
+from functools import lru_cache, partial
+from time import process_time
+from typing import Any, Callable, TypeVar
+
+from .config import get_settings
+from .metrics import IMAGE_CPU
+from .tracing import tracer
+
+
+T = TypeVar("T")
+
+
+class PoolSaturatedError(RuntimeError):
+    """Raised when a pool already has as much pending work as it accepts."""
+
+
+class _BoundedPool:
+    def __init__(self, *, name: str, executor: Executor, max_pending: int, copy_context: bool = False) -> None:
+        self.name = name
+        self.executor = executor
+        self.max_pending = max(1, max_pending)
+        # Only thread pools can run jobs in the caller's context; process pools can't pickle it.
+        self.copy_context = copy_context
+        self.pending = 0
+
+    async def run(self, fn: Callable[..., T], /, *args: Any, **kwargs: Any) -> T:
+        # Only ever touched from the event loop thread, so a plain counter is enough.
+        if self.pending >= self.max_pending:
+            raise PoolSaturatedError(f"{self.name} pool is saturated, retry later.")
+
+        self.pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            call = partial(fn, *args, **kwargs)
+            if self.copy_context:
+                # run_in_executor drops context variables (trace, latency budget) otherwise.
+                call = partial(contextvars.copy_context().run, call)
+            return await loop.run_in_executor(self.executor, call)
+        finally:
+            self.pending -= 1
+
+
+@lru_cache
+def _image_pool() -> _BoundedPool:
+    settings = get_settings()
+    workers = max(1, settings.image_workers)
+    return _BoundedPool(
+        name="image",
+        executor=ProcessPoolExecutor(max_workers=workers),
+        max_pending=workers + settings.image_queue_size,
+    )
+
+
+@lru_cache
+def _storage_pool() -> _BoundedPool:
+    settings = get_settings()
+    workers = max(1, settings.storage_workers)
+    return _BoundedPool(
+        name="storage",
+        executor=ThreadPoolExecutor(max_workers=workers, thread_name_prefix="storage"),
+        max_pending=workers + settings.storage_queue_size,
+        copy_context=True,
+    )
+
+
+def _with_cpu_time(fn: Callable[..., T], /, *args: Any, **kwargs: Any) -> tuple[T, float]:
+    # Runs in the worker process, where the CPU time is actually spent.
+    started = process_time()
+    result = fn(*args, **kwargs)
+    return result, process_time() - started
+
+
+async def run_image_task(fn: Callable[..., T], /, *args: Any, **kwargs: Any) -> T:
+    """Run a picklable CPU-bound callable in the image process pool."""
+    task = getattr(fn, "__name__", "task")
+    # The span covers queueing and the work in the child process, which has no trace context of its own.
+    with tracer.start_as_current_span(f"image.{task}") as span:
+        result, cpu_s = await _image_pool().run(_with_cpu_time, fn, *args, **kwargs)
+        span.set_attribute("image.cpu_s", round(cpu_s, 4))
+    IMAGE_CPU.labels(task).observe(cpu_s)
+    return result
+
+
+async def run_storage_task(fn: Callable[..., T], /, *args: Any, **kwargs: Any) -> T:
+    """Run a blocking storage call in the storage thread pool."""
+    return await _storage_pool().run(fn, *args, **kwargs)
+
+
+def shutdown_pools() -> None:
+    for factory in (_image_pool, _storage_pool):
+        if factory.cache_info().currsize:
+            factory().executor.shutdown(wait=False, cancel_futures=True)
+            factory.cache_clear()
@@ -0,0 +1,164 @@
+"""Zones for the dropdown: the region's geo point plus a few eBird hotspots.
+
+Building the list takes a slow eBird call, so ``get_zones`` never waits for
+it: it answers with the last good list and, once that is older than
+``ZONES_TTL_S``, refreshes it in a background thread (stale-while-revalidate).
+A failed refresh keeps the previous list and is retried after
+``ZONES_RETRY_S``. Good lists are saved to ``cache_snapshots`` so other
+workers and new deploys start warm instead of calling eBird again. Each
+region has its own entry in a bounded LRU cache.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+import logging
+from threading import Lock, Thread
+from time import time
+
+from sqlalchemy.exc import SQLAlchemyError
+
+from .cache import LRUCache
+from .config import get_settings
+from .db import SessionLocal
+from .ebird import EbirdHotspot
+from .geo import is_active
+from .models import CacheSnapshot
+from .quotas import background_calls
+from .tracing import in_current_trace, tracer
+from .regions import Region, region_hotspots
+from .schemas import ZoneOut
+
+
+logger = logging.getLogger(__name__)
+
+ZONES_TTL_S = 6 * 60 * 60
+ZONES_RETRY_S = 5 * 60
+MAX_HOTSPOT_ZONES = 12
+ZONE_MIN_SPACING_KM = 1.0
+
+
+@dataclass
+class _ZonesEntry:
+    region: Region
+    zones: list[ZoneOut] | None = None
+    refreshed_at: float = 0.0
+    retry_at: float = 0.0
+    snapshot_loaded: bool = False
+    refreshing: Lock = field(default_factory=Lock)
+
+
+_entries: LRUCache[str, _ZonesEntry] = LRUCache("zones", maxsize=get_settings().region_cache_size)
+
+
+def _geo_zone(region: Region) -> ZoneOut:
+    return ZoneOut(id="geo", name=f"{region.name} (radio {region.dist_km} km)", kind="geo")
+
+
+def _snapshot_name(region: Region) -> str:
+    return f"zones:{region.key}"
+
+
+def build_zones(region: Region) -> list[ZoneOut] | None:
+    """Fresh zone list, or None when eBird failed (callers keep what they have)."""
+    settings = get_settings()
+    zones: list[ZoneOut] = [_geo_zone(region)]
+
+    if not settings.ebird_api_key:
+        return zones
+
+    try:
+        index = region_hotspots(region)
+    except Exception:
+        logger.warning("eBird hotspot lookup failed", exc_info=True)
+        return None
+
+    # Prefer the region's own country (Tarifa is on the border so geo search includes
+    # Morocco too), then hotspots with recent activity so predictions are meaningful,
+    # each only when there are any.
+    since = (datetime.now(timezone.utc) - timedelta(days=settings.ebird_geo_back_days)).date()
+    country = region.country_code
+    if not any(hotspot.country_code == country for hotspot in index.hotspots):
+        country = None
+    recent_only = any(
+        is_active(hotspot, since) and (country is None or hotspot.country_code == country)
+        for hotspot in index.hotspots
+    )
+
+    def eligible(hotspot: EbirdHotspot) -> bool:
+        if country is not None and hotspot.country_code != country:
+            return False
+        return not recent_only or is_active(hotspot, since)
+
+    # Avoid an overwhelming dropdown: a few representative hotspots, most popular first,
+    # at least ZONE_MIN_SPACING_KM apart.
+    for hotspot in index.spread(limit=MAX_HOTSPOT_ZONES, min_km=ZONE_MIN_SPACING_KM, where=eligible):
+        zones.append(ZoneOut(id=hotspot.id, name=hotspot.name, kind="hotspot"))
+
+    return zones
+
+
+def _load_snapshot(entry: _ZonesEntry) -> None:
+    with SessionLocal() as db:
+        row = db.get(CacheSnapshot, _snapshot_name(entry.region))
+    if row is None:
+        return
+    refreshed_at = row.refreshed_at
+    if refreshed_at.tzinfo is None:  # SQLite drops the timezone
+        refreshed_at = refreshed_at.replace(tzinfo=timezone.utc)
+    if refreshed_at.timestamp() > entry.refreshed_at:
+        entry.zones = [ZoneOut.model_validate(item) for item in row.payload]
+        entry.refreshed_at = refreshed_at.timestamp()
+
+
+def _save_snapshot(region: Region, zones: list[ZoneOut], refreshed_at: float) -> None:
+    with SessionLocal() as db:
+        db.merge(
+            CacheSnapshot(
+                name=_snapshot_name(region),
+                payload=[zone.model_dump() for zone in zones],
+                refreshed_at=datetime.fromtimestamp(refreshed_at, tz=timezone.utc),
+            )
+        )
+        db.commit()
+
+
+def _refresh(entry: _ZonesEntry) -> None:
+    with tracer.start_as_current_span("zones.refresh", attributes={"region": entry.region.key}):
+        try:
+            # Another worker may have refreshed the snapshot already.
+            _load_snapshot(entry)
+            if entry.zones is not None and time() - entry.refreshed_at < ZONES_TTL_S:
+                return
+
+            with background_calls():
+                zones = build_zones(entry.region)
+            if zones is None:
+                entry.retry_at = time() + ZONES_RETRY_S
+                return
+            entry.zones, entry.refreshed_at = zones, time()
+            _save_snapshot(entry.region, zones, entry.refreshed_at)
+        except Exception:
+            logger.exception("Zones refresh failed")
+            entry.retry_at = time() + ZONES_RETRY_S
+        finally:
+            entry.refreshing.release()
+
+
+def get_zones(region: Region) -> list[ZoneOut]:
+    """Last good zone list for ``region``, refreshed in the background when stale. Never blocks on eBird."""
+    entry = _entries.get_or_create(region.key, lambda: _ZonesEntry(region=region))
+    if not entry.snapshot_loaded:
+        entry.snapshot_loaded = True
+        try:
+            _load_snapshot(entry)
+        except SQLAlchemyError:
+            logger.exception("Could not load zones snapshot")
+
+    now = time()
+    stale = entry.zones is None or now - entry.refreshed_at >= ZONES_TTL_S
+    if stale and now >= entry.retry_at and entry.refreshing.acquire(blocking=False):
+        Thread(target=in_current_trace(_refresh), args=(entry,), name="zones-refresh", daemon=True).start()
+
+    # Nothing good yet (first start ever, eBird down): the geo zone still works.
+    return entry.zones or [_geo_zone(region)]
@@ -0,0 +1 @@
+"""Benchmarks for the Bird Tarifa API (run with ``python -m bench.<name>``)."""
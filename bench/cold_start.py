@@ -0,0 +1,88 @@
+"""Cold start: import time per module and time until ``/health`` answers.
+
+Import times come from ``python -X importtime -c "import app.main"`` in a
+fresh interpreter; time to ready spawns uvicorn the way Railway does and
+polls ``/health``. Uses the current environment (``DATABASE_URL`` etc.):
+
+    python -m bench.cold_start --runs 5
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+
+from app.startup import LAZY_MODULES
+
+
+def import_times() -> list[tuple[str, float, float]]:
+    """``(module, self_ms, cumulative_ms)`` for every module ``app.main`` pulls in."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:") :].split("|")
+        rows.append((name.strip(), int(self_us) / 1000, int(cumulative_us) / 1000))
+    return rows
+
+
+def time_to_ready(port: int, timeout_s: float = 30.0) -> float:
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        env=os.environ.copy(),
+    )
+    try:
+        while time.perf_counter() - started < timeout_s:
+            try:
+                if httpx.get(f"http://127.0.0.1:{port}/health", timeout=0.5).status_code == 200:
+                    return time.perf_counter() - started
+            except httpx.TransportError:
+                pass
+            time.sleep(0.01)
+        raise RuntimeError("Server did not become ready.")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main_cli() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--top", type=int, default=12)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    rows = import_times()
+    total = next(cumulative for name, _self, cumulative in rows if name == "app.main")
+    loaded = {name for name, _self, _cumulative in rows}
+    print(f"import app.main: {total:.1f} ms")
+    print(f"lazy modules loaded at import: {[name for name in LAZY_MODULES if name in loaded] or 'none'}")
+    packages = sorted(
+        (row for row in rows if "." not in row[0] or row[0].startswith("app.")),
+        key=lambda row: row[2],
+        reverse=True,
+    )
+    for name, self_ms, cumulative_ms in packages[: args.top]:
+        print(f"  {name:<28} self={self_ms:7.1f} ms  cumulative={cumulative_ms:7.1f} ms")
+
+    samples = [time_to_ready(args.port) * 1000 for _ in range(args.runs)]
+    print(
+        f"time to ready: median={statistics.median(samples):.0f} ms  "
+        f"min={min(samples):.0f} ms  max={max(samples):.0f} ms  ({args.runs} runs)"
+    )
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,126 @@
+"""Throughput of ``GET /sightings`` with many concurrent clients.
+
+Compares the previous implementation (sync route in Starlette's threadpool on
+an engine with SQLAlchemy's default 5+10 pool) with the async route on the
+configured pool. Runs in-process against ``DATABASE_URL``; point it at a
+scratch database, it seeds sightings when the table is empty:
+
+    DATABASE_URL=postgresql://... python -m bench.db_load --clients 200
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+from datetime import datetime, timezone
+import time
+
+from fastapi import Depends, FastAPI, Query
+import httpx
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import Session, sessionmaker
+
+from app import main
+from app.config import get_settings
+from app.db import Base, SessionLocal, _normalize_database_url, async_engine, engine
+from app.models import Sighting
+from app.schemas import SightingOut
+from bench.fixtures import percentile
+
+
+def _sync_app() -> FastAPI:
+    # The route as it was before the async port, on an engine with default pool settings.
+    legacy_engine = create_engine(
+        _normalize_database_url(get_settings().database_url), pool_pre_ping=True, future=True
+    )
+    legacy_session = sessionmaker(bind=legacy_engine, autoflush=False, future=True)
+
+    def get_db():
+        db = legacy_session()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app = FastAPI()
+
+    @app.get("/sightings", response_model=list[SightingOut])
+    def list_sightings(
+        limit: int = Query(default=50, ge=1, le=200),
+        db: Session = Depends(get_db),
+    ) -> list[Sighting]:
+        stmt = select(Sighting).order_by(Sighting.observed_at.desc()).limit(limit)
+        return list(db.scalars(stmt).all())
+
+    return app
+
+
+def _seed(rows: int) -> None:
+    Base.metadata.create_all(bind=engine)
+    with SessionLocal() as db:
+        if db.scalar(select(func.count()).select_from(Sighting)):
+            return
+        now = datetime.now(timezone.utc)
+        db.add_all(
+            Sighting(zone="Tarifa Centro", species_guess=f"bench {i}", observed_at=now) for i in range(rows)
+        )
+        db.commit()
+
+
+async def _run(app: FastAPI, *, clients: int, requests: int, limit: int) -> dict[str, float]:
+    transport = httpx.ASGITransport(app=app)
+    latencies: list[float] = []
+    errors = 0
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+
+        async def worker() -> None:
+            nonlocal errors
+            for _ in range(requests):
+                started = time.perf_counter()
+                try:
+                    response = await client.get("/sightings", params={"limit": limit})
+                    if response.status_code != 200:
+                        errors += 1
+                except Exception:
+                    errors += 1
+                latencies.append((time.perf_counter() - started) * 1000)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(clients)))
+        elapsed = time.perf_counter() - started
+
+    return {
+        "req_per_s": len(latencies) / elapsed,
+        "p50_ms": percentile(latencies, 50),
+        "p95_ms": percentile(latencies, 95),
+        "p99_ms": percentile(latencies, 99),
+        "errors": float(errors),
+    }
+
+
+def main_cli() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=20, help="Requests per client.")
+    parser.add_argument("--limit", type=int, default=50)
+    parser.add_argument("--mode", choices=("sync", "async", "both"), default="both")
+    args = parser.parse_args()
+
+    _seed(args.limit)
+    settings = get_settings()
+    print(
+        f"{args.clients} clients x {args.requests} requests, "
+        f"async pool {settings.db_pool_size}+{settings.db_max_overflow}"
+    )
+    apps = {"sync": _sync_app, "async": lambda: main.app}
+    modes = ("sync", "async") if args.mode == "both" else (args.mode,)
+    for mode in modes:
+        result = asyncio.run(_run(apps[mode](), clients=args.clients, requests=args.requests, limit=args.limit))
+        summary = "  ".join(f"{name}={value:.1f}" for name, value in result.items())
+        print(f"{mode:>5}: {summary}")
+        if mode == "async":
+            asyncio.run(async_engine.dispose())
+
+
+if __name__ == "__main__":
+    main_cli()
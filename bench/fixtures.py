@@ -0,0 +1,147 @@
+"""Synthetic inputs shared by the benchmarks."""
+from __future__ import annotations
+
+from collections.abc import Iterator
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from io import BytesIO
+import os
+from pathlib import Path
+import random
+import subprocess
+import sys
+import tempfile
+
+from fastapi import FastAPI
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.db import get_db
+from app.ebird import EbirdObservation
+
+
+# Generated fixture images are kept here so every run (before and after a change) uses the same bytes.
+FIXTURE_CACHE = Path(tempfile.gettempdir()) / "birdtarifa-bench"
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+
+def phone_jpeg(*, width: int = 4032, height: int = 3024, orientation: int = 6, quality: int = 70) -> bytes:
+    """A noisy JPEG roughly the size of a phone photo, with an EXIF Orientation tag."""
+    from PIL import Image
+
+    img = Image.merge(
+        "RGB",
+        [Image.effect_noise((width, height), sigma) for sigma in (40, 60, 80)],
+    )
+    exif = Image.Exif()
+    exif[274] = orientation
+    out = BytesIO()
+    img.save(out, format="JPEG", quality=quality, exif=exif)
+    return out.getvalue()
+
+
+def fixture_jpeg(*, width: int, height: int, orientation: int) -> bytes:
+    """``phone_jpeg`` generated once and then read back from ``FIXTURE_CACHE``."""
+    path = FIXTURE_CACHE / f"phone_{width}x{height}_o{orientation}.jpg"
+    if not path.exists():
+        FIXTURE_CACHE.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(phone_jpeg(width=width, height=height, orientation=orientation))
+    return path.read_bytes()
+
+
+def synthetic_observations(
+    count: int, *, species: int = 300, back_days: int = 30, seed: int = 7
+) -> list[EbirdObservation]:
+    """eBird observations spread over ``back_days``; one in ten has a date only, as eBird sends some."""
+    rng = random.Random(seed)
+    names = [f"Especie {index}" for index in range(species)]
+    now = datetime.now().replace(second=0, microsecond=0)
+    observations = []
+    for _ in range(count):
+        observed_at = now - timedelta(minutes=rng.randint(0, back_days * 24 * 60))
+        has_time = rng.random() >= 0.1
+        if not has_time:
+            observed_at = observed_at.replace(hour=0, minute=0)
+        raw = observed_at.strftime("%Y-%m-%d %H:%M" if has_time else "%Y-%m-%d")
+        observations.append(
+            EbirdObservation(
+                # Skewed like real data: a few common species, a long tail of rare ones.
+                common_name=names[min(species - 1, int(rng.paretovariate(1.2)) - 1)],
+                observed_at=observed_at,
+                observed_has_time=has_time,
+                raw_observed_at=raw,
+            )
+        )
+    return observations
+
+
+@contextmanager
+def scratch_database(app: FastAPI) -> Iterator[None]:
+    """Serve ``app``'s ``get_db`` from a freshly migrated SQLite file, so in-process benches need no DATABASE_URL."""
+    with tempfile.TemporaryDirectory(prefix="birdtarifa-bench-db-") as tmp:
+        url = f"sqlite:///{Path(tmp) / 'bench.sqlite'}"
+        subprocess.run(
+            [sys.executable, "-m", "alembic", "upgrade", "head"],
+            cwd=REPO_ROOT,
+            env={**os.environ, "DATABASE_URL": url},
+            check=True,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        engine = create_engine(url, future=True)
+        sessions = sessionmaker(bind=engine, autoflush=False, future=True)
+
+        def scratch_db() -> Iterator[Session]:
+            with sessions() as db:
+                yield db
+
+        app.dependency_overrides[get_db] = scratch_db
+        try:
+            yield
+        finally:
+            app.dependency_overrides.pop(get_db, None)
+            engine.dispose()
+
+
+def synthetic_sightings(count: int, *, seed: int = 7) -> list[dict[str, object]]:
+    """Rows as ``GET /sightings`` selects them; half have photo variants."""
+    rng = random.Random(seed)
+    now = datetime.now(timezone.utc)
+    rows: list[dict[str, object]] = []
+    for index in range(count):
+        observed_at = now - timedelta(minutes=rng.randint(0, 30 * 24 * 60), microseconds=rng.randint(0, 10**6))
+        key = f"photos/2026/10/{rng.getrandbits(64):016x}"
+        rows.append(
+            {
+                "id": index + 1,
+                "created_at": observed_at + timedelta(minutes=rng.randint(0, 120)),
+                "observed_at": observed_at,
+                "zone": f"Zona {rng.randint(1, 12)}",
+                "species_guess": f"Especie {rng.randint(0, 300)}",
+                "notes": "Visto desde el mirador, volando hacia el estrecho." if rng.random() < 0.5 else None,
+                "photo_url": f"https://media.example.org/{key}.jpg",
+                "photo_variants": (
+                    [
+                        {
+                            "name": name,
+                            "url": f"https://media.example.org/{key}-{name}.webp",
+                            "content_type": "image/webp",
+                            "width": width,
+                            "height": width * 3 // 4,
+                        }
+                        for name, width in (("thumb", 320), ("medium", 1280))
+                    ]
+                    if index % 2
+                    else None
+                ),
+            }
+        )
+    return rows
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
@@ -0,0 +1,378 @@
+"""Load test of the whole app against local stand-ins, compared with a stored baseline.
+
+Starts, each in its own process:
+
+- the eBird/Wikipedia stand-ins (``bench.upstream_standins``) with ``--upstream-latency-ms``
+- a moto S3 server (``--storage s3``; needs ``moto[server]``), or local storage
+- the app under uvicorn, on a fresh migrated SQLite file or ``--database-url``
+  (use a scratch Postgres database: it is migrated and written to)
+
+It then drives ``/zones``, ``/predictions``, ``/birds/info``, ``/sightings``
+and ``/uploads/photo`` at each ``--concurrency`` level (closed loop: every
+client sends its next request when the last one is answered) and reports
+throughput and p50/p95/p99 per scenario and level:
+
+    python -m bench.load --concurrency 1,8,32 --duration 10 --baseline bench/load_baseline.json
+    python -m bench.load --save-baseline bench/load_baseline.json
+
+With ``--baseline``, a scenario/level whose p95 grew or whose throughput
+dropped by more than ``--tolerance`` is reported as a regression and the
+exit status is 1. Baselines only compare runs on the same machine.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+from collections import Counter
+from collections.abc import Awaitable, Callable, Iterator
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+import json
+import os
+from pathlib import Path
+import platform
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+from bench.fixtures import percentile, phone_jpeg
+from bench.upstream_standins import SPECIES
+
+
+SCENARIOS = ("zones", "predictions", "birds_info", "sightings", "uploads")
+S3_BUCKET = "bench-photos"
+# Differences below this are noise whatever the tolerance says.
+MIN_P95_DELTA_MS = 5.0
+
+Scenario = Callable[[httpx.AsyncClient, random.Random], Awaitable[httpx.Response]]
+
+
+@dataclass
+class LevelResult:
+    concurrency: int
+    requests: int
+    errors: int
+    rps: float
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+    statuses: dict[str, int] = field(default_factory=dict)
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _wait_ready(url: str, process: subprocess.Popen[bytes], timeout_s: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout_s
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"{process.args} exited with {process.returncode}")
+        try:
+            httpx.get(url, timeout=0.5)
+            return
+        except httpx.TransportError:
+            time.sleep(0.05)
+    raise RuntimeError(f"{url} did not answer within {timeout_s:.0f} s")
+
+
+@contextmanager
+def running_stack(args: argparse.Namespace, workdir: Path) -> Iterator[str]:
+    """Start stand-ins, storage and the app; yield the app's base URL."""
+    processes: list[subprocess.Popen[bytes]] = []
+
+    def spawn(name: str, command: list[str], env: dict[str, str] | None = None) -> subprocess.Popen[bytes]:
+        log = (workdir / f"{name}.log").open("wb")
+        process = subprocess.Popen(command, env=env, stdout=log, stderr=subprocess.STDOUT)
+        processes.append(process)
+        return process
+
+    try:
+        standins_port = _free_port()
+        standins_command = [sys.executable, "-m", "bench.upstream_standins", "serve", "--port", str(standins_port)]
+        standins_command += ["--latency-ms", str(args.upstream_latency_ms), "--jitter-ms", str(args.upstream_jitter_ms)]
+        if args.payloads:
+            standins_command += ["--payloads", str(args.payloads)]
+        standins = spawn("standins", standins_command)
+        standins_url = f"http://127.0.0.1:{standins_port}"
+        _wait_ready(standins_url, standins)
+
+        database_url = args.database_url or f"sqlite:///{workdir / 'bench.sqlite'}"
+        env = {
+            **os.environ,
+            "APP_ENV": "bench",
+            "DATABASE_URL": database_url,
+            "EBIRD_API_KEY": "bench",
+            "EBIRD_BASE_URL": f"{standins_url}/ebird/v2",
+            "WIKIPEDIA_BASE_URL": f"{standins_url}/wikipedia/{{lang}}",
+            # Measure the app, not the quotas that protect the real APIs.
+            "QUOTA_BACKEND": "memory",
+            "EBIRD_QUOTA_PER_MIN": "1000000",
+            "EBIRD_QUOTA_BURST": "1000000",
+            "WIKIPEDIA_QUOTA_PER_MIN": "1000000",
+            "WIKIPEDIA_QUOTA_BURST": "1000000",
+            "CACHE_BACKEND": "memory",
+            "TRACING_EXPORTER": "none",
+            "PROFILING_TOKEN": "",
+        }
+        subprocess.run(
+            [sys.executable, "-m", "alembic", "upgrade", "head"],
+            env=env,
+            check=True,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+
+        if args.storage == "s3":
+            s3_port = _free_port()
+            s3 = spawn("s3", [sys.executable, "-m", "moto.server", "-H", "127.0.0.1", "-p", str(s3_port)])
+            s3_url = f"http://127.0.0.1:{s3_port}"
+            _wait_ready(s3_url, s3)
+            env.update(
+                STORAGE_BACKEND="s3",
+                S3_ENDPOINT_URL=s3_url,
+                S3_BUCKET_NAME=S3_BUCKET,
+                AWS_REGION="eu-west-1",
+                AWS_ACCESS_KEY_ID="bench",
+                AWS_SECRET_ACCESS_KEY="bench",
+            )
+            import boto3
+
+            boto3.client(
+                "s3",
+                endpoint_url=s3_url,
+                region_name="eu-west-1",
+                aws_access_key_id="bench",
+                aws_secret_access_key="bench",
+            ).create_bucket(Bucket=S3_BUCKET, CreateBucketConfiguration={"LocationConstraint": "eu-west-1"})
+        else:
+            env.update(STORAGE_BACKEND="local", LOCAL_STORAGE_DIR=str(workdir / "media"))
+
+        app_port = _free_port()
+        app_command = [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(app_port)]
+        app_command += ["--workers", str(args.workers), "--log-level", "warning", "--no-access-log"]
+        app = spawn("app", app_command, env=env)
+        app_url = f"http://127.0.0.1:{app_port}"
+        _wait_ready(f"{app_url}/health", app)
+        yield app_url
+    finally:
+        for process in reversed(processes):
+            process.terminate()
+        for process in processes:
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+
+async def _prepare(client: httpx.AsyncClient) -> dict[str, object]:
+    """Seed rules and sightings; collect what the scenarios pick from."""
+    (await client.post("/prediction-rules/seed")).raise_for_status()
+    for index in range(100):
+        response = await client.post(
+            "/sightings", json={"zone": "Tarifa Centro", "species_guess": SPECIES[index % len(SPECIES)]}
+        )
+        response.raise_for_status()
+    # The zone list is refreshed in the background; wait for the hotspots to show up.
+    zones: list[dict[str, object]] = []
+    for _ in range(50):
+        zones = (await client.get("/zones")).json()
+        if len(zones) > 1:
+            break
+        await asyncio.sleep(0.1)
+    photos = [phone_jpeg(width=1600, height=1200, orientation=orientation) for orientation in (1, 6)]
+    return {"zones": zones, "photos": photos}
+
+
+def build_scenarios(data: dict[str, object]) -> dict[str, Scenario]:
+    zones = data["zones"]
+    photos = data["photos"]
+
+    async def zones_scenario(client: httpx.AsyncClient, rng: random.Random) -> httpx.Response:
+        return await client.get("/zones")
+
+    async def predictions(client: httpx.AsyncClient, rng: random.Random) -> httpx.Response:
+        zone = rng.choice(zones)  # type: ignore[arg-type]
+        params = {"zone": zone["name"], "month": rng.randint(1, 12)}
+        # One in four goes to the rules in the database instead of eBird.
+        if rng.random() >= 0.25:
+            params["zone_id"] = zone["id"]
+        return await client.get("/predictions", params=params)
+
+    async def birds_info(client: httpx.AsyncClient, rng: random.Random) -> httpx.Response:
+        return await client.get("/birds/info", params={"species": rng.choice(SPECIES)})
+
+    async def sightings(client: httpx.AsyncClient, rng: random.Random) -> httpx.Response:
+        return await client.get("/sightings", params={"limit": 50})
+
+    async def uploads(client: httpx.AsyncClient, rng: random.Random) -> httpx.Response:
+        # Trailing bytes after the JPEG end marker: a new photo for the dedupe check, same decode work.
+        payload = rng.choice(photos) + rng.randbytes(16)  # type: ignore[operator]
+        return await client.post("/uploads/photo", files={"file": ("bench.jpg", payload, "image/jpeg")})
+
+    return {
+        "zones": zones_scenario,
+        "predictions": predictions,
+        "birds_info": birds_info,
+        "sightings": sightings,
+        "uploads": uploads,
+    }
+
+
+async def run_level(
+    client: httpx.AsyncClient, scenario: Scenario, *, concurrency: int, duration_s: float, seed: int
+) -> LevelResult:
+    latencies: list[float] = []
+    statuses: Counter[str] = Counter()
+    deadline = time.perf_counter() + duration_s
+
+    async def worker(index: int) -> None:
+        rng = random.Random(seed * 1000 + index)
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            try:
+                response = await scenario(client, rng)
+                statuses[str(response.status_code)] += 1
+            except httpx.HTTPError as exc:
+                statuses[type(exc).__name__] += 1
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(index) for index in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    ok = sum(count for status, count in statuses.items() if status.startswith("2"))
+    return LevelResult(
+        concurrency=concurrency,
+        requests=len(latencies),
+        errors=len(latencies) - ok,
+        rps=round(ok / elapsed, 1),
+        p50_ms=round(percentile(latencies, 50) * 1000, 1),
+        p95_ms=round(percentile(latencies, 95) * 1000, 1),
+        p99_ms=round(percentile(latencies, 99) * 1000, 1),
+        statuses=dict(statuses),
+    )
+
+
+async def run_suite(base_url: str, args: argparse.Namespace) -> dict[str, list[LevelResult]]:
+    limits = httpx.Limits(max_connections=max(args.concurrency), max_keepalive_connections=max(args.concurrency))
+    results: dict[str, list[LevelResult]] = {}
+    async with httpx.AsyncClient(base_url=base_url, timeout=60, limits=limits) as client:
+        scenarios = build_scenarios(await _prepare(client))
+        for name in args.scenarios:
+            scenario = scenarios[name]
+            # Fills caches and connection pools the way a running instance has them.
+            await run_level(client, scenario, concurrency=4, duration_s=args.warmup, seed=0)
+            results[name] = []
+            for concurrency in args.concurrency:
+                level = await run_level(
+                    client, scenario, concurrency=concurrency, duration_s=args.duration, seed=args.seed
+                )
+                results[name].append(level)
+                print(_format_row(name, level), flush=True)
+    return results
+
+
+def _format_row(name: str, level: LevelResult) -> str:
+    row = (
+        f"{name:<12} c={level.concurrency:<4} n={level.requests:<6} {level.rps:8.1f} req/s  "
+        f"p50={level.p50_ms:7.1f}  p95={level.p95_ms:7.1f}  p99={level.p99_ms:7.1f} ms"
+    )
+    if level.errors:
+        failed = {status: count for status, count in level.statuses.items() if not status.startswith("2")}
+        row += f"  errors={level.errors} {failed}"
+    return row
+
+
+def compare(results: dict[str, list[LevelResult]], baseline: dict[str, object], tolerance: float) -> list[str]:
+    """Regressions against ``baseline`` (a saved report), one line each."""
+    regressions = []
+    saved = baseline["results"]
+    for name, levels in results.items():
+        by_concurrency = {level["concurrency"]: level for level in saved.get(name, [])}  # type: ignore[union-attr]
+        for level in levels:
+            before = by_concurrency.get(level.concurrency)
+            if before is None:
+                continue
+            p95_limit = max(before["p95_ms"] * (1 + tolerance), before["p95_ms"] + MIN_P95_DELTA_MS)
+            if level.p95_ms > p95_limit:
+                regressions.append(
+                    f"{name} c={level.concurrency}: p95 {before['p95_ms']:.1f} -> {level.p95_ms:.1f} ms"
+                )
+            if level.rps < before["rps"] * (1 - tolerance):
+                regressions.append(
+                    f"{name} c={level.concurrency}: throughput {before['rps']:.1f} -> {level.rps:.1f} req/s"
+                )
+            if level.errors > before["errors"] and level.errors > level.requests * 0.01:
+                regressions.append(f"{name} c={level.concurrency}: errors {before['errors']} -> {level.errors}")
+    return regressions
+
+
+def main_cli() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scenarios", type=lambda value: value.split(","), default=list(SCENARIOS))
+    parser.add_argument(
+        "--concurrency", type=lambda value: [int(item) for item in value.split(",")], default=[1, 8, 32]
+    )
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds per scenario and level")
+    parser.add_argument("--warmup", type=float, default=2.0, help="Seconds per scenario before measuring")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers")
+    parser.add_argument("--storage", choices=("s3", "local"), default="s3")
+    parser.add_argument("--database-url", help="Scratch database; default: a fresh SQLite file")
+    parser.add_argument("--upstream-latency-ms", type=float, default=150.0)
+    parser.add_argument("--upstream-jitter-ms", type=float, default=50.0)
+    parser.add_argument("--payloads", type=Path, help="Recorded eBird payloads for the stand-ins")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--out", type=Path, help="Write the report as JSON here")
+    parser.add_argument("--baseline", type=Path, help="Report to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed p95/throughput change, 0.2 = 20%%")
+    parser.add_argument("--save-baseline", type=Path, help="Write this run as the new baseline")
+    args = parser.parse_args()
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+
+    with tempfile.TemporaryDirectory(prefix="birdtarifa-load-") as tmp:
+        with running_stack(args, Path(tmp)) as base_url:
+            results = asyncio.run(run_suite(base_url, args))
+
+    report = {
+        "meta": {
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "cpus": os.cpu_count(),
+            "storage": args.storage,
+            "database": "sqlite" if not args.database_url else args.database_url.split(":", 1)[0],
+            "workers": args.workers,
+            "duration_s": args.duration,
+            "upstream_latency_ms": args.upstream_latency_ms,
+            "upstream_jitter_ms": args.upstream_jitter_ms,
+        },
+        "results": {name: [asdict(level) for level in levels] for name, levels in results.items()},
+    }
+    for path in (args.out, args.save_baseline):
+        if path:
+            path.write_text(json.dumps(report, indent=2) + "\n")
+            print(f"report written to {path}")
+
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text())
+        differing = sorted(key for key, value in report["meta"].items() if baseline["meta"].get(key) != value)
+        if differing:
+            print(f"note: baseline was recorded with different {', '.join(differing)}")
+        regressions = compare(results, baseline, args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            sys.exit(1)
+        print(f"no regressions against {args.baseline} (tolerance {args.tolerance:.0%})")
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,268 @@
+"""Micro-benchmarks for the pure-CPU hot paths, to run before and after a change.
+
+Each benchmark is timed over several rounds (the loop count is calibrated so
+a round takes at least ``--min-round-s``) and reported as the best and median
+time per call. One extra call runs under tracemalloc for the peak of Python
+allocations; Pillow's pixel buffers are allocated outside it and don't show.
+
+    python -m bench.micro --save /tmp/before.json
+    # ...change something...
+    python -m bench.micro --compare /tmp/before.json
+    python -m bench.micro --filter predictions
+
+Inputs are generated deterministically (``bench.fixtures``); fixture images
+are generated once and cached, and Wikipedia extracts come from
+``bench/data/wiki_extracts.json``.
+"""
+from __future__ import annotations
+
+import argparse
+from collections.abc import Callable
+from dataclasses import asdict, dataclass
+import gzip
+import json
+from pathlib import Path
+import statistics
+import time
+import tracemalloc
+from types import SimpleNamespace
+
+import brotli
+from pydantic import TypeAdapter
+
+from app.ebird import _parse_obs_dt, observations_to_predictions
+from app.geo import HotspotIndex, haversine_km
+from app.images import normalize_upload_image
+from app.responses import JSONResponse
+from app.schemas import SightingOut
+from app.wiki import WikiBirdInfo, _looks_like_bird
+from bench.fixtures import fixture_jpeg, synthetic_observations, synthetic_sightings
+from bench.nearest_hotspots import synthetic_hotspots
+
+
+EXTRACTS = Path(__file__).parent / "data" / "wiki_extracts.json"
+# Slower than the saved run by more than this is flagged in --compare.
+SLOWER_FLAG = 0.10
+
+_benchmarks: dict[str, Callable[[], Callable[[], object]]] = {}
+
+
+def benchmark(name: str) -> Callable[[Callable[[], Callable[[], object]]], Callable[[], Callable[[], object]]]:
+    """Register a setup function; it builds the inputs and returns the call to time."""
+
+    def register(setup: Callable[[], Callable[[], object]]) -> Callable[[], Callable[[], object]]:
+        _benchmarks[name] = setup
+        return setup
+
+    return register
+
+
+def _predictions(count: int) -> Callable[[], Callable[[], object]]:
+    def setup() -> Callable[[], object]:
+        observations = synthetic_observations(count)
+        month = observations[0].observed_at.month  # type: ignore[union-attr]
+        return lambda: observations_to_predictions(
+            observations=observations, requested_month=month, back_days=30, limit=20, scope="bench"
+        )
+
+    return setup
+
+
+for _count in (200, 10_000, 100_000):
+    benchmark(f"observations_to_predictions[{_count}]")(_predictions(_count))
+
+
+@benchmark("_parse_obs_dt[1000]")
+def _parse_dates() -> Callable[[], object]:
+    # Mostly date+time, some date-only, a few malformed, as eBird payloads have them.
+    values = [observation.raw_observed_at for observation in synthetic_observations(990)]
+    values += ["", "2026-13-01", "yesterday", "2026/10/01", "2026-10-01T08:00", "  2026-10-01 08:00 "] + ["2026"] * 4
+    return lambda: [_parse_obs_dt(value) for value in values]
+
+
+@benchmark("hotspots_sorted_by_haversine[2000]")
+def _sort_hotspots() -> Callable[[], object]:
+    # The brute-force ranking the grid index replaced; kept as the reference point.
+    hotspots = synthetic_hotspots(2000)
+    lat, lng = 36.0139, -5.6069
+    return lambda: sorted(hotspots, key=lambda hotspot: haversine_km(lat, lng, hotspot.lat, hotspot.lng))[:10]
+
+
+@benchmark("hotspot_index_nearest[2000]")
+def _nearest_hotspots() -> Callable[[], object]:
+    index = HotspotIndex(synthetic_hotspots(2000))
+    return lambda: index.nearest(36.0139, -5.6069, k=10)
+
+
+@benchmark("hotspot_index_build[2000]")
+def _build_index() -> Callable[[], object]:
+    hotspots = synthetic_hotspots(2000)
+    return lambda: HotspotIndex(hotspots)
+
+
+@benchmark("_looks_like_bird[extracts]")
+def _bird_check() -> Callable[[], object]:
+    items = [
+        (
+            item["lang"],
+            WikiBirdInfo(
+                title=item["title"],
+                extract=item["extract"],
+                photo_url=None,
+                page_url=None,
+                source=f"wikipedia:{item['lang']}",
+                description=item["description"],
+                page_type=item["type"],
+            ),
+        )
+        for item in json.loads(EXTRACTS.read_text(encoding="utf-8"))
+    ]
+    return lambda: [_looks_like_bird(lang=lang, info=info) for lang, info in items]
+
+
+@benchmark("sightings_json[response_model,200]")
+def _sightings_validated() -> Callable[[], object]:
+    # What FastAPI did per request before the fast path: validate, dump, then the stdlib encoder.
+    rows = [SimpleNamespace(**row) for row in synthetic_sightings(200)]
+    adapter = TypeAdapter(list[SightingOut])
+    return lambda: json.dumps(
+        adapter.dump_python(adapter.validate_python(rows, from_attributes=True), mode="json"),
+        ensure_ascii=False,
+        allow_nan=False,
+        separators=(",", ":"),
+    ).encode()
+
+
+@benchmark("sightings_json[orjson,200]")
+def _sightings_orjson() -> Callable[[], object]:
+    rows = synthetic_sightings(200)
+    return lambda: JSONResponse(rows).body
+
+
+@benchmark("gzip[sightings,200]")
+def _gzip_sightings() -> Callable[[], object]:
+    body = JSONResponse(synthetic_sightings(200)).body
+    return lambda: gzip.compress(body, compresslevel=6, mtime=0)
+
+
+@benchmark("brotli[sightings,200]")
+def _brotli_sightings() -> Callable[[], object]:
+    body = JSONResponse(synthetic_sightings(200)).body
+    return lambda: brotli.compress(body, quality=4)
+
+
+def _normalize(width: int, height: int, orientation: int, mode: str) -> Callable[[], Callable[[], object]]:
+    def setup() -> Callable[[], object]:
+        payload = fixture_jpeg(width=width, height=height, orientation=orientation)
+        return lambda: normalize_upload_image(payload=payload, content_type="image/jpeg", orientation_mode=mode)
+
+    return setup
+
+
+for _width, _height, _orientation in ((4032, 3024, 6), (3024, 4032, 8), (1600, 1200, 3), (4032, 3024, 1)):
+    for _mode in ("lossless", "reencode"):
+        if _orientation == 1 and _mode == "reencode":
+            continue  # upright photos return early whatever the mode
+        benchmark(f"normalize_upload_image[{_width}x{_height},o{_orientation},{_mode}]")(
+            _normalize(_width, _height, _orientation, _mode)
+        )
+
+
+@dataclass
+class Result:
+    name: str
+    loops: int
+    rounds: int
+    best_us: float
+    median_us: float
+    peak_kib: float
+
+
+def measure(name: str, fn: Callable[[], object], *, rounds: int, min_round_s: float) -> Result:
+    fn()  # warm-up: imports, caches, codec setup
+    loops = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        elapsed = time.perf_counter() - started
+        if elapsed >= min_round_s:
+            break
+        loops *= max(2, min(10, int(min_round_s / max(elapsed, 1e-9)) + 1))
+
+    timings = [elapsed / loops]
+    for _ in range(rounds - 1):
+        started = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        timings.append((time.perf_counter() - started) / loops)
+
+    tracemalloc.start()
+    try:
+        fn()
+        _current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return Result(
+        name=name,
+        loops=loops,
+        rounds=rounds,
+        best_us=round(min(timings) * 1e6, 2),
+        median_us=round(statistics.median(timings) * 1e6, 2),
+        peak_kib=round(peak / 1024, 1),
+    )
+
+
+def _format_us(value: float) -> str:
+    if value >= 1e6:
+        return f"{value / 1e6:8.2f} s "
+    if value >= 1e3:
+        return f"{value / 1e3:8.2f} ms"
+    return f"{value:8.2f} µs"
+
+
+def main_cli() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--filter", default="", help="Only benchmarks whose name contains this")
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--min-round-s", type=float, default=0.2)
+    parser.add_argument("--save", type=Path, help="Write results as JSON")
+    parser.add_argument("--compare", type=Path, help="Results saved by an earlier run")
+    parser.add_argument("--list", action="store_true", help="List benchmark names and exit")
+    args = parser.parse_args()
+
+    if args.list:
+        print("\n".join(_benchmarks))
+        return
+    previous = {}
+    if args.compare:
+        previous = {item["name"]: item for item in json.loads(args.compare.read_text())["results"]}
+
+    results = []
+    slower = []
+    for name, setup in _benchmarks.items():
+        if args.filter not in name:
+            continue
+        result = measure(name, setup(), rounds=args.rounds, min_round_s=args.min_round_s)
+        results.append(result)
+        line = (
+            f"{name:<52} best={_format_us(result.best_us)}  median={_format_us(result.median_us)}"
+            f"  peak={result.peak_kib:9.1f} KiB"
+        )
+        before = previous.get(name)
+        if before:
+            change = result.best_us / before["best_us"] - 1
+            line += f"  {change:+6.1%} time, {result.peak_kib - before['peak_kib']:+.1f} KiB"
+            if change > SLOWER_FLAG:
+                slower.append(name)
+        print(line, flush=True)
+
+    if args.save:
+        args.save.write_text(json.dumps({"results": [asdict(result) for result in results]}, indent=2) + "\n")
+        print(f"results written to {args.save}")
+    if slower:
+        print(f"slower by more than {SLOWER_FLAG:.0%}: {', '.join(slower)}")
+
+
+if __name__ == "__main__":
+    main_cli()
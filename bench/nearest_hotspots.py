@@ -0,0 +1,81 @@
+"""k-nearest hotspots: grid index vs sorting every hotspot by distance.
+
+Uses synthetic hotspots scattered over a 50 km radius around Tarifa (eBird
+returns a few hundred there; ``--hotspots`` goes well beyond that) and
+checks the index answers match the brute-force ones:
+
+    python -m bench.nearest_hotspots --hotspots 5000 --queries 2000
+"""
+from __future__ import annotations
+
+import argparse
+from datetime import datetime, timedelta, timezone
+import random
+import time
+
+from app.ebird import EbirdHotspot
+from app.geo import HotspotIndex, haversine_km
+from bench.fixtures import percentile
+
+
+def synthetic_hotspots(count: int, *, lat: float = 36.0139, lng: float = -5.6069, seed: int = 7) -> list[EbirdHotspot]:
+    rng = random.Random(seed)
+    now = datetime.now(timezone.utc)
+    return [
+        EbirdHotspot(
+            id=f"L{i}",
+            name=f"Hotspot {i}",
+            lat=lat + rng.uniform(-0.45, 0.45),
+            lng=lng + rng.uniform(-0.55, 0.55),
+            country_code="ES",
+            latest_obs_dt=now - timedelta(days=rng.randint(0, 120)),
+            num_species_all_time=rng.randint(1, 300),
+            num_checklists_all_time=rng.randint(1, 3000),
+        )
+        for i in range(count)
+    ]
+
+
+def brute_force(hotspots: list[EbirdHotspot], lat: float, lng: float, k: int) -> list[str]:
+    ranked = sorted(hotspots, key=lambda h: haversine_km(lat, lng, h.lat, h.lng))
+    return [hotspot.id for hotspot in ranked[:k]]
+
+
+def main_cli() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--hotspots", type=int, default=5000)
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("-k", type=int, default=5)
+    args = parser.parse_args()
+
+    hotspots = synthetic_hotspots(args.hotspots)
+    started = time.perf_counter()
+    index = HotspotIndex(hotspots)
+    build_ms = (time.perf_counter() - started) * 1000
+
+    rng = random.Random(1)
+    points = [(36.0139 + rng.uniform(-0.4, 0.4), -5.6069 + rng.uniform(-0.5, 0.5)) for _ in range(args.queries)]
+
+    index_us: list[float] = []
+    for lat, lng in points:
+        started = time.perf_counter()
+        index.nearest(lat, lng, k=args.k)
+        index_us.append((time.perf_counter() - started) * 1e6)
+
+    brute_us: list[float] = []
+    mismatches = 0
+    for lat, lng in points[:200]:
+        started = time.perf_counter()
+        expected = brute_force(hotspots, lat, lng, args.k)
+        brute_us.append((time.perf_counter() - started) * 1e6)
+        if [hotspot.id for _distance, hotspot in index.nearest(lat, lng, k=args.k)] != expected:
+            mismatches += 1
+
+    print(f"{args.hotspots} hotspots, k={args.k}, index built in {build_ms:.1f} ms")
+    print(f"  index: p50={percentile(index_us, 50):.0f} us  p99={percentile(index_us, 99):.0f} us")
+    print(f"  sort:  p50={percentile(brute_us, 50):.0f} us  p99={percentile(brute_us, 99):.0f} us")
+    print(f"  mismatches vs brute force: {mismatches}/{len(brute_us)}")
+
+
+if __name__ == "__main__":
+    main_cli()
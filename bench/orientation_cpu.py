@@ -0,0 +1,59 @@
+"""CPU time per rotated phone JPEG for each orientation fix.
+
+Counts CPU of this process plus child processes (jpegtran runs as one), so
+the modes are comparable:
+
+    python -m bench.orientation_cpu --runs 5
+"""
+from __future__ import annotations
+
+import argparse
+import resource
+import shutil
+import time
+
+from app.images import build_image_variants, normalize_upload_image
+from bench.fixtures import phone_jpeg
+
+
+def _cpu_s() -> float:
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return own.ru_utime + own.ru_stime + children.ru_utime + children.ru_stime
+
+
+def _measure(fn, runs: int) -> tuple[float, float]:
+    fn()  # warm-up (imports, codec init)
+    cpu_started, wall_started = _cpu_s(), time.perf_counter()
+    for _ in range(runs):
+        fn()
+    return (_cpu_s() - cpu_started) / runs * 1000, (time.perf_counter() - wall_started) / runs * 1000
+
+
+def main_cli() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    image = phone_jpeg(orientation=6)
+    print(f"fixture: {len(image) / 1024 / 1024:.1f} MB, 4032x3024, orientation 6")
+    if not shutil.which("jpegtran"):
+        print("jpegtran not on PATH: 'lossless' falls back to re-encoding")
+
+    for mode in ("reencode", "lossless", "keep"):
+        cpu_ms, wall_ms = _measure(
+            lambda: normalize_upload_image(payload=image, content_type="image/jpeg", orientation_mode=mode),
+            args.runs,
+        )
+        print(f"normalize  {mode:>8}: cpu={cpu_ms:7.1f} ms  wall={wall_ms:7.1f} ms")
+
+    for mode in ("reencode", "keep"):
+        cpu_ms, wall_ms = _measure(
+            lambda: build_image_variants(payload=image, content_type="image/jpeg", orientation_mode=mode),
+            args.runs,
+        )
+        print(f"variants   {mode:>8}: cpu={cpu_ms:7.1f} ms  wall={wall_ms:7.1f} ms")
+
+
+if __name__ == "__main__":
+    main_cli()
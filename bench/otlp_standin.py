@@ -0,0 +1,133 @@
+"""Tiny OTLP/HTTP trace receiver for trying ``TRACING_EXPORTER=otlp`` locally.
+
+Accepts ``POST /v1/traces`` (protobuf or JSON, as the OpenTelemetry exporters
+send them), appends every span to ``--out`` in the format ``bench.traces``
+reads, and prints a trace's waterfall once its root span arrives. Not a
+collector: no batching, retries, metrics or logs.
+
+    python -m bench.otlp_standin --port 4318 --out traces.jsonl
+    TRACING_EXPORTER=otlp TRACING_OTLP_ENDPOINT=http://127.0.0.1:4318/v1/traces uvicorn app.main:app
+"""
+from __future__ import annotations
+
+import argparse
+from collections import defaultdict
+from dataclasses import asdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+from pathlib import Path
+from threading import Lock
+from typing import Any
+
+from google.protobuf import json_format
+from opentelemetry.proto.collector.trace.v1.trace_service_pb2 import (
+    ExportTraceServiceRequest,
+    ExportTraceServiceResponse,
+)
+from opentelemetry.proto.common.v1.common_pb2 import AnyValue
+from opentelemetry.proto.trace.v1.trace_pb2 import Span as SpanMessage, Status
+
+from bench.traces import Span, format_trace
+
+
+def _value(value: AnyValue) -> Any:
+    kind = value.WhichOneof("value")
+    if kind == "array_value":
+        return [_value(item) for item in value.array_value.values]
+    if kind == "kvlist_value":
+        return {item.key: _value(item.value) for item in value.kvlist_value.values}
+    return getattr(value, kind) if kind else None
+
+
+def _span_messages(request: ExportTraceServiceRequest) -> list[SpanMessage]:
+    return [
+        span
+        for resource_spans in request.resource_spans
+        for scope_spans in resource_spans.scope_spans
+        for span in scope_spans.spans
+    ]
+
+
+def spans_from_request(request: ExportTraceServiceRequest) -> list[Span]:
+    return [
+        Span(
+            trace_id=span.trace_id.hex(),
+            span_id=span.span_id.hex(),
+            parent_id=span.parent_span_id.hex() or None,
+            name=span.name,
+            start=span.start_time_unix_nano / 1e9,
+            end=span.end_time_unix_nano / 1e9,
+            attributes={item.key: _value(item.value) for item in span.attributes},
+            error=span.status.code == Status.STATUS_CODE_ERROR,
+        )
+        for span in _span_messages(request)
+    ]
+
+
+def finished_traces(request: ExportTraceServiceRequest) -> set[str]:
+    """Traces whose root span is in ``request``: no parent, or a server span continuing a caller's trace."""
+    return {
+        span.trace_id.hex()
+        for span in _span_messages(request)
+        if not span.parent_span_id or span.kind == SpanMessage.SPAN_KIND_SERVER
+    }
+
+
+class Receiver:
+    def __init__(self, out: Path) -> None:
+        self.out = out
+        self.traces: dict[str, list[Span]] = defaultdict(list)
+        self.lock = Lock()
+
+    def add(self, spans: list[Span], finished: set[str]) -> None:
+        with self.lock, self.out.open("a", encoding="utf-8") as file:
+            for span in spans:
+                file.write(json.dumps(asdict(span)) + "\n")
+                self.traces[span.trace_id].append(span)
+            # Root spans end last, so their trace is complete (give or take a background thread).
+            for trace_id in finished & self.traces.keys():
+                print(format_trace(self.traces.pop(trace_id)), end="\n\n", flush=True)
+
+
+def handler_for(receiver: Receiver) -> type[BaseHTTPRequestHandler]:
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self) -> None:
+            if self.path.rstrip("/") != "/v1/traces":
+                self.send_error(404)
+                return
+            body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            request = ExportTraceServiceRequest()
+            is_json = self.headers.get("Content-Type", "").startswith("application/json")
+            if is_json:
+                json_format.Parse(body, request)
+            else:
+                request.ParseFromString(body)
+            receiver.add(spans_from_request(request), finished_traces(request))
+
+            response = ExportTraceServiceResponse()
+            payload = json_format.MessageToJson(response).encode() if is_json else response.SerializeToString()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json" if is_json else "application/x-protobuf")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, format: str, *args: Any) -> None:
+            pass
+
+    return Handler
+
+
+def main_cli() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=4318)
+    parser.add_argument("--out", type=Path, default=Path("traces.jsonl"))
+    args = parser.parse_args()
+    server = ThreadingHTTPServer((args.host, args.port), handler_for(Receiver(args.out)))
+    print(f"OTLP stand-in on http://{args.host}:{args.port}/v1/traces, writing {args.out}")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,103 @@
+"""Tiny in-memory Redis-protocol server for trying ``CACHE_BACKEND=redis`` locally.
+
+Speaks just enough RESP for ``app.cache_stores.RedisStore`` (GET, SET with
+EX/PX, PTTL, DEL, PING, FLUSHDB, DBSIZE); anything else gets an error reply.
+Not a Redis replacement: one process, no persistence, no eviction.
+
+    python -m bench.redis_standin --port 6390
+    CACHE_BACKEND=redis REDIS_URL=redis://127.0.0.1:6390/0 uvicorn app.main:app
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+from time import monotonic
+
+
+class StandIn:
+    def __init__(self) -> None:
+        self.data: dict[bytes, tuple[bytes, float | None]] = {}
+
+    def _live(self, key: bytes) -> tuple[bytes, float | None] | None:
+        item = self.data.get(key)
+        if item is not None and item[1] is not None and item[1] <= monotonic():
+            del self.data[key]
+            return None
+        return item
+
+    def command(self, args: list[bytes]) -> bytes:
+        name = args[0].upper()
+        if name == b"PING":
+            return b"+PONG\r\n"
+        if name == b"GET":
+            item = self._live(args[1])
+            return b"$-1\r\n" if item is None else b"$%d\r\n%s\r\n" % (len(item[0]), item[0])
+        if name == b"SET":
+            expires_at = None
+            options = [arg.upper() for arg in args[3:]]
+            if b"PX" in options:
+                expires_at = monotonic() + int(args[3 + options.index(b"PX") + 1]) / 1000
+            elif b"EX" in options:
+                expires_at = monotonic() + int(args[3 + options.index(b"EX") + 1])
+            self.data[args[1]] = (args[2], expires_at)
+            return b"+OK\r\n"
+        if name == b"PTTL":
+            item = self._live(args[1])
+            if item is None:
+                return b":-2\r\n"
+            return b":-1\r\n" if item[1] is None else b":%d\r\n" % int((item[1] - monotonic()) * 1000)
+        if name == b"DEL":
+            removed = sum(self.data.pop(key, None) is not None for key in args[1:])
+            return b":%d\r\n" % removed
+        if name == b"DBSIZE":
+            return b":%d\r\n" % len(self.data)
+        if name == b"FLUSHDB":
+            self.data.clear()
+            return b"+OK\r\n"
+        return b"-ERR unknown command '%s'\r\n" % args[0]
+
+
+async def _read_command(reader: asyncio.StreamReader) -> list[bytes]:
+    header = await reader.readline()
+    if not header:
+        raise ConnectionResetError
+    if not header.startswith(b"*"):
+        return header.split()  # inline command, e.g. from telnet
+    args = []
+    for _ in range(int(header[1:])):
+        length = int((await reader.readline())[1:])
+        args.append((await reader.readexactly(length + 2))[:-2])
+    return args
+
+
+async def serve(host: str, port: int) -> None:
+    store = StandIn()
+
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                args = await _read_command(reader)
+                if args:
+                    writer.write(store.command(args))
+                    await writer.drain()
+        except (ConnectionResetError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    server = await asyncio.start_server(handle, host, port)
+    print(f"Redis stand-in on {host}:{port}")
+    async with server:
+        await server.serve_forever()
+
+
+def main_cli() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=6390)
+    args = parser.parse_args()
+    asyncio.run(serve(args.host, args.port))
+
+
+if __name__ == "__main__":
+    main_cli()
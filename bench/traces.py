@@ -0,0 +1,143 @@
+"""Print trace waterfalls from ``TRACING_EXPORTER=file`` output (or ``bench.otlp_standin``'s).
+
+Each trace is shown as a span tree with start offsets and durations. Under
+every span, child calls that ran one after another (each starting after the
+previous one ended) are flagged as serial: those are the waterfalls worth
+turning into concurrent calls.
+
+    TRACING_EXPORTER=file TRACING_FILE=traces.jsonl uvicorn app.main:app
+    python -m bench.traces traces.jsonl --last 3
+    python -m bench.traces traces.jsonl --name "GET /predictions"
+"""
+from __future__ import annotations
+
+import argparse
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import datetime
+import json
+from pathlib import Path
+from typing import Any
+
+
+BAR_WIDTH = 40
+# Children this close together still count as back to back.
+SERIAL_GAP_S = 0.002
+
+
+@dataclass
+class Span:
+    trace_id: str
+    span_id: str
+    parent_id: str | None
+    name: str
+    start: float
+    end: float
+    attributes: dict[str, Any] = field(default_factory=dict)
+    error: bool = False
+
+    @property
+    def duration(self) -> float:
+        return self.end - self.start
+
+
+def _timestamp(value: str) -> float:
+    return datetime.fromisoformat(value).timestamp()
+
+
+def span_from_record(record: dict[str, Any]) -> Span:
+    """Read a line written by the SDK's file exporter or by ``bench.otlp_standin``."""
+    if "context" in record:  # SDK Span.to_json()
+        return Span(
+            trace_id=record["context"]["trace_id"].removeprefix("0x"),
+            span_id=record["context"]["span_id"].removeprefix("0x"),
+            parent_id=(record["parent_id"] or "").removeprefix("0x") or None,
+            name=record["name"],
+            start=_timestamp(record["start_time"]),
+            end=_timestamp(record["end_time"]),
+            attributes=record.get("attributes") or {},
+            error=record.get("status", {}).get("status_code") == "ERROR",
+        )
+    return Span(**record)
+
+
+def load(path: Path) -> list[Span]:
+    with path.open(encoding="utf-8") as lines:
+        return [span_from_record(json.loads(line)) for line in lines if line.strip()]
+
+
+def _serial_runs(children: list[Span]) -> list[list[Span]]:
+    runs: list[list[Span]] = []
+    current: list[Span] = []
+    for span in children:
+        if current and span.start >= current[-1].end - SERIAL_GAP_S:
+            current.append(span)
+        else:
+            if len(current) > 1:
+                runs.append(current)
+            current = [span]
+    if len(current) > 1:
+        runs.append(current)
+    return runs
+
+
+def format_trace(spans: list[Span]) -> str:
+    by_id = {span.span_id: span for span in spans}
+    children: dict[str | None, list[Span]] = defaultdict(list)
+    for span in spans:
+        # Parents outside this file (an upstream caller's span) make the span a root here.
+        children[span.parent_id if span.parent_id in by_id else None].append(span)
+    for siblings in children.values():
+        siblings.sort(key=lambda span: span.start)
+
+    origin = min(span.start for span in spans)
+    total = max(span.end for span in spans) - origin or 1e-9
+    lines = [f"trace {spans[0].trace_id}  {total * 1000:.1f} ms"]
+
+    def walk(span: Span, depth: int) -> None:
+        offset = span.start - origin
+        left = int(offset / total * BAR_WIDTH)
+        width = max(1, int(span.duration / total * BAR_WIDTH))
+        bar = " " * left + "#" * min(width, BAR_WIDTH - left)
+        label = ("  " * depth + span.name)[:48]
+        flag = "  ERROR" if span.error else ""
+        lines.append(f"  {label:<48} {offset * 1000:8.1f} {span.duration * 1000:8.1f} ms |{bar:<{BAR_WIDTH}}|{flag}")
+        for run in _serial_runs(children[span.span_id]):
+            spent = sum(child.duration for child in run) * 1000
+            names = ", ".join(sorted({child.name for child in run}))
+            lines.append(f"  {'  ' * (depth + 1)}^ {len(run)} serial calls, {spent:.1f} ms: {names}")
+        for child in children[span.span_id]:
+            walk(child, depth + 1)
+
+    for root in children[None]:
+        walk(root, 0)
+    return "\n".join(lines)
+
+
+def group_traces(spans: list[Span]) -> list[list[Span]]:
+    """Spans grouped by trace, oldest trace first."""
+    traces: dict[str, list[Span]] = defaultdict(list)
+    for span in spans:
+        traces[span.trace_id].append(span)
+    return sorted(traces.values(), key=lambda trace: min(span.start for span in trace))
+
+
+def main_cli() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("path", type=Path, help="JSON lines file of finished spans")
+    parser.add_argument("--last", type=int, default=5, help="Show only the last N traces (0: all)")
+    parser.add_argument("--name", help="Only traces with a span of this name, e.g. 'GET /predictions'")
+    args = parser.parse_args()
+
+    traces = group_traces(load(args.path))
+    if args.name:
+        traces = [trace for trace in traces if any(span.name == args.name for span in trace)]
+    if args.last:
+        traces = traces[-args.last :]
+    for trace in traces:
+        print(format_trace(trace))
+        print()
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,94 @@
+"""Latency of a cheap route while photo uploads are in flight.
+
+Runs the app in-process (ASGI transport, no network) with S3 replaced by a
+fixed-latency fake and the photo index in a scratch SQLite database, then
+probes ``/health`` while bursts of rotated phone JPEGs are uploaded.
+Compares the old inline behaviour with the pooled one:
+
+    python -m bench.upload_concurrency --uploads 16 --probes 200
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import time
+
+import httpx
+
+from app import main
+from bench.fixtures import percentile, phone_jpeg, scratch_database
+
+
+def _fake_upload(*, key: str, payload: bytes, content_type: str) -> str:
+    time.sleep(0.08)  # roughly one put_object round trip to eu-west-1
+    return f"https://example.invalid/{key}"
+
+
+async def _inline(fn, /, *args, **kwargs):
+    return fn(*args, **kwargs)
+
+
+async def _run(mode: str, *, uploads: int, probes: int, image: bytes) -> dict[str, float]:
+    main.upload_image_bytes = _fake_upload
+    if mode == "inline":
+        main.run_image_task = _inline
+        main.run_storage_task = _inline
+    else:
+        from app import workers
+
+        main.run_image_task = workers.run_image_task
+        main.run_storage_task = workers.run_storage_task
+        # Warm the process pool so worker start-up isn't billed to the first probe.
+        await workers.run_image_task(abs, 1)
+
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        latencies: list[float] = []
+        statuses: dict[int, int] = {}
+
+        async def upload() -> None:
+            # Trailing bytes after the JPEG end marker: a new photo for the dedupe check, same decode work.
+            files = {"file": ("photo.jpg", image + os.urandom(16), "image/jpeg")}
+            response = await client.post("/uploads/photo", files=files)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+        async def probe() -> None:
+            for _ in range(probes):
+                started = time.perf_counter()
+                await client.get("/health")
+                latencies.append((time.perf_counter() - started) * 1000)
+                await asyncio.sleep(0.005)
+
+        started = time.perf_counter()
+        await asyncio.gather(probe(), *(upload() for _ in range(uploads)))
+        elapsed = time.perf_counter() - started
+
+    return {
+        "elapsed_s": elapsed,
+        "health_p50_ms": percentile(latencies, 50),
+        "health_p95_ms": percentile(latencies, 95),
+        "health_max_ms": max(latencies),
+        **{f"status_{code}": float(count) for code, count in sorted(statuses.items())},
+    }
+
+
+def main_cli() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--uploads", type=int, default=16)
+    parser.add_argument("--probes", type=int, default=200)
+    parser.add_argument("--mode", choices=("inline", "pooled", "both"), default="both")
+    args = parser.parse_args()
+
+    image = phone_jpeg()
+    print(f"fixture: {len(image) / 1024 / 1024:.1f} MB rotated JPEG, {args.uploads} concurrent uploads")
+    modes = ("inline", "pooled") if args.mode == "both" else (args.mode,)
+    with scratch_database(main.app):
+        for mode in modes:
+            result = asyncio.run(_run(mode, uploads=args.uploads, probes=args.probes, image=image))
+            summary = "  ".join(f"{name}={value:.1f}" for name, value in result.items())
+            print(f"{mode:>7}: {summary}")
+
+
+if __name__ == "__main__":
+    main_cli()
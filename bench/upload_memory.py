@@ -0,0 +1,87 @@
+"""Peak Python heap per upload, for accepted and oversized photos.
+
+The multipart body is streamed to the app in 64 KiB chunks (like a real
+client on a slow link) and ``tracemalloc`` records the peak while each
+request is handled. S3 is replaced by a no-op fake and the photo index
+lives in a scratch SQLite database.
+
+    python -m bench.upload_memory
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import tracemalloc
+
+import httpx
+
+from app import main
+from app.config import get_settings
+from bench.fixtures import phone_jpeg, scratch_database
+
+BOUNDARY = "benchboundary"
+
+
+def _fake_upload(*, key: str, payload: bytes, content_type: str) -> str:
+    return f"https://example.invalid/{key}"
+
+
+async def _body(image: bytes, chunk_size: int = 64 * 1024):
+    yield (
+        f"--{BOUNDARY}\r\n"
+        'Content-Disposition: form-data; name="file"; filename="photo.jpg"\r\n'
+        "Content-Type: image/jpeg\r\n\r\n"
+    ).encode()
+    view = memoryview(image)
+    for offset in range(0, len(view), chunk_size):
+        yield bytes(view[offset : offset + chunk_size])
+    yield f"\r\n--{BOUNDARY}--\r\n".encode()
+
+
+async def _measure(client: httpx.AsyncClient, image: bytes, *, send_length: bool) -> tuple[int, int]:
+    headers = {"Content-Type": f"multipart/form-data; boundary={BOUNDARY}"}
+    if send_length:
+        size = sum([len(part) async for part in _body(image)])
+        headers["Content-Length"] = str(size)
+
+    tracemalloc.reset_peak()
+    baseline, _ = tracemalloc.get_traced_memory()
+    response = await client.post("/uploads/photo", content=_body(image), headers=headers)
+    _, peak = tracemalloc.get_traced_memory()
+    return response.status_code, peak - baseline
+
+
+async def _run(sizes_mb: list[float]) -> None:
+    main.upload_image_bytes = _fake_upload
+    limit_mb = get_settings().max_upload_mb
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        await main.run_image_task(abs, 1)  # start the process pool outside the measurement
+
+        tracemalloc.start()
+        for size_mb in sizes_mb:
+            image = phone_jpeg(orientation=1)
+            # Pad with trailing bytes (ignored by decoders) to hit the target size.
+            image += b"\0" * max(0, int(size_mb * 1024 * 1024) - len(image))
+            for send_length in (False, True):
+                # Distinct trailing bytes, or the second upload would just be deduplicated.
+                status_code, peak = await _measure(client, image + os.urandom(16), send_length=send_length)
+                label = "with" if send_length else "without"
+                print(
+                    f"{len(image) / 1024 / 1024:6.1f} MB (limit {limit_mb} MB, {label} Content-Length): "
+                    f"status={status_code} peak={peak / 1024 / 1024:.2f} MB"
+                )
+        tracemalloc.stop()
+
+
+def main_cli() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes-mb", type=float, nargs="+", default=[6.0, 7.5, 32.0])
+    args = parser.parse_args()
+    with scratch_database(main.app):
+        asyncio.run(_run(args.sizes_mb))
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,307 @@
+"""Local eBird and Wikipedia stand-ins with configurable latency, for load tests.
+
+Serves the endpoints the app calls, under ``/ebird/v2`` and ``/wikipedia/{lang}``:
+
+- ``/data/obs/geo/recent``, ``/data/obs/{locId}/recent`` and ``/ref/hotspot/geo``
+- ``/w/api.php`` (search) and ``/api/rest_v1/page/summary/{title}``
+
+eBird answers come from recorded payloads in ``--payloads`` when present
+(``obs_geo_recent.json``, ``hotspot_geo.json``, ``obs_loc_recent/<locId>.json``,
+or ``obs_loc_recent.json`` for every hotspot), otherwise from deterministic
+synthetic data around Tarifa. ``record`` saves real payloads (needs
+``EBIRD_API_KEY``) so later runs replay them:
+
+    python -m bench.upstream_standins record --out bench/payloads
+    python -m bench.upstream_standins serve --port 8701 --latency-ms 150 --jitter-ms 50
+    EBIRD_BASE_URL=http://127.0.0.1:8701/ebird/v2 \\
+    WIKIPEDIA_BASE_URL=http://127.0.0.1:8701/wikipedia/{lang} uvicorn app.main:app
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+import json
+from pathlib import Path
+import random
+import re
+from typing import Any
+from urllib.parse import quote
+import zlib
+
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Route
+
+
+SPECIES = (
+    "Milano negro",
+    "Cigüeña blanca",
+    "Abejaruco europeo",
+    "Alimoche común",
+    "Buitre leonado",
+    "Halcón peregrino",
+    "Gaviota patiamarilla",
+    "Cormorán grande",
+    "Garceta común",
+    "Correlimos tridáctilo",
+    "Chorlitejo patinegro",
+    "Vencejo común",
+    "Golondrina común",
+    "Avión común",
+    "Curruca cabecinegra",
+    "Cogujada común",
+    "Gorrión común",
+    "Estornino negro",
+    "Jilguero europeo",
+    "Verdecillo",
+    "Pardillo común",
+    "Lavandera blanca",
+    "Tarabilla europea",
+    "Collalba gris",
+    "Abubilla",
+    "Aguililla calzada",
+    "Culebrera europea",
+    "Abejero europeo",
+    "Cernícalo vulgar",
+    "Busardo ratonero",
+    "Alcatraz atlántico",
+    "Pardela cenicienta",
+    "Charrán patinegro",
+    "Gaviota de Audouin",
+    "Paloma torcaz",
+    "Tórtola turca",
+    "Mirlo común",
+    "Petirrojo europeo",
+    "Mosquitero común",
+    "Carbonero común",
+)
+TARIFA = (36.0139, -5.6069)
+HOTSPOTS = 60
+
+
+@dataclass(frozen=True)
+class Options:
+    latency_ms: float = 0.0
+    jitter_ms: float = 0.0
+    # Share of calls answered with a 503, to exercise breakers and fallbacks.
+    error_rate: float = 0.0
+    payloads: Path | None = None
+    seed: int = 7
+
+
+def _rng(options: Options, *parts: object) -> random.Random:
+    # Same request, same answer: runs stay comparable.
+    return random.Random(zlib.crc32(repr((options.seed, *parts)).encode()))
+
+
+def synthetic_observations(options: Options, scope: str, *, back_days: int, max_results: int) -> list[dict[str, Any]]:
+    rng = _rng(options, "obs", scope)
+    now = datetime.now().replace(second=0, microsecond=0)
+    count = min(max_results, rng.randint(80, 400))
+    lat, lng = TARIFA
+    return [
+        {
+            "speciesCode": f"sp{index:03d}",
+            "comName": (species := rng.choice(SPECIES)),
+            "sciName": f"{species} sci.",
+            "locId": f"L{rng.randint(1, HOTSPOTS)}",
+            "locName": f"Bench hotspot {rng.randint(1, HOTSPOTS)}",
+            "obsDt": (now - timedelta(minutes=rng.randint(0, back_days * 24 * 60))).strftime("%Y-%m-%d %H:%M"),
+            "howMany": rng.randint(1, 40),
+            "lat": lat + rng.uniform(-0.2, 0.2),
+            "lng": lng + rng.uniform(-0.2, 0.2),
+            "obsValid": True,
+            "obsReviewed": False,
+            "locationPrivate": False,
+            "subId": f"S{rng.randint(10**8, 10**9)}",
+        }
+        for index in range(count)
+    ]
+
+
+def synthetic_hotspots(options: Options) -> list[dict[str, Any]]:
+    rng = _rng(options, "hotspots")
+    lat, lng = TARIFA
+    today = datetime.now()
+    return [
+        {
+            "locId": f"L{index}",
+            "locName": f"Bench hotspot {index}",
+            "countryCode": "ES",
+            "subnational1Code": "ES-AN",
+            "lat": round(lat + rng.uniform(-0.22, 0.22), 6),
+            "lng": round(lng + rng.uniform(-0.27, 0.27), 6),
+            "latestObsDt": (today - timedelta(days=rng.randint(0, 60))).strftime("%Y-%m-%d %H:%M"),
+            "numSpeciesAllTime": rng.randint(20, 320),
+        }
+        for index in range(1, HOTSPOTS + 1)
+    ]
+
+
+def _recorded(options: Options, *names: str) -> Any | None:
+    if options.payloads is None:
+        return None
+    for name in names:
+        path = options.payloads / name
+        if path.exists():
+            return json.loads(path.read_text(encoding="utf-8"))
+    return None
+
+
+def build_app(options: Options) -> Starlette:
+    async def delay() -> Response | None:
+        wait_ms = options.latency_ms + random.uniform(-options.jitter_ms, options.jitter_ms)
+        if wait_ms > 0:
+            await asyncio.sleep(wait_ms / 1000)
+        if options.error_rate and random.random() < options.error_rate:
+            return JSONResponse({"error": "stand-in failure"}, status_code=503)
+        return None
+
+    def ebird_auth(request: Request) -> Response | None:
+        if not request.headers.get("x-ebirdapitoken"):
+            return JSONResponse({"errors": [{"status": "403 Forbidden"}]}, status_code=403)
+        return None
+
+    async def obs_geo_recent(request: Request) -> Response:
+        failed = ebird_auth(request) or await delay()
+        if failed:
+            return failed
+        params = request.query_params
+        payload = _recorded(options, "obs_geo_recent.json") or synthetic_observations(
+            options,
+            f"{params.get('lat')},{params.get('lng')},{params.get('dist')}",
+            back_days=int(params.get("back", 30)),
+            max_results=int(params.get("maxResults", 10000)),
+        )
+        return JSONResponse(payload)
+
+    async def obs_location_recent(request: Request) -> Response:
+        failed = ebird_auth(request) or await delay()
+        if failed:
+            return failed
+        loc_id = request.path_params["loc_id"]
+        params = request.query_params
+        payload = _recorded(options, f"obs_loc_recent/{loc_id}.json", "obs_loc_recent.json") or synthetic_observations(
+            options,
+            loc_id,
+            back_days=int(params.get("back", 30)),
+            max_results=int(params.get("maxResults", 10000)),
+        )
+        return JSONResponse(payload)
+
+    async def hotspot_geo(request: Request) -> Response:
+        failed = ebird_auth(request) or await delay()
+        if failed:
+            return failed
+        return JSONResponse(_recorded(options, "hotspot_geo.json") or synthetic_hotspots(options))
+
+    async def wiki_search(request: Request) -> Response:
+        failed = await delay()
+        if failed:
+            return failed
+        species = re.sub(r" (ave|pájaro|bird|species)$", "", request.query_params.get("srsearch", ""))
+        # The species article first, then the kind of unrelated result the app has to skip.
+        titles = [species, f"{species} (álbum)"]
+        return JSONResponse({"query": {"search": [{"title": title} for title in titles]}})
+
+    async def wiki_summary(request: Request) -> Response:
+        failed = await delay()
+        if failed:
+            return failed
+        lang, title = request.path_params["lang"], request.path_params["title"]
+        if title.endswith("(álbum)"):
+            return JSONResponse({"type": "standard", "title": title, "extract": "Álbum de estudio."})
+        description = "especie de ave" if lang == "es" else "species of bird"
+        return JSONResponse(
+            {
+                "type": "standard",
+                "title": title,
+                "description": description,
+                "extract": f"{title} es una {description} de la familia de prueba.",
+                "thumbnail": {"source": f"https://upload.example.org/{quote(title)}.jpg"},
+                "content_urls": {"desktop": {"page": f"https://{lang}.wikipedia.org/wiki/{quote(title)}"}},
+            }
+        )
+
+    return Starlette(
+        routes=[
+            Route("/ebird/v2/data/obs/geo/recent", obs_geo_recent),
+            Route("/ebird/v2/data/obs/{loc_id}/recent", obs_location_recent),
+            Route("/ebird/v2/ref/hotspot/geo", hotspot_geo),
+            Route("/wikipedia/{lang}/w/api.php", wiki_search),
+            Route("/wikipedia/{lang}/api/rest_v1/page/summary/{title:path}", wiki_summary),
+        ]
+    )
+
+
+def record(out: Path, *, hotspot_payloads: int = 5) -> None:
+    """Save real eBird answers for the default region so stand-in runs replay them."""
+    import httpx
+
+    from app.config import get_settings
+    from app.ebird import _api_url
+
+    settings = get_settings()
+    if not settings.ebird_api_key:
+        raise SystemExit("EBIRD_API_KEY is needed to record payloads.")
+    headers = {"X-eBirdApiToken": settings.ebird_api_key}
+    geo = {"lat": settings.ebird_geo_lat, "lng": settings.ebird_geo_lng, "dist": settings.ebird_geo_dist_km}
+    back = {"back": settings.ebird_geo_back_days, "sppLocale": settings.ebird_spp_locale}
+    (out / "obs_loc_recent").mkdir(parents=True, exist_ok=True)
+
+    with httpx.Client(headers=headers, timeout=30) as client:
+
+        def save(name: str, path: str, params: dict[str, Any]) -> Any:
+            response = client.get(_api_url(path), params=params)
+            response.raise_for_status()
+            (out / name).write_text(json.dumps(response.json(), ensure_ascii=False), encoding="utf-8")
+            print(f"saved {out / name}")
+            return response.json()
+
+        save("obs_geo_recent.json", "/data/obs/geo/recent", {**geo, **back, "maxResults": 10000})
+        hotspots = save("hotspot_geo.json", "/ref/hotspot/geo", {**geo, "fmt": "json"})
+        for hotspot in hotspots[:hotspot_payloads]:
+            loc_id = hotspot["locId"]
+            save(f"obs_loc_recent/{loc_id}.json", f"/data/obs/{loc_id}/recent", {**back, "maxResults": 10000})
+
+
+def serve(host: str, port: int, options: Options) -> None:
+    import uvicorn
+
+    uvicorn.run(build_app(options), host=host, port=port, log_level="warning")
+
+
+def main_cli() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+    serve_parser = commands.add_parser("serve", help="Run the stand-ins")
+    serve_parser.add_argument("--host", default="127.0.0.1")
+    serve_parser.add_argument("--port", type=int, default=8701)
+    serve_parser.add_argument("--latency-ms", type=float, default=0.0)
+    serve_parser.add_argument("--jitter-ms", type=float, default=0.0)
+    serve_parser.add_argument("--error-rate", type=float, default=0.0)
+    serve_parser.add_argument("--payloads", type=Path, help="Directory of recorded eBird payloads")
+    serve_parser.add_argument("--seed", type=int, default=7)
+    record_parser = commands.add_parser("record", help="Save real eBird payloads")
+    record_parser.add_argument("--out", type=Path, default=Path("bench/payloads"))
+    record_parser.add_argument("--hotspots", type=int, default=5, help="Hotspots to save observations for")
+    args = parser.parse_args()
+
+    if args.command == "record":
+        record(args.out, hotspot_payloads=args.hotspots)
+        return
+    options = Options(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate,
+        payloads=args.payloads,
+        seed=args.seed,
+    )
+    serve(args.host, args.port, options)
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,53 @@
+"""Baseline: sightings and prediction_rules.
+
+Databases created by the old ``create_all`` on startup already have these
+tables; they are left alone so ``alembic upgrade head`` works on them too.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    existing = set(sa.inspect(op.get_bind()).get_table_names())
+
+    if "sightings" not in existing:
+        op.create_table(
+            "sightings",
+            sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+            sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+            sa.Column("observed_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+            sa.Column("zone", sa.String(120), nullable=False),
+            sa.Column("species_guess", sa.String(120), nullable=True),
+            sa.Column("notes", sa.Text(), nullable=True),
+            sa.Column("photo_url", sa.String(1024), nullable=True),
+        )
+        op.create_index("ix_sightings_zone", "sightings", ["zone"])
+
+    if "prediction_rules" not in existing:
+        op.create_table(
+            "prediction_rules",
+            sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+            sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+            sa.Column("zone", sa.String(120), nullable=False),
+            sa.Column("month", sa.Integer(), nullable=False),
+            sa.Column("hour_bucket", sa.String(24), nullable=False),
+            sa.Column("species", sa.String(120), nullable=False),
+            sa.Column("weight", sa.Integer(), nullable=False),
+            sa.UniqueConstraint("zone", "month", "hour_bucket", "species", name="uq_prediction_rule_scope"),
+        )
+        op.create_index("ix_prediction_rule_lookup", "prediction_rules", ["zone", "month", "hour_bucket"])
+
+
+def downgrade() -> None:
+    op.drop_table("prediction_rules")
+    op.drop_table("sightings")
@@ -0,0 +1,24 @@
+"""Display variants for sighting photos (replaces sql/add_sighting_photo_variants.sql).
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    columns = {column["name"] for column in sa.inspect(op.get_bind()).get_columns("sightings")}
+    if "photo_variants" not in columns:
+        op.add_column("sightings", sa.Column("photo_variants", sa.JSON(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("sightings", "photo_variants")
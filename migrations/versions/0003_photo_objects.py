@@ -0,0 +1,45 @@
+"""Content-hash index of stored photos (replaces sql/add_photo_object_updated_at.sql).
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    if "photo_objects" in inspector.get_table_names():
+        # Created by create_all before updated_at existed.
+        columns = {column["name"] for column in inspector.get_columns("photo_objects")}
+        if "updated_at" not in columns:
+            # Batch mode: SQLite can't ALTER in a column with a now() default, so it rebuilds the table
+            # (restating the unnamed unique constraint on key, which the rebuild would drop).
+            with op.batch_alter_table("photo_objects", table_args=(sa.UniqueConstraint("key"),)) as batch:
+                batch.add_column(
+                    sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False)
+                )
+        return
+    op.create_table(
+        "photo_objects",
+        sa.Column("content_hash", sa.String(64), primary_key=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.Column("key", sa.String(1024), nullable=False, unique=True),
+        sa.Column("photo_url", sa.String(1024), nullable=False),
+        sa.Column("content_type", sa.String(64), nullable=False),
+        sa.Column("size_bytes", sa.Integer(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.Column("variants", sa.JSON(), nullable=True),
+        sa.Column("ref_count", sa.Integer(), nullable=False),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("photo_objects")
@@ -1,6 +1,7 @@
-import { apiRequest } from './http';
+import { ApiError, apiRequest } from './http';
 import type {
   BirdInfoOut,
+  PhotoPresignOut,
   PhotoUploadOut,
   PredictionOut,
   PredictionQuery,
@@ -10,6 +11,9 @@ import type {
   ZoneOut,
 } from './types';
 
+// Region preset served by this deployment (see REGION_PRESETS); empty uses the API default.
+const REGION = import.meta.env.VITE_REGION || undefined;
+
 export function healthCheck() {
   return apiRequest<{ status: string; env: string }>('/health', {
     method: 'GET',
@@ -25,7 +29,7 @@ export function listSightings(limit = 50) {
 }
 
 export function listZones() {
-  return apiRequest<ZoneOut[]>('/zones', { method: 'GET' });
+  return apiRequest<ZoneOut[]>('/zones', { method: 'GET' }, { region: REGION });
 }
 
 export function createSighting(payload: SightingCreateInput) {
@@ -44,6 +48,7 @@ export function getPredictions(query: PredictionQuery) {
       zone_id: query.zone_id ?? null,
       month: query.month,
       limit: query.limit ?? 10,
+      region: REGION,
     },
   );
 }
@@ -66,6 +71,28 @@ export function uploadPhoto(file: File) {
   });
 }
 
+// Upload straight to S3 with a presigned POST, then let the API verify it.
+export async function uploadPhotoDirect(file: File) {
+  const presigned = await apiRequest<PhotoPresignOut>('/uploads/presign', {
+    method: 'POST',
+    body: JSON.stringify({ content_type: file.type, size_bytes: file.size }),
+  });
+
+  const formData = new FormData();
+  Object.entries(presigned.fields).forEach(([name, value]) => formData.append(name, value));
+  formData.append('file', file);
+
+  const response = await fetch(presigned.url, { method: 'POST', body: formData });
+  if (!response.ok) {
+    throw new ApiError(response.status, `Storage upload failed with status ${response.status}`);
+  }
+
+  return apiRequest<PhotoUploadOut>('/uploads/complete', {
+    method: 'POST',
+    body: JSON.stringify({ key: presigned.key }),
+  });
+}
+
 export function deletePhoto(key: string) {
   return apiRequest<{ deleted: boolean }>('/uploads/photo', {
     method: 'DELETE',
@@ -2,6 +2,11 @@ const API_BASE_URL = (
   import.meta.env.VITE_API_BASE_URL || 'http://localhost:8000'
 ).replace(/\/$/, '');
 
+// Set by the API after a write; echoing it back keeps our reads on the primary
+// database until read replicas have caught up with that write.
+const PRIMARY_UNTIL_HEADER = 'X-Primary-Until';
+let primaryUntil: string | null = null;
+
 export class ApiError extends Error {
   status: number;
   detail: string;
@@ -38,15 +43,21 @@ export async function apiRequest<T>(
   const requestUrl = makeUrl(path, query);
   const bodyIsFormData =
     typeof FormData !== 'undefined' && options.body instanceof FormData;
+  if (primaryUntil && Number(primaryUntil) * 1000 < Date.now()) {
+    primaryUntil = null;
+  }
 
   const response = await fetch(requestUrl, {
     ...options,
     headers: {
       ...(bodyIsFormData ? {} : { 'Content-Type': 'application/json' }),
+      ...(primaryUntil ? { [PRIMARY_UNTIL_HEADER]: primaryUntil } : {}),
       ...(options.headers || {}),
     },
   });
 
+  primaryUntil = response.headers.get(PRIMARY_UNTIL_HEADER) ?? primaryUntil;
+
   const textPayload = await response.text();
   const parsedPayload = textPayload ? JSON.parse(textPayload) : null;
 
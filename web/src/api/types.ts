@@ -4,11 +4,20 @@ export interface ZoneOut {
   kind: 'geo' | 'hotspot';
 }
 
+export interface PhotoVariant {
+  name: string;
+  url: string;
+  content_type: string;
+  width: number | null;
+  height: number | null;
+}
+
 export interface SightingCreateInput {
   zone: string;
   species_guess?: string | null;
   notes?: string | null;
   photo_url?: string | null;
+  photo_variants?: PhotoVariant[] | null;
   observed_at?: string | null;
 }
 
@@ -20,6 +29,7 @@ export interface SightingOut {
   species_guess: string | null;
   notes: string | null;
   photo_url: string | null;
+  photo_variants: PhotoVariant[] | null;
 }
 
 export interface PredictionOut {
@@ -53,6 +63,16 @@ export interface PhotoUploadOut {
   key: string;
   content_type: string;
   size_bytes: number;
+  variants: PhotoVariant[];
+  processing: boolean;
+}
+
+export interface PhotoPresignOut {
+  key: string;
+  url: string;
+  fields: Record<string, string>;
+  expires_in: number;
+  max_bytes: number;
 }
 
 export interface SeedResult {
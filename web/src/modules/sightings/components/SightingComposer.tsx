@@ -3,7 +3,7 @@ import type { FormEvent } from 'react';
 
 import { AlertBanner } from '../../../shared/components/AlertBanner';
 import { toIsoOrNull } from '../../../shared/utils/datetime';
-import type { SightingOut } from '../../../api/types';
+import type { PhotoVariant, SightingOut } from '../../../api/types';
 import { useCreateSighting } from '../hooks/useCreateSighting';
 import { usePhotoUpload } from '../hooks/usePhotoUpload';
 import { PhotoPicker } from './PhotoPicker';
@@ -59,12 +59,14 @@ export function SightingComposer({ onCreated, onClose }: SightingComposerProps)
 
     let uploadedKey: string | null = null;
     let uploadedUrl: string | null = null;
+    let uploadedVariants: PhotoVariant[] | null = null;
 
     try {
       if (selectedFile) {
         const uploadResult = await photoUpload.upload(selectedFile);
         uploadedKey = uploadResult.key;
         uploadedUrl = uploadResult.photo_url;
+        uploadedVariants = uploadResult.variants.length ? uploadResult.variants : null;
       }
 
       const created = await createSighting.submit({
@@ -73,6 +75,7 @@ export function SightingComposer({ onCreated, onClose }: SightingComposerProps)
         notes: notes.trim() || null,
         observed_at: toIsoOrNull(observedAt),
         photo_url: uploadedUrl,
+        photo_variants: uploadedVariants,
       });
 
       setSpeciesGuess('');
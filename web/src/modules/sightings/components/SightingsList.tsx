@@ -1,6 +1,7 @@
 import { AlertBanner } from '../../../shared/components/AlertBanner';
 import { EmptyState } from '../../../shared/components/EmptyState';
 import { formatDateTime } from '../../../shared/utils/datetime';
+import { FEED_PHOTO_SIZES, photoSrcSet, smallestPhotoUrl } from '../../../shared/utils/photos';
 import type { SightingOut } from '../../../api/types';
 
 type SightingsListProps = {
@@ -48,7 +49,9 @@ export function SightingsList({
                 className="feed-card__photo"
               >
                 <img
-                  src={item.photo_url}
+                  src={smallestPhotoUrl(item.photo_url, item.photo_variants)}
+                  srcSet={photoSrcSet(item.photo_variants)}
+                  sizes={item.photo_variants ? FEED_PHOTO_SIZES : undefined}
                   alt={`Foto de ${item.species_guess || 'avistamiento'}`}
                   loading="lazy"
                 />
@@ -1,8 +1,10 @@
 import { useState } from 'react';
 
-import { deletePhoto, uploadPhoto } from '../../../api/endpoints';
+import { deletePhoto, uploadPhoto, uploadPhotoDirect } from '../../../api/endpoints';
 import type { PhotoUploadOut } from '../../../api/types';
 
+const DIRECT_UPLOADS = import.meta.env.VITE_DIRECT_UPLOADS === 'true';
+
 export function usePhotoUpload() {
   const [loading, setLoading] = useState(false);
   const [error, setError] = useState<string | null>(null);
@@ -11,7 +13,7 @@ export function usePhotoUpload() {
     setLoading(true);
     setError(null);
     try {
-      return await uploadPhoto(file);
+      return await (DIRECT_UPLOADS ? uploadPhotoDirect(file) : uploadPhoto(file));
     } catch (err: unknown) {
       const message = err instanceof Error ? err.message : 'No se pudo subir la foto.';
       setError(message);
@@ -0,0 +1,19 @@
+import type { PhotoVariant } from '../../api/types';
+
+// Feed cards are full width on phones and capped at ~840px on desktop.
+export const FEED_PHOTO_SIZES = '(min-width: 860px) 840px, 100vw';
+
+export function photoSrcSet(variants: PhotoVariant[] | null | undefined): string | undefined {
+  const candidates = (variants || []).filter((variant) => variant.width);
+  if (!candidates.length) return undefined;
+  return candidates.map((variant) => `${variant.url} ${variant.width}w`).join(', ');
+}
+
+export function smallestPhotoUrl(
+  photoUrl: string,
+  variants: PhotoVariant[] | null | undefined,
+): string {
+  const sized = (variants || []).filter((variant) => variant.width);
+  if (!sized.length) return photoUrl;
+  return sized.reduce((best, variant) => ((variant.width ?? 0) < (best.width ?? 0) ? variant : best)).url;
+}